@@ -0,0 +1,141 @@
+"""
+Alocações por requisição do caminho de /processar-fala, com tracemalloc.
+
+Para cada fala: processar_texto, parâmetros do INSERT (para_banco),
+corpo da resposta (para_resposta) e serialização com orjson, como a rota
+faz. Mede, por requisição:
+
+- bytes e blocos retidos: memória que continua alocada enquanto os
+  parâmetros do INSERT e a resposta existem (um lote de 500 falas segura
+  todos até o commit);
+- pico: maior memória transitória durante a requisição.
+
+Roda com o cache de resultados do NLP ligado (falas repetidas, o caso do
+app reenviando) e desligado (toda fala passa pela extração).
+
+    python benchmarks/alocacoes_nlp.py
+    python benchmarks/alocacoes_nlp.py --baseline benchmarks/corpus/baseline_alocacoes.json
+    python benchmarks/alocacoes_nlp.py --salvar-baseline benchmarks/corpus/baseline_alocacoes.json
+
+Com --baseline, um aumento acima de --tolerancia em qualquer medida
+conta como regressão e o script termina com código 1.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import List, Optional
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _medir(processador, textos: List[str], requisicoes: int) -> dict:
+    import orjson
+
+    def requisicao(indice: int):
+        resultado = processador.processar_texto(textos[indice % len(textos)], 'benchmark')
+        dados_banco = resultado.para_banco('benchmark')
+        resposta = resultado.para_resposta(indice, 'benchmark')
+        orjson.dumps(resposta)
+        return dados_banco, resposta
+
+    # Aquecimento: preenche o cache (quando ligado) e os caches internos do Python
+    for indice in range(len(textos)):
+        requisicao(indice)
+
+    gc.collect()
+    tracemalloc.start()
+    retidos = []
+    picos = 0
+    inicio = tracemalloc.take_snapshot()
+    memoria_inicio = tracemalloc.get_traced_memory()[0]
+    for indice in range(requisicoes):
+        antes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        retidos.append(requisicao(indice))
+        picos += tracemalloc.get_traced_memory()[1] - antes
+    memoria_fim = tracemalloc.get_traced_memory()[0]
+    fim = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    # A lista `retidos` também conta; desprezível perto das requisições
+    blocos = sum(estatistica.count_diff for estatistica in fim.compare_to(inicio, 'lineno'))
+    return {
+        'bytes_retidos': round((memoria_fim - memoria_inicio) / requisicoes),
+        'blocos_retidos': round(blocos / requisicoes, 1),
+        'pico_bytes': round(picos / requisicoes),
+    }
+
+
+def executar(requisicoes: int, falas: int, semente: int) -> dict:
+    sys.path.insert(0, RAIZ_API)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import gerador_corpus
+    from src.nlp.cache import BackendMemoria
+    from src.nlp.processador import ProcessadorNLPRural
+
+    textos = [fala['texto'] for fala in gerador_corpus.gerar(falas, semente)]
+    com_cache = ProcessadorNLPRural(BackendMemoria(len(textos) * 2))
+    sem_cache = ProcessadorNLPRural()
+    sem_cache.cache_resultados = None
+
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'requisicoes': requisicoes,
+        'falas_distintas': len(textos),
+        'com_cache': _medir(com_cache, textos, requisicoes),
+        'sem_cache': _medir(sem_cache, textos, requisicoes),
+    }
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> dict:
+    variacoes = {}
+    regressoes = []
+    for modo in ('com_cache', 'sem_cache'):
+        for medida, valor in atual[modo].items():
+            base = baseline.get(modo, {}).get(medida)
+            if not base:
+                continue
+            variacao = (valor - base) / base
+            variacoes[f"{modo}.{medida}"] = round(variacao, 4)
+            if variacao > tolerancia:
+                regressoes.append(f"{modo} {medida}: {base} -> {valor} (+{variacao:.0%})")
+    return {
+        'baseline_gerado_em': baseline.get('gerado_em'),
+        'variacao': variacoes,
+        'regressoes': regressoes,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requisicoes", type=int, default=5000)
+    parser.add_argument("--falas", type=int, default=500, help="Falas distintas do corpus sintético")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--baseline", help="Relatório salvo para comparação")
+    parser.add_argument("--salvar-baseline", help="Gravar o relatório como novo baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.requisicoes, args.falas, args.semente)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            relatorio['comparacao'] = comparar(relatorio, json.load(arquivo), args.tolerancia)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+
+    if relatorio.get('comparacao', {}).get('regressoes'):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Benchmark de carga da API.
+
+Sobe um servidor uvicorn local (com banco SQLite temporário) ou usa uma URL
+já em execução, dispara requisições concorrentes e reporta throughput e
+latências. Para comparar duas versões, rode o script em cada uma e compare
+os JSONs gerados.
+
+    python benchmarks/carga_api.py --requisicoes 2000 --concorrencia 32
+    python benchmarks/carga_api.py --url http://localhost:8000 --rota /api/v1/registros/bench
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FRASES = [
+    "contratei o Eduardo para plantar soja no talhão 5 por 3000 reais",
+    "paguei o João 150 reais para pulverizar talhão 3",
+    "comprei 20 sacas de adubo por 2 mil reais",
+    "colhi 300 sacas de milho na gleba 12",
+    "apliquei 40 litros de herbicida no talhão 7 custou 800 reais",
+]
+
+
+def _subir_servidor(porta: int, workers: int, env_extra: dict) -> subprocess.Popen:
+    banco = os.path.join(tempfile.mkdtemp(prefix="agrovoz-bench-"), "bench.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{banco}", MIGRACOES_INICIALIZACAO="atualizar")
+    env.update(env_extra)
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=RAIZ_API, env=env
+    )
+    _aguardar(f"http://127.0.0.1:{porta}/health")
+    return processo
+
+
+def _aguardar(url: str, timeout: float = 30.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Servidor não respondeu em {url}")
+
+
+def _requisitar(url: str, corpo: Optional[bytes]) -> float:
+    inicio = time.perf_counter()
+    requisicao = urllib.request.Request(
+        url, data=corpo, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(requisicao, timeout=60) as resposta:
+        resposta.read()
+    return time.perf_counter() - inicio
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def executar(base_url: str, rota: str, requisicoes: int, concorrencia: int) -> dict:
+    url = base_url.rstrip("/") + rota
+    post = rota.endswith("processar-fala")
+    corpos = [
+        json.dumps({"texto": FRASES[i % len(FRASES)], "usuario_id": f"bench_{i % 50}"}).encode()
+        if post else None
+        for i in range(requisicoes)
+    ]
+
+    # Aquecimento
+    for corpo in corpos[:min(20, requisicoes)]:
+        _requisitar(url, corpo)
+
+    erros = 0
+    latencias: List[float] = []
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        for futuro in [executor.submit(_requisitar, url, corpo) for corpo in corpos]:
+            try:
+                latencias.append(futuro.result())
+            except Exception:
+                erros += 1
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "url": url,
+        "requisicoes": requisicoes,
+        "concorrencia": concorrencia,
+        "erros": erros,
+        "duracao_s": round(duracao, 3),
+        "throughput_rps": round(len(latencias) / duracao, 1),
+        "latencia_p50_ms": round(_percentil(latencias, 50) * 1000, 2) if latencias else None,
+        "latencia_p99_ms": round(_percentil(latencias, 99) * 1000, 2) if latencias else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga da AgroVoz API")
+    parser.add_argument("--url", help="URL de um servidor já em execução")
+    parser.add_argument("--rota", default="/api/v1/processar-fala")
+    parser.add_argument("--requisicoes", type=int, default=1000)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--env", action="append", default=[],
+                        help="Variável extra para o servidor local (NOME=valor)")
+    args = parser.parse_args()
+
+    processo = None
+    base_url = args.url
+    if base_url is None:
+        env_extra = dict(item.split("=", 1) for item in args.env)
+        processo = _subir_servidor(args.porta, args.workers, env_extra)
+        base_url = f"http://127.0.0.1:{args.porta}"
+
+    try:
+        print(json.dumps(executar(base_url, args.rota, args.requisicoes, args.concorrencia), indent=2))
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Correção das palavras mal transcritas (src/nlp/aproximado.py).
+
+Gera erros de reconhecimento de voz sobre o corpus sintético: em cada
+fala, uma palavra de referência (cultura, atividade, palavra fixa dos
+padrões ou nome de funcionário cadastrado) perde os acentos, troca uma
+letra por outra de som parecido, perde ou repete uma letra. Mede, com e
+sem a correção:
+
+- acerto: campos rotulados extraídos com o valor certo, no corpus limpo
+  e no corpus com erros;
+- alteradas_limpo: falas do corpus limpo cuja extração muda com a
+  correção (tem que ser 0: a correção não pode estragar texto certo);
+- processar_texto_sem/com_correcao_us: NLP inteiro por fala do corpus
+  limpo, cache de resultados desligado (o custo da correção em texto
+  certo); processar_texto_erros_us, o mesmo no corpus com erros;
+- corrigir_us: IndiceAproximado.corrigir de uma fala com erro, com as
+  palavras já no memo do índice;
+- buscar_us: IndiceAproximado.buscar de uma palavra nunca vista.
+
+    python benchmarks/correcao_asr.py
+    python benchmarks/correcao_asr.py --baseline benchmarks/corpus/baseline_correcao.json
+    python benchmarks/correcao_asr.py --salvar-baseline benchmarks/corpus/baseline_correcao.json
+
+Cada tempo é o menor das repetições. Com --baseline, conta como
+regressão (e o script termina com código 1) o acerto com erros caindo
+mais que --tolerancia-qualidade, um tempo subindo mais que --tolerancia
+ou qualquer fala limpa alterada.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CAMPOS = (
+    'tipo_atividade', 'pessoa_envolvida', 'servico_realizado', 'cultura',
+    'talhao', 'valor_monetario', 'quantidade', 'unidade_medida'
+)
+
+# Trocas de som parecido que o reconhecimento costuma fazer
+TROCAS = (('s', 'z'), ('z', 's'), ('i', 'y'), ('j', 'y'), ('o', 'u'), ('u', 'o'), ('e', 'i'),
+          ('lh', 'li'), ('ç', 's'), ('c', 'k'), ('ss', 's'), ('x', 'ch'))
+
+
+def _errar(palavra: str, aleatorio: random.Random) -> str:
+    """A palavra com um erro de transcrição"""
+    from src.nlp.aproximado import sem_acentos
+
+    opcoes = []
+    if sem_acentos(palavra) != palavra:
+        opcoes.append(sem_acentos(palavra))
+    for de, para in TROCAS:
+        posicao = palavra.find(de, 1)
+        if posicao > 0:
+            opcoes.append(palavra[:posicao] + para + palavra[posicao + len(de):])
+    meio = aleatorio.randrange(1, len(palavra))
+    opcoes.append(palavra[:meio] + palavra[meio + 1:])
+    opcoes.append(palavra[:meio] + palavra[meio] + palavra[meio:])
+    return aleatorio.choice(opcoes)
+
+
+def _com_erros(falas: List[dict], referencias, semente: int) -> List[dict]:
+    """Cada fala com uma palavra de referência mal transcrita (as sem nenhuma ficam fora)"""
+    import re
+    from src.nlp.aproximado import sem_acentos
+
+    aleatorio = random.Random(semente)
+    saida = []
+    for fala in falas:
+        palavras = [
+            match for match in re.finditer(r'[^\W\d_]{4,}', fala['texto'])
+            if sem_acentos(match.group().lower()) in referencias
+        ]
+        if not palavras:
+            continue
+        match = aleatorio.choice(palavras)
+        errada = _errar(match.group(), aleatorio)
+        texto = fala['texto'][:match.start()] + errada + fala['texto'][match.end():]
+        saida.append({'texto': texto, 'esperado': fala['esperado']})
+    return saida
+
+
+def _acerto(processador, falas: List[dict], vocabulario) -> float:
+    certos = total = 0
+    for fala in falas:
+        resultado = processador.processar_texto(fala['texto'], 'benchmark', vocabulario)
+        for campo in CAMPOS:
+            esperado = fala['esperado'].get(campo)
+            if esperado is None:
+                continue
+            total += 1
+            certos += getattr(resultado, campo) == esperado
+    return round(certos / total, 4) if total else 0.0
+
+
+def _menor_us(funcao, quantidade: int, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return round(min(tempos) / quantidade * 1e6, 2)
+
+
+def executar(quantidade: int, repeticoes: int, semente: int) -> dict:
+    sys.path.insert(0, RAIZ_API)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import gerador_corpus
+    from src.nlp.processador import ProcessadorNLPRural
+    from src.nlp.resultado import CAMPOS_EXTRAIDOS
+    from src.nlp.vocabulario import VocabularioUsuario
+
+    # Funcionários cadastrados: os nomes do corpus entram no índice do usuário
+    vocabulario = VocabularioUsuario(
+        'benchmark', nomes_funcionarios=[nome for _, nome in gerador_corpus.PESSOAS]
+    )
+    com = ProcessadorNLPRural()
+    sem = ProcessadorNLPRural()
+    sem.correcao = None
+    for processador in (com, sem):
+        processador.cache_resultados = None
+
+    limpas = list(gerador_corpus.gerar(quantidade, semente))
+    # Referências do usuário e as da base que o índice dele consulta
+    indice_usuario = com._compilar_vocabulario(vocabulario).correcao
+    referencias = indice_usuario.referencias.keys() | indice_usuario.base.referencias.keys()
+    com_erros = _com_erros(limpas, referencias, semente)
+
+    alteradas = 0
+    for fala in limpas:
+        a = com.processar_texto(fala['texto'], 'benchmark', vocabulario)
+        b = sem.processar_texto(fala['texto'], 'benchmark', vocabulario)
+        alteradas += any(getattr(a, campo) != getattr(b, campo) for campo in CAMPOS_EXTRAIDOS)
+
+    # Palavras nunca vistas: as erradas, num índice novo a cada repetição
+    palavras = sorted({
+        palavra for fala in com_erros for palavra in fala['texto'].lower().split() if len(palavra) >= 4
+    })
+
+    def buscar():
+        indice = com._compilar_correcao()
+        for palavra in palavras:
+            indice.buscar(palavra)
+
+    textos = [fala['texto'] for fala in limpas]
+    textos_erros = [fala['texto'] for fala in com_erros]
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'falas': len(limpas),
+        'falas_com_erros': len(com_erros),
+        'repeticoes': repeticoes,
+        'acerto': {
+            'limpo_sem_correcao': _acerto(sem, limpas, vocabulario),
+            'limpo_com_correcao': _acerto(com, limpas, vocabulario),
+            'erros_sem_correcao': _acerto(sem, com_erros, vocabulario),
+            'erros_com_correcao': _acerto(com, com_erros, vocabulario),
+        },
+        'alteradas_limpo': alteradas,
+        'tempos': {
+            'processar_texto_sem_correcao_us': _menor_us(
+                lambda: [sem.processar_texto(texto, 'benchmark', vocabulario) for texto in textos],
+                len(textos), repeticoes
+            ),
+            'processar_texto_com_correcao_us': _menor_us(
+                lambda: [com.processar_texto(texto, 'benchmark', vocabulario) for texto in textos],
+                len(textos), repeticoes
+            ),
+            'processar_texto_erros_us': _menor_us(
+                lambda: [com.processar_texto(texto, 'benchmark', vocabulario) for texto in textos_erros],
+                len(textos_erros), repeticoes
+            ),
+            'corrigir_us': _menor_us(
+                lambda: [indice_usuario.corrigir(texto.lower()) for texto in textos_erros],
+                len(textos_erros), repeticoes
+            ),
+            'buscar_us': _menor_us(buscar, len(palavras), repeticoes),
+        },
+    }
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float, tolerancia_qualidade: float) -> dict:
+    variacoes = {}
+    regressoes = []
+    if atual['alteradas_limpo']:
+        regressoes.append(f"{atual['alteradas_limpo']} falas limpas alteradas pela correção")
+
+    base = baseline.get('acerto', {}).get('erros_com_correcao')
+    if base:
+        valor = atual['acerto']['erros_com_correcao']
+        variacoes['acerto.erros_com_correcao'] = round(valor - base, 4)
+        if base - valor > tolerancia_qualidade:
+            regressoes.append(f"acerto com erros: {base} -> {valor}")
+
+    for medida, valor in atual['tempos'].items():
+        base = baseline.get('tempos', {}).get(medida)
+        if not base:
+            continue
+        variacao = (valor - base) / base
+        variacoes[f"tempos.{medida}"] = round(variacao, 4)
+        if variacao > tolerancia:
+            regressoes.append(f"{medida}: {base} -> {valor} (+{variacao:.0%})")
+    return {
+        'baseline_gerado_em': baseline.get('gerado_em'),
+        'variacao': variacoes,
+        'regressoes': regressoes,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--falas", type=int, default=5000, help="Falas do corpus sintético")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--baseline", help="Relatório salvo para comparação")
+    parser.add_argument("--salvar-baseline", help="Gravar o relatório como novo baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    parser.add_argument("--tolerancia-qualidade", type=float, default=0.01)
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.falas, args.repeticoes, args.semente)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            relatorio['comparacao'] = comparar(
+                relatorio, json.load(arquivo), args.tolerancia, args.tolerancia_qualidade
+            )
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+
+    if relatorio.get('comparacao', {}).get('regressoes'):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Benchmark das estatísticas por agregados diários/mensais.
+
+Carrega N registros de um usuário espalhados em um ano (pelo mesmo caminho
+de gravação da API, que mantém os agregados), mede a latência de
+DatabaseService.obter_estatisticas em algumas janelas e confere os totais
+contra um COUNT direto em registros_rurais.
+
+    python benchmarks/estatisticas.py --registros 100000
+    python benchmarks/estatisticas.py --banco postgresql://... --registros 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIPOS = ['plantio', 'colheita', 'venda', 'contratacao', 'compra_insumo', 'pulverizacao']
+CULTURAS = ['Soja', 'Milho', 'Café', 'Algodão', None]
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--banco", help="DATABASE_URL (padrão: SQLite temporário)")
+    parser.add_argument("--registros", type=int, default=100_000)
+    parser.add_argument("--talhoes", type=int, default=30)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.banco or "sqlite:///" + os.path.join(
+        tempfile.mkdtemp(prefix="agrovoz-bench-"), "estatisticas.db"
+    )
+    sys.path.insert(0, RAIZ_API)
+    from sqlalchemy import func, select
+    from src.database.connection import SessionLocal, DatabaseService, create_tables
+    from src.database.models import RegistroRural
+
+    create_tables()
+    db = SessionLocal()
+    servico = DatabaseService(db)
+    usuario_id = f"bench-{int(time.time())}"
+    ano = datetime(date.today().year - 1, 1, 1)
+    aleatorio = random.Random(42)
+
+    inicio = time.perf_counter()
+    for _ in range(0, args.registros, 1000):
+        servico.criar_registros([
+            {
+                "usuario_id": usuario_id,
+                "tipo_atividade": aleatorio.choice(TIPOS),
+                "descricao_original": "benchmark",
+                "cultura": aleatorio.choice(CULTURAS),
+                "talhao": aleatorio.randint(1, args.talhoes),
+                "valor_monetario": aleatorio.choice([None, 150.0, 3000.0]),
+                "data_registro": ano + timedelta(seconds=aleatorio.randrange(365 * 86400)),
+            }
+            for _ in range(min(1000, args.registros))
+        ])
+    carga_s = time.perf_counter() - inicio
+
+    janelas = {
+        "30_dias": (date(ano.year, 12, 2), date(ano.year, 12, 31)),
+        "mes_inteiro": (date(ano.year, 6, 1), date(ano.year, 6, 30)),
+        "ano_inteiro": (date(ano.year, 1, 1), date(ano.year, 12, 31)),
+        "meses_com_pontas": (date(ano.year, 1, 15), date(ano.year, 11, 20)),
+    }
+    relatorio = {"registros": args.registros, "carga_s": round(carga_s, 2), "janelas": {}}
+    for nome, (de, ate) in janelas.items():
+        latencias = []
+        for _ in range(args.repeticoes):
+            t = time.perf_counter()
+            estatisticas = servico.obter_estatisticas(usuario_id, de, ate)
+            latencias.append((time.perf_counter() - t) * 1000)
+
+        esperado = db.scalar(
+            select(func.count()).select_from(RegistroRural).where(
+                RegistroRural.usuario_id == usuario_id,
+                RegistroRural.data_registro >= de,
+                RegistroRural.data_registro < ate + timedelta(days=1)
+            )
+        )
+        relatorio["janelas"][nome] = {
+            "p50_ms": round(_percentil(latencias, 0.5), 3),
+            "p99_ms": round(_percentil(latencias, 0.99), 3),
+            "total_registros": estatisticas["total_registros"],
+            "confere": estatisticas["total_registros"] == esperado,
+        }
+    db.close()
+
+    print(json.dumps(relatorio, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Extração incremental de /ws/processar-fala contra a extração completa.
+
+Simula o app mandando a transcrição parcial a cada palavra reconhecida,
+para falas de tamanhos diferentes (1, 4 e 16 falas do corpus sintético
+emendadas, uma gravação longa). Para cada tamanho, mede por atualização:
+
+- completa_us: processar_texto do texto inteiro (cache de resultados
+  desligado), o que cada parcial custaria sem estado de sessão;
+- incremental_us: SessaoExtracao.atualizar, que só varre de novo o
+  trecho alterado e devolve as diferenças;
+- bytes_diferencas / bytes_resposta: tamanho médio da mensagem parcial
+  enviada contra o corpo inteiro da resposta, serializados com orjson;
+- divergencias: atualizações cujo resultado difere do processar_texto
+  do mesmo texto (tem que ser 0).
+
+    python benchmarks/extracao_incremental.py
+    python benchmarks/extracao_incremental.py --baseline benchmarks/corpus/baseline_incremental.json
+    python benchmarks/extracao_incremental.py --salvar-baseline benchmarks/corpus/baseline_incremental.json
+
+Cada tempo é o menor das repetições. Com --baseline, um aumento acima de
+--tolerancia em incremental_us ou bytes_diferencas, ou qualquer
+divergência, conta como regressão e o script termina com código 1.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Falas do corpus emendadas em cada transcrição
+TAMANHOS = (1, 4, 16)
+
+
+def _parciais(texto: str) -> List[str]:
+    """Transcrições parciais de um texto, uma a cada palavra reconhecida"""
+    palavras = texto.split(' ')
+    return [' '.join(palavras[:quantidade]) for quantidade in range(1, len(palavras) + 1)]
+
+
+def _chave(resultado):
+    from src.nlp.resultado import CAMPOS_EXTRAIDOS
+
+    return (
+        tuple(getattr(resultado, campo) for campo in CAMPOS_EXTRAIDOS),
+        resultado.validacao, resultado.confianca, resultado.sugestoes
+    )
+
+
+def _medir(processador, transcricoes: List[List[str]], repeticoes: int) -> dict:
+    import orjson
+    from src.nlp.sessao import SessaoExtracao
+
+    atualizacoes = sum(len(parciais) for parciais in transcricoes)
+
+    def completa():
+        for parciais in transcricoes:
+            for parcial in parciais:
+                processador.processar_texto(parcial, 'benchmark')
+
+    def incremental():
+        for parciais in transcricoes:
+            sessao = SessaoExtracao(processador, 'benchmark')
+            for parcial in parciais:
+                sessao.atualizar(parcial)
+
+    def menor_us(funcao) -> float:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+        return round(min(tempos) / atualizacoes * 1e6, 1)
+
+    # Resultados e tamanhos das mensagens, fora da medida de tempo
+    divergencias = 0
+    bytes_diferencas = bytes_resposta = 0
+    for parciais in transcricoes:
+        sessao = SessaoExtracao(processador, 'benchmark')
+        for parcial in parciais:
+            diferencas = sessao.atualizar(parcial)
+            completo = processador.processar_texto(parcial, 'benchmark')
+            if _chave(sessao.resultado) != _chave(completo):
+                divergencias += 1
+            bytes_diferencas += len(orjson.dumps({'tipo': 'parcial', 'sequencia': 1, **diferencas}))
+            bytes_resposta += len(orjson.dumps(completo.para_resposta(None, 'benchmark')))
+
+    caracteres = sum(len(parcial) for parciais in transcricoes for parcial in parciais)
+    return {
+        'atualizacoes': atualizacoes,
+        'caracteres_medio': round(caracteres / atualizacoes),
+        'completa_us': menor_us(completa),
+        'incremental_us': menor_us(incremental),
+        'bytes_diferencas': round(bytes_diferencas / atualizacoes),
+        'bytes_resposta': round(bytes_resposta / atualizacoes),
+        'divergencias': divergencias,
+    }
+
+
+def executar(falas: int, repeticoes: int, semente: int) -> dict:
+    sys.path.insert(0, RAIZ_API)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import gerador_corpus
+    from src.nlp.processador import ProcessadorNLPRural
+
+    processador = ProcessadorNLPRural()
+    processador.cache_resultados = None
+    textos = [fala['texto'] for fala in gerador_corpus.gerar(falas * max(TAMANHOS), semente)]
+
+    por_tamanho: Dict[str, dict] = {}
+    for tamanho in TAMANHOS:
+        transcricoes = [
+            _parciais(' e depois '.join(textos[inicio:inicio + tamanho]))
+            for inicio in range(0, falas * tamanho, tamanho)
+        ]
+        por_tamanho[f"falas_{tamanho}"] = _medir(processador, transcricoes, repeticoes)
+
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'transcricoes': falas,
+        'repeticoes': repeticoes,
+        'tamanhos': por_tamanho,
+    }
+
+
+# Medidas comparadas com o baseline
+MEDIDAS = ('incremental_us', 'bytes_diferencas')
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> dict:
+    variacoes = {}
+    regressoes = []
+    for tamanho, medidas in atual['tamanhos'].items():
+        if medidas['divergencias']:
+            regressoes.append(f"{tamanho}: {medidas['divergencias']} atualizações divergentes")
+        for medida in MEDIDAS:
+            base = baseline.get('tamanhos', {}).get(tamanho, {}).get(medida)
+            if not base:
+                continue
+            variacao = (medidas[medida] - base) / base
+            variacoes[f"{tamanho}.{medida}"] = round(variacao, 4)
+            if variacao > tolerancia:
+                regressoes.append(f"{tamanho} {medida}: {base} -> {medidas[medida]} (+{variacao:.0%})")
+    return {
+        'baseline_gerado_em': baseline.get('gerado_em'),
+        'variacao': variacoes,
+        'regressoes': regressoes,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--falas", type=int, default=100, help="Transcrições simuladas por tamanho")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--baseline", help="Relatório salvo para comparação")
+    parser.add_argument("--salvar-baseline", help="Gravar o relatório como novo baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.falas, args.repeticoes, args.semente)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            relatorio['comparacao'] = comparar(relatorio, json.load(arquivo), args.tolerancia)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+
+    if relatorio.get('comparacao', {}).get('regressoes'):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
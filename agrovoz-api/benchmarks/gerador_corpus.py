@@ -0,0 +1,202 @@
+"""
+Gerador de corpus sintético rotulado para o benchmark do NLP.
+
+Monta falas rurais a partir de modelos com lacunas (pessoa, cultura, talhão,
+valor, quantidade...), variando sinônimos, formas de falar números e
+palavras de preenchimento. O rótulo de cada fala é conhecido pela
+construção, no mesmo formato de benchmarks/corpus/rotulado.jsonl.
+
+A geração é determinística pela semente e não acumula nada em memória,
+então escala para milhões de falas:
+
+    python benchmarks/gerador_corpus.py --quantidade 1000000 --saida /tmp/corpus.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+from typing import Dict, Iterator, Optional, Tuple
+
+PESSOAS = (
+    ('o', 'Eduardo'), ('o', 'João'), ('a', 'Maria'), ('o', 'Pedro'), ('a', 'Ana'),
+    ('o', 'Carlos'), ('o', 'José'), ('o', 'Antônio'), ('o', 'Francisco'), ('o', 'Paulo'),
+    ('o', 'Luiz'), ('o', 'Marcos'), ('a', 'Rosa'), ('a', 'Joana'), ('o', 'Sebastião'),
+    ('o', 'Raimundo'), ('a', 'Beatriz'), ('a', 'Luíza'),
+)
+
+# Culturas do vocabulário base e algumas fora dele
+CULTURAS = ('soja', 'milho', 'algodão', 'feijão', 'café', 'cana', 'arroz', 'trigo', 'sorgo', 'girassol')
+
+LOCAIS = (('no', 'talhão'), ('na', 'gleba'), ('no', 'lote'), ('na', 'área'))
+
+# (infinitivo, primeira pessoa do pretérito)
+SERVICOS = (
+    ('plantar', 'plantei'), ('colher', 'colhi'), ('pulverizar', 'pulverizei'),
+    ('arar', 'arei'), ('semear', 'semeei'),
+)
+
+INSUMOS = (('adubo', 'sacas'), ('ureia', 'sacas'), ('calcário', 'sacas'), ('herbicida', 'litros'),
+           ('fungicida', 'litros'), ('adubo', 'kg'))
+
+VALORES = (150, 200, 250, 300, 450, 600, 800, 900, 1200, 1500, 2000, 2500, 3000,
+           4500, 5000, 8000, 12000, 17500, 35000, 60000)
+
+PREFIXOS = ('', '', '', 'hoje ', 'ontem ', 'de manhã ', 'olha, ')
+SUFIXOS = ('', '', '', ' hoje', ' de tarde', ' lá no sítio')
+
+UNIDADES_FALADAS = {
+    'sacas': ('sacas',),
+    'kg': ('kg', 'quilos'),
+    'litros': ('litros',),
+    'hectares': ('hectares', 'ha'),
+}
+
+
+class _Fala:
+    """Acumula o texto e o rótulo de uma fala sintética"""
+
+    def __init__(self, aleatorio: random.Random):
+        self.aleatorio = aleatorio
+        self.esperado: Dict[str, object] = {}
+
+    def escolher(self, opcoes):
+        return self.aleatorio.choice(opcoes)
+
+    def pessoa(self) -> Tuple[str, str]:
+        artigo, nome = self.escolher(PESSOAS)
+        self.esperado['pessoa_envolvida'] = nome
+        # ASR nem sempre capitaliza nomes
+        return artigo, nome if self.aleatorio.random() < 0.7 else nome.lower()
+
+    def cultura(self) -> str:
+        cultura = self.escolher(CULTURAS)
+        self.esperado['cultura'] = cultura.title()
+        return cultura
+
+    def local(self) -> str:
+        preposicao, local = self.escolher(LOCAIS)
+        talhao = self.aleatorio.randint(1, 40)
+        self.esperado['talhao'] = talhao
+        return f"{preposicao} {local} {talhao}"
+
+    def valor(self) -> str:
+        valor = self.escolher(VALORES)
+        self.esperado['valor_monetario'] = float(valor)
+        formas = [f"{valor} reais", f"{valor} reais", f"r$ {valor}"]
+        if valor % 1000 == 0:
+            formas.append(f"{valor // 1000} mil reais")
+        if valor >= 1000:
+            formas.append(f"{valor // 1000}.{valor % 1000:03d} reais")
+        return self.escolher(formas)
+
+    def quantidade(self, unidade: str, minimo: int = 2, maximo: int = 500) -> str:
+        quantidade = self.aleatorio.randint(minimo, maximo)
+        self.esperado['quantidade'] = float(quantidade)
+        self.esperado['unidade_medida'] = unidade
+        return f"{quantidade} {self.escolher(UNIDADES_FALADAS[unidade])}"
+
+
+def _contratacao(f: _Fala) -> str:
+    f.esperado['tipo_atividade'] = 'contratacao'
+    infinitivo, _ = f.escolher(SERVICOS)
+    f.esperado['servico_realizado'] = infinitivo
+    artigo, nome = f.pessoa()
+    verbo = f.escolher(('contratei', 'chamei', 'paguei'))
+    if f.aleatorio.random() < 0.5:
+        return f"{verbo} {artigo} {nome} para {infinitivo} {f.cultura()} {f.local()} por {f.valor()}"
+    return f"paguei {artigo} {nome} {f.valor()} para {infinitivo} {f.local()}"
+
+
+def _compra(f: _Fala) -> str:
+    f.esperado['tipo_atividade'] = 'compra_insumo'
+    verbo = f.escolher(('comprei', 'adquiri'))
+    if f.aleatorio.random() < 0.25:
+        return f"{verbo} sementes de {f.cultura()} por {f.valor()}"
+    insumo, unidade = f.escolher(INSUMOS)
+    return f"{verbo} {f.quantidade(unidade)} de {insumo} por {f.valor()}"
+
+
+def _colheita(f: _Fala) -> str:
+    f.esperado['tipo_atividade'] = 'colheita'
+    f.esperado['servico_realizado'] = 'colher'
+    return f"colhi {f.quantidade('sacas')} de {f.cultura()} {f.local()}"
+
+
+def _pulverizacao(f: _Fala) -> str:
+    f.esperado['tipo_atividade'] = 'pulverizacao'
+    infinitivo, verbo = f.escolher((('pulverizar', 'pulverizei'), ('aplicar', 'apliquei')))
+    f.esperado['servico_realizado'] = infinitivo
+    produto = f.escolher(('herbicida', 'fungicida', 'inseticida'))
+    return f"{verbo} {f.quantidade('litros', 5, 200)} de {produto} {f.local()}"
+
+
+def _venda(f: _Fala) -> str:
+    f.esperado['tipo_atividade'] = 'venda'
+    verbo = f.escolher(('vendi', 'comercializei', 'entreguei'))
+    return f"{verbo} {f.quantidade('sacas', 10, 2000)} de {f.cultura()} por {f.valor()}"
+
+
+def _plantio(f: _Fala) -> str:
+    f.esperado['tipo_atividade'] = 'plantio'
+    infinitivo, verbo = f.escolher((('plantar', 'plantei'), ('semear', 'semeei')))
+    f.esperado['servico_realizado'] = infinitivo
+    return f"{verbo} {f.quantidade('hectares', 1, 300)} de {f.cultura()} {f.local()}"
+
+
+def _preparo(f: _Fala) -> str:
+    f.esperado['tipo_atividade'] = 'preparo_solo'
+    if f.aleatorio.random() < 0.5:
+        f.esperado['servico_realizado'] = 'arar'
+        return f"arei {f.local().split(' ', 1)[1]}"
+    return f"preparei o solo {f.local()}"
+
+
+def _ruido(f: _Fala) -> str:
+    # Falas sem nenhum dado a extrair
+    return f.escolher((
+        "choveu bastante na fazenda",
+        "o trator quebrou de novo",
+        "amanhã vou na cidade",
+        "o gado está no pasto de cima",
+    ))
+
+
+# (modelo, peso)
+MODELOS = (
+    (_contratacao, 25), (_compra, 15), (_colheita, 15), (_pulverizacao, 12),
+    (_venda, 10), (_plantio, 12), (_preparo, 6), (_ruido, 5),
+)
+
+
+def gerar(quantidade: int, semente: int = 0) -> Iterator[dict]:
+    """Gera `quantidade` falas rotuladas, sempre as mesmas para a mesma semente"""
+    aleatorio = random.Random(semente)
+    modelos = [modelo for modelo, _ in MODELOS]
+    pesos = [peso for _, peso in MODELOS]
+    for _ in range(quantidade):
+        fala = _Fala(aleatorio)
+        modelo = aleatorio.choices(modelos, pesos)[0]
+        texto = aleatorio.choice(PREFIXOS) + modelo(fala) + aleatorio.choice(SUFIXOS)
+        if aleatorio.random() < 0.2:
+            texto = texto[0].upper() + texto[1:]
+        yield {"texto": texto, "esperado": fala.esperado}
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantidade", type=int, default=10_000)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--saida", help="Arquivo JSONL (padrão: saída padrão)")
+    args = parser.parse_args(argv)
+
+    saida = open(args.saida, "w", encoding="utf-8") if args.saida else sys.stdout
+    try:
+        for fala in gerar(args.quantidade, args.semente):
+            saida.write(json.dumps(fala, ensure_ascii=False) + "\n")
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+
+if __name__ == "__main__":
+    main()
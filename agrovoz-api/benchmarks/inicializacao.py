@@ -0,0 +1,209 @@
+"""
+Tempo de inicialização da API (cold start, plataformas que escalam a zero).
+
+- importação: `python -X importtime -c "import main"` em processos novos;
+  tempo total e os pacotes mais caros (tempo próprio somado por pacote),
+  com os módulos do projeto (src.*) à parte;
+- primeira resposta: sobe `uvicorn main:app` com um banco SQLite novo já
+  migrado e mede, desde o início do processo, o primeiro 200 de /health e
+  a primeira /processar-fala respondida.
+
+    python benchmarks/inicializacao.py
+    python benchmarks/inicializacao.py --executor processos
+    python benchmarks/inicializacao.py --baseline benchmarks/corpus/baseline_inicializacao.json
+    python benchmarks/inicializacao.py --salvar-baseline benchmarks/corpus/baseline_inicializacao.json
+
+Cada medida é o menor tempo das repetições (como o timeit): o ruído da
+máquina só atrasa uma subida, nunca a adianta. Com --baseline, um
+aumento acima de --tolerancia em qualquer medida conta como regressão e
+o script termina com código 1.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FALA = "contratei o Eduardo para plantar soja no talhão 5 por 3000 reais"
+
+
+def _importtime() -> Dict[str, Dict[str, int]]:
+    """Tempo próprio e acumulado (µs) de cada módulo importado por `import main`"""
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=RAIZ_API, capture_output=True, text=True, check=True
+    ).stderr
+    modulos = {}
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        modulos[nome.strip()] = {'proprio': int(proprio), 'acumulado': int(acumulado)}
+    return modulos
+
+
+def medir_importacao(repeticoes: int, principais: int) -> dict:
+    totais = []
+    por_pacote: Dict[str, List[int]] = defaultdict(list)
+    projeto: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(repeticoes):
+        modulos = _importtime()
+        totais.append(modulos['main']['acumulado'])
+        somas: Dict[str, int] = defaultdict(int)
+        for nome, tempos in modulos.items():
+            somas[nome.split('.')[0]] += tempos['proprio']
+            if nome.startswith('src.') or nome == 'main':
+                projeto[nome].append(tempos['acumulado'])
+        for pacote, soma in somas.items():
+            por_pacote[pacote].append(soma)
+
+    def menor_ms(valores: List[int]) -> float:
+        return round(min(valores) / 1000, 1)
+
+    pacotes = sorted(por_pacote.items(), key=lambda item: -min(item[1]))
+    modulos_projeto = sorted(projeto.items(), key=lambda item: -min(item[1]))
+    return {
+        'total_ms': menor_ms(totais),
+        'pacotes_ms': {nome: menor_ms(valores) for nome, valores in pacotes[:principais]},
+        'projeto_acumulado_ms': {
+            nome: menor_ms(valores) for nome, valores in modulos_projeto[:principais]
+        },
+    }
+
+
+def _porta_livre() -> int:
+    with socket.socket() as conexao:
+        conexao.bind(("127.0.0.1", 0))
+        return conexao.getsockname()[1]
+
+
+def _primeira_resposta(env: dict, timeout: float = 60.0) -> dict:
+    """Sobe o servidor e mede até o primeiro /health e a primeira fala"""
+    porta = _porta_livre()
+    base = f"http://127.0.0.1:{porta}"
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--log-level", "warning"],
+        cwd=RAIZ_API, env=env, stdout=subprocess.DEVNULL
+    )
+    try:
+        limite = time.monotonic() + timeout
+        while True:
+            try:
+                urllib.request.urlopen(base + "/health", timeout=5).read()
+                break
+            except OSError:
+                if processo.poll() is not None or time.monotonic() > limite:
+                    raise RuntimeError("Servidor não subiu")
+                time.sleep(0.005)
+        saude = time.perf_counter() - inicio
+
+        corpo = json.dumps({"texto": FALA, "usuario_id": "bench"}).encode()
+        requisicao = urllib.request.Request(
+            base + "/api/v1/processar-fala", data=corpo, headers={"Content-Type": "application/json"}
+        )
+        antes_fala = time.perf_counter()
+        with urllib.request.urlopen(requisicao, timeout=timeout) as resposta:
+            resposta.read()
+        fim = time.perf_counter()
+        return {
+            'health_ms': saude * 1000,
+            'primeira_fala_ms': (fim - inicio) * 1000,
+            'latencia_primeira_fala_ms': (fim - antes_fala) * 1000,
+        }
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def medir_primeira_resposta(repeticoes: int, executor: str) -> dict:
+    banco = os.path.join(tempfile.mkdtemp(prefix="agrovoz-bench-"), "inicializacao.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{banco}", NLP_EXECUTOR=executor)
+    subprocess.run(
+        [sys.executable, "-m", "src.database.migracoes", "atualizar"],
+        cwd=RAIZ_API, env=env, check=True, stdout=subprocess.DEVNULL
+    )
+    medidas: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(repeticoes):
+        for nome, valor in _primeira_resposta(env).items():
+            medidas[nome].append(valor)
+    return {nome: round(min(valores), 1) for nome, valores in medidas.items()}
+
+
+def executar(repeticoes: int, executor: str, principais: int) -> dict:
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'repeticoes': repeticoes,
+        'executor': executor,
+        'importacao': medir_importacao(repeticoes, principais),
+        'primeira_resposta': medir_primeira_resposta(repeticoes, executor),
+    }
+
+
+# Medidas comparadas com o baseline (seção, medida)
+MEDIDAS = (
+    ('importacao', 'total_ms'),
+    ('primeira_resposta', 'health_ms'),
+    ('primeira_resposta', 'primeira_fala_ms'),
+)
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> dict:
+    variacoes = {}
+    regressoes = []
+    if baseline.get('executor') != atual['executor']:
+        regressoes.append(f"baseline medido com executor '{baseline.get('executor')}'")
+    for secao, medida in MEDIDAS:
+        base = baseline.get(secao, {}).get(medida)
+        if not base:
+            continue
+        valor = atual[secao][medida]
+        variacao = (valor - base) / base
+        variacoes[f"{secao}.{medida}"] = round(variacao, 4)
+        if variacao > tolerancia:
+            regressoes.append(f"{secao} {medida}: {base} -> {valor} (+{variacao:.0%})")
+    return {
+        'baseline_gerado_em': baseline.get('gerado_em'),
+        'variacao': variacoes,
+        'regressoes': regressoes,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--executor", default="local", help="NLP_EXECUTOR do servidor ('local' ou 'processos')")
+    parser.add_argument("--principais", type=int, default=10, help="Pacotes e módulos listados")
+    parser.add_argument("--baseline", help="Relatório salvo para comparação")
+    parser.add_argument("--salvar-baseline", help="Gravar o relatório como novo baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.repeticoes, args.executor, args.principais)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            relatorio['comparacao'] = comparar(relatorio, json.load(arquivo), args.tolerancia)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+
+    if relatorio.get('comparacao', {}).get('regressoes'):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Benchmark do pipeline de NLP: latência por etapa, throughput e qualidade.
+
+Roda o ProcessadorNLPRural sobre o corpus rotulado (benchmarks/corpus/
+rotulado.jsonl) e/ou um corpus sintético (gerador_corpus.py) e mede:
+
+- latência p50/p99/média de processar_texto e de cada etapa
+  (_limpar_texto, varredura dos padrões, cada _extrair_*,
+  ValidadorDados.validar_dados, confiança e sugestões);
+- throughput de processar_texto (falas/s, laço sem cronômetro por item);
+- precisão e revocação por campo contra os rótulos.
+
+O cache de resultados do processador fica desligado (senão falas repetidas
+medem o cache, não a extração); --com-cache mede com ele.
+
+O relatório sai em JSON. Com --baseline, é comparado a um relatório salvo:
+latências acima de --tolerancia-latencia, throughput abaixo dela ou
+precisão/revocação caindo mais que --tolerancia-qualidade contam como
+regressão e o script termina com código 1.
+
+    python benchmarks/nlp_extracao.py --sintetico 100000
+    python benchmarks/nlp_extracao.py --baseline benchmarks/corpus/baseline_nlp.json
+    python benchmarks/nlp_extracao.py --salvar-baseline benchmarks/corpus/baseline_nlp.json
+
+Formato do corpus (JSONL): {"texto": ..., "esperado": {campo: valor}};
+campos ausentes em "esperado" significam "nada a extrair".
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from array import array
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_ROTULADO = os.path.join(RAIZ_API, "benchmarks", "corpus", "rotulado.jsonl")
+
+CAMPOS = (
+    'tipo_atividade', 'pessoa_envolvida', 'servico_realizado', 'cultura',
+    'talhao', 'valor_monetario', 'quantidade', 'unidade_medida'
+)
+
+# Tipo atribuído quando nenhuma atividade é reconhecida: conta como "sem valor"
+TIPO_INDEFINIDO = 'atividade_geral'
+
+
+class Amostra:
+    """
+    Tempos de uma etapa: contagem e soma exatas e um reservatório de tamanho
+    fixo para os percentis, para caber em memória com milhões de falas
+    """
+
+    def __init__(self, maximo: int = 200_000, semente: int = 0):
+        self.maximo = maximo
+        self.valores = array('d')
+        self.contagem = 0
+        self.soma = 0.0
+        self._aleatorio = random.Random(semente)
+
+    def adicionar(self, valor: float):
+        self.contagem += 1
+        self.soma += valor
+        if len(self.valores) < self.maximo:
+            self.valores.append(valor)
+        else:
+            posicao = self._aleatorio.randrange(self.contagem)
+            if posicao < self.maximo:
+                self.valores[posicao] = valor
+
+    def resumo(self) -> Dict[str, float]:
+        ordenados = sorted(self.valores)
+        if not ordenados:
+            return {'p50_us': 0.0, 'p99_us': 0.0, 'media_us': 0.0}
+
+        def percentil(p):
+            return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+        return {
+            'p50_us': round(percentil(0.50), 3),
+            'p99_us': round(percentil(0.99), 3),
+            'media_us': round(self.soma / self.contagem, 3),
+        }
+
+
+class Qualidade:
+    """Verdadeiros/falsos positivos e falsos negativos por campo"""
+
+    def __init__(self):
+        self.contagens = {campo: [0, 0, 0] for campo in CAMPOS}  # vp, fp, fn
+
+    @staticmethod
+    def _normalizar(campo: str, valor):
+        if valor is None or (campo == 'tipo_atividade' and valor == TIPO_INDEFINIDO):
+            return None
+        if isinstance(valor, str):
+            return valor.strip().lower()
+        if isinstance(valor, (int, float)):
+            return round(float(valor), 2)
+        return valor
+
+    def registrar(self, extraido: Dict, esperado: Dict):
+        for campo in CAMPOS:
+            obtido = self._normalizar(campo, extraido.get(campo))
+            correto = self._normalizar(campo, esperado.get(campo))
+            contagem = self.contagens[campo]
+            if obtido is not None and obtido == correto:
+                contagem[0] += 1
+                continue
+            if obtido is not None:
+                contagem[1] += 1
+            if correto is not None:
+                contagem[2] += 1
+
+    def resumo(self) -> Dict[str, Dict[str, float]]:
+        resultado = {}
+        total = [0, 0, 0]
+        for campo, contagem in self.contagens.items():
+            resultado[campo] = self._metricas(*contagem)
+            total = [t + c for t, c in zip(total, contagem)]
+        resultado['_geral'] = self._metricas(*total)
+        return resultado
+
+    @staticmethod
+    def _metricas(vp: int, fp: int, fn: int) -> Dict[str, float]:
+        precisao = vp / (vp + fp) if vp + fp else 1.0
+        revocacao = vp / (vp + fn) if vp + fn else 1.0
+        f1 = 2 * precisao * revocacao / (precisao + revocacao) if precisao + revocacao else 0.0
+        return {
+            'precisao': round(precisao, 4),
+            'revocacao': round(revocacao, 4),
+            'f1': round(f1, 4),
+            'suporte': vp + fn,
+        }
+
+
+def _ler_corpus(caminho: str) -> List[dict]:
+    with open(caminho, encoding="utf-8") as arquivo:
+        return [json.loads(linha) for linha in arquivo if linha.strip()]
+
+
+def _medir_etapas(processador, falas: Iterable[dict], etapas: Dict[str, Amostra],
+                  qualidade: Qualidade) -> int:
+    """Executa o pipeline etapa por etapa, cronometrando cada uma"""
+    relogio = time.perf_counter_ns
+    total = 0
+
+    def medir(nome, funcao, *args):
+        inicio = relogio()
+        resultado = funcao(*args)
+        etapas[nome].adicionar((relogio() - inicio) / 1000)
+        return resultado
+
+    for fala in falas:
+        texto_limpo = medir('limpar_texto', processador._limpar_texto, fala['texto'])
+        varredura = medir('varredura_padroes', processador.motor.varrer, texto_limpo)
+        campos = {
+            'tipo_atividade': medir('classificar_atividade', processador._classificar_atividade, texto_limpo, varredura),
+            'pessoa_envolvida': medir('extrair_pessoa', processador._extrair_pessoa, texto_limpo, varredura),
+            'servico_realizado': medir('extrair_servico', processador._extrair_servico, texto_limpo, varredura),
+            'cultura': medir('extrair_cultura', processador._extrair_cultura, texto_limpo, varredura),
+            'talhao': medir('extrair_talhao', processador._extrair_talhao, texto_limpo, varredura),
+            'valor_monetario': medir('extrair_valor', processador._extrair_valor, texto_limpo, varredura),
+        }
+        campos['quantidade'], campos['unidade_medida'] = medir(
+            'extrair_quantidade_unidade', processador._extrair_quantidade_unidade, texto_limpo, varredura
+        )
+        medir('validar_dados', processador.validador.validar_dados, campos)
+        medir('confianca_sugestoes', lambda: (
+            processador._calcular_confianca(tuple(campos.values()), 'benchmark'),
+            processador._gerar_sugestoes(campos, texto_limpo)
+        ))
+        qualidade.registrar(campos, fala['esperado'])
+        total += 1
+    return total
+
+
+def _medir_ponta_a_ponta(processador, falas: Iterable[dict], amostra: Amostra):
+    relogio = time.perf_counter_ns
+    for fala in falas:
+        inicio = relogio()
+        processador.processar_texto(fala['texto'], 'benchmark')
+        amostra.adicionar((relogio() - inicio) / 1000)
+
+
+def _medir_throughput(processador, textos: List[str], duracao_minima: float = 1.0) -> float:
+    """Falas por segundo repetindo o lote até passar de `duracao_minima`"""
+    processar = processador.processar_texto
+    processadas = 0
+    inicio = time.perf_counter()
+    while True:
+        for texto in textos:
+            processar(texto, 'benchmark')
+        processadas += len(textos)
+        decorrido = time.perf_counter() - inicio
+        if decorrido >= duracao_minima:
+            return processadas / decorrido
+
+
+def executar(sintetico: int, semente: int, com_cache: bool, usar_rotulado: bool = True) -> dict:
+    sys.path.insert(0, RAIZ_API)
+    from src.nlp.processador import ProcessadorNLPRural
+    import gerador_corpus
+
+    processador = ProcessadorNLPRural()
+    if not com_cache:
+        processador.cache_resultados = None
+
+    conjuntos = {}
+    if usar_rotulado:
+        rotulado = _ler_corpus(CORPUS_ROTULADO)
+        conjuntos['rotulado'] = (len(rotulado), lambda: iter(rotulado))
+    if sintetico:
+        conjuntos['sintetico'] = (sintetico, lambda: gerador_corpus.gerar(sintetico, semente))
+
+    # Aquecimento: compilações preguiçosas e caches da CPU fora da medição
+    for fala in gerador_corpus.gerar(200, semente + 1):
+        processador.processar_texto(fala['texto'], 'benchmark')
+
+    etapas: Dict[str, Amostra] = defaultdict(Amostra)
+    ponta_a_ponta = Amostra()
+    qualidade = {}
+    for nome, (_, falas) in conjuntos.items():
+        qualidade[nome] = Qualidade()
+        _medir_etapas(processador, falas(), etapas, qualidade[nome])
+        _medir_ponta_a_ponta(processador, falas(), ponta_a_ponta)
+
+    # Throughput sobre uma amostra fixa do corpus, em laço sem cronômetro
+    textos = [fala['texto'] for fala in gerador_corpus.gerar(min(sintetico or 5000, 20_000), semente)]
+    if usar_rotulado:
+        textos += [fala['texto'] for fala in _ler_corpus(CORPUS_ROTULADO)]
+
+    return {
+        'versao_relatorio': 1,
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'processador': platform.processor() or platform.machine(),
+        },
+        'corpus': {nome: quantidade for nome, (quantidade, _) in conjuntos.items()},
+        'semente': semente,
+        'com_cache': com_cache,
+        'latencia': {
+            'processar_texto': ponta_a_ponta.resumo(),
+            'etapas': {nome: amostra.resumo() for nome, amostra in etapas.items()},
+        },
+        'throughput_falas_por_s': round(_medir_throughput(processador, textos), 1),
+        'qualidade': {nome: q.resumo() for nome, q in qualidade.items()},
+    }
+
+
+def comparar(atual: dict, baseline: dict, tolerancia_latencia: float,
+             tolerancia_qualidade: float) -> dict:
+    """Diferenças contra o baseline e lista de regressões"""
+    regressoes = []
+    latencias = {}
+
+    def latencia(nome, atual_resumo, base_resumo):
+        for metrica in ('p50_us', 'p99_us'):
+            base = base_resumo.get(metrica)
+            valor = atual_resumo.get(metrica)
+            if not base or valor is None:
+                continue
+            variacao = (valor - base) / base
+            latencias[f"{nome}.{metrica}"] = round(variacao, 4)
+            if variacao > tolerancia_latencia:
+                regressoes.append(f"{nome} {metrica}: {base} -> {valor} us (+{variacao:.0%})")
+
+    latencia('processar_texto', atual['latencia']['processar_texto'],
+             baseline['latencia']['processar_texto'])
+    for etapa, resumo in atual['latencia']['etapas'].items():
+        if etapa in baseline['latencia']['etapas']:
+            latencia(etapa, resumo, baseline['latencia']['etapas'][etapa])
+
+    base_throughput = baseline.get('throughput_falas_por_s')
+    variacao_throughput = None
+    if base_throughput:
+        variacao_throughput = (atual['throughput_falas_por_s'] - base_throughput) / base_throughput
+        if variacao_throughput < -tolerancia_latencia:
+            regressoes.append(
+                f"throughput: {base_throughput} -> {atual['throughput_falas_por_s']} falas/s "
+                f"({variacao_throughput:.0%})"
+            )
+
+    qualidade = {}
+    for conjunto, campos in atual['qualidade'].items():
+        base_campos = baseline.get('qualidade', {}).get(conjunto)
+        if not base_campos:
+            continue
+        for campo, metricas in campos.items():
+            base = base_campos.get(campo)
+            if not base:
+                continue
+            for metrica in ('precisao', 'revocacao'):
+                diferenca = metricas[metrica] - base[metrica]
+                qualidade[f"{conjunto}.{campo}.{metrica}"] = round(diferenca, 4)
+                if diferenca < -tolerancia_qualidade:
+                    regressoes.append(
+                        f"{conjunto} {campo} {metrica}: {base[metrica]} -> {metricas[metrica]}"
+                    )
+
+    return {
+        'baseline_gerado_em': baseline.get('gerado_em'),
+        'variacao_latencia': latencias,
+        'variacao_throughput': round(variacao_throughput, 4) if variacao_throughput is not None else None,
+        'diferenca_qualidade': qualidade,
+        'regressoes': regressoes,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sintetico", type=int, default=20_000, help="Falas sintéticas (0 para nenhuma)")
+    parser.add_argument("--sem-rotulado", action="store_true", help="Não usar o corpus rotulado")
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--com-cache", action="store_true", help="Manter o cache de resultados ligado")
+    parser.add_argument("--saida", help="Gravar o relatório JSON neste arquivo")
+    parser.add_argument("--baseline", help="Relatório salvo para comparação")
+    parser.add_argument("--salvar-baseline", help="Gravar o relatório como novo baseline")
+    parser.add_argument("--tolerancia-latencia", type=float, default=0.25)
+    parser.add_argument("--tolerancia-qualidade", type=float, default=0.005)
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.sintetico, args.semente, args.com_cache, not args.sem_rotulado)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+        relatorio['comparacao'] = comparar(
+            relatorio, baseline, args.tolerancia_latencia, args.tolerancia_qualidade
+        )
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    print(texto)
+    for destino in (args.saida, args.salvar_baseline):
+        if destino:
+            with open(destino, "w", encoding="utf-8") as arquivo:
+                arquivo.write(texto + "\n")
+
+    regressoes = relatorio.get('comparacao', {}).get('regressoes', [])
+    for regressao in regressoes:
+        print(f"REGRESSÃO: {regressao}", file=sys.stderr)
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
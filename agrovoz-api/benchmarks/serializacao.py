@@ -0,0 +1,146 @@
+"""
+Micro-benchmark do custo de montar e serializar respostas, por 1.000 registros.
+
+Compara o caminho antigo com o atual:
+
+- listagem: objetos ORM + jsonable_encoder + JSONResponse, contra colunas
+  selecionadas como dicts + ORJSONResponse;
+- processar-fala: ProcessarFalaResponse montado a partir de dicts e passado
+  pelo serialize_response do FastAPI (response_model) + JSONResponse, contra
+  o dict da resposta direto no ORJSONResponse.
+
+Usa SQLite em memória e o próprio serialize_response do FastAPI, para medir
+o mesmo trabalho que a rota fazia.
+
+    python benchmarks/serializacao.py --registros 1000 --repeticoes 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FRASES = [
+    "contratei o Eduardo para plantar soja no talhão 5 por 3000 reais",
+    "paguei o João 150 reais para pulverizar talhão 3",
+    "comprei 20 sacas de adubo por 2 mil reais",
+    "colhi 300 sacas de milho na gleba 12",
+    "apliquei 40 litros de herbicida no talhão 7 custou 800 reais",
+]
+
+
+def _medir(funcao, repeticoes: int) -> float:
+    """Mediana do tempo de `funcao`, em ms"""
+    funcao()
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return tempos[len(tempos) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registros", type=int, default=1000)
+    parser.add_argument("--repeticoes", type=int, default=30)
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = "sqlite:///:memory:"
+    sys.path.insert(0, RAIZ_API)
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse, ORJSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from src.api.routes import _dados_para_banco, _montar_resposta
+    from src.database.connection import SessionLocal, DatabaseService, create_tables
+    from src.database.models import RegistroRural
+    from src.nlp.processador import ProcessadorNLPRural
+    from src.schemas.request_response import ProcessarFalaResponse
+
+    create_tables()
+    db = SessionLocal()
+    servico = DatabaseService(db)
+    processador = ProcessadorNLPRural()
+    resultados_nlp = [
+        processador.processar_texto(FRASES[i % len(FRASES)], "bench")
+        for i in range(args.registros)
+    ]
+    servico.criar_registros([_dados_para_banco(resultado) for resultado in resultados_nlp])
+
+    # Listagem
+    def consulta_orm():
+        db.expunge_all()
+        return db.query(RegistroRural).filter(RegistroRural.usuario_id == "bench")\
+                 .order_by(RegistroRural.data_registro.desc()).limit(args.registros).all()
+
+    def consulta_colunas():
+        return servico.buscar_registros_usuario("bench", args.registros)
+
+    registros_orm = consulta_orm()
+    registros_dict = consulta_colunas()
+
+    def listagem_antes():
+        return JSONResponse(jsonable_encoder({"registros": registros_orm, "total": len(registros_orm)})).body
+
+    def listagem_depois():
+        return ORJSONResponse({"registros": registros_dict, "total": len(registros_dict)}).body
+
+    # processar-fala
+    campo = create_model_field(name="Response", type_=ProcessarFalaResponse, mode="serialization")
+    laco = asyncio.new_event_loop()
+
+    def resposta_antes():
+        async def serializar():
+            corpos = []
+            for registro_id, resultado in enumerate(resultados_nlp):
+                modelo = ProcessarFalaResponse(
+                    id=registro_id,
+                    dados_extraidos=resultado.dados(),
+                    validacao=resultado.validacao,
+                    confianca=resultado.confianca,
+                    sugestoes=resultado.sugestoes
+                )
+                conteudo = await serialize_response(field=campo, response_content=modelo)
+                corpos.append(JSONResponse(conteudo).body)
+            return corpos
+        return laco.run_until_complete(serializar())
+
+    def resposta_depois():
+        return [
+            ORJSONResponse(_montar_resposta(registro_id, resultado)).body
+            for registro_id, resultado in enumerate(resultados_nlp)
+        ]
+
+    # Conferir que os dois caminhos produzem o mesmo conteúdo
+    assert json.loads(listagem_antes())["total"] == json.loads(listagem_depois())["total"]
+    antes, depois = json.loads(resposta_antes()[0]), json.loads(resposta_depois()[0])
+    assert antes == depois, (antes, depois)
+
+    escala = 1000 / args.registros
+    relatorio = {
+        "registros": args.registros,
+        "ms_por_1000_registros": {
+            "listagem_consulta_orm": _medir(consulta_orm, args.repeticoes) * escala,
+            "listagem_consulta_colunas": _medir(consulta_colunas, args.repeticoes) * escala,
+            "listagem_serializacao_antes": _medir(listagem_antes, args.repeticoes) * escala,
+            "listagem_serializacao_depois": _medir(listagem_depois, args.repeticoes) * escala,
+            "processar_fala_resposta_antes": _medir(resposta_antes, args.repeticoes) * escala,
+            "processar_fala_resposta_depois": _medir(resposta_depois, args.repeticoes) * escala,
+        }
+    }
+    relatorio["ms_por_1000_registros"] = {
+        nome: round(valor, 3) for nome, valor in relatorio["ms_por_1000_registros"].items()
+    }
+    laco.close()
+    db.close()
+
+    print(json.dumps(relatorio, indent=2))
+
+
+if __name__ == "__main__":
+    main()
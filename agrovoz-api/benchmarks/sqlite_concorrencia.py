@@ -0,0 +1,160 @@
+"""
+Benchmark de leitura e escrita concorrentes no SQLite.
+
+Para cada SQLITE_MODO ('padrao' e 'otimizado'), roda um processo com um
+banco novo, carrega alguns registros e mantém por alguns segundos threads
+leitoras (listagem paginada e estatísticas) e escritoras (criar_registro,
+uma transação por registro, como a ingestão síncrona). Reporta operações
+por segundo, latências e erros (como "database is locked") de cada lado.
+
+    python benchmarks/sqlite_concorrencia.py
+    python benchmarks/sqlite_concorrencia.py --leitores 16 --escritores 4 --duracao 10
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TIPOS = ['plantio', 'colheita', 'venda', 'contratacao', 'compra_insumo', 'pulverizacao']
+CULTURAS = ['Soja', 'Milho', 'Café', 'Algodão', None]
+USUARIOS = [f"bench_{i}" for i in range(20)]
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def _registro(aleatorio: random.Random, usuario_id: str, data_registro=None) -> dict:
+    dados = {
+        "usuario_id": usuario_id,
+        "tipo_atividade": aleatorio.choice(TIPOS),
+        "descricao_original": "benchmark",
+        "cultura": aleatorio.choice(CULTURAS),
+        "talhao": aleatorio.randint(1, 30),
+        "valor_monetario": aleatorio.choice([None, 150.0, 3000.0]),
+    }
+    if data_registro is not None:
+        dados["data_registro"] = data_registro
+    return dados
+
+
+def _medir(args) -> dict:
+    """Executado no processo filho, com DATABASE_URL e SQLITE_MODO já definidos"""
+    sys.path.insert(0, RAIZ_API)
+    from src.database.connection import SessionLocal, DatabaseService, create_tables
+
+    create_tables()
+    aleatorio = random.Random(42)
+    inicio_ano = datetime.now() - timedelta(days=365)
+    db = SessionLocal()
+    servico = DatabaseService(db)
+    for _ in range(0, args.registros, 1000):
+        servico.criar_registros([
+            _registro(aleatorio, aleatorio.choice(USUARIOS),
+                      inicio_ano + timedelta(seconds=aleatorio.randrange(365 * 86400)))
+            for _ in range(min(1000, args.registros))
+        ])
+    db.close()
+
+    parar = threading.Event()
+    resultados = {"leitura": ([], []), "escrita": ([], [])}
+
+    def ler(semente: int):
+        aleatorio = random.Random(semente)
+        latencias, erros = resultados["leitura"]
+        while not parar.is_set():
+            db = SessionLocal()
+            inicio = time.perf_counter()
+            try:
+                servico = DatabaseService(db)
+                usuario_id = aleatorio.choice(USUARIOS)
+                if aleatorio.random() < 0.8:
+                    servico.buscar_registros_usuario(usuario_id, limit=50)
+                else:
+                    hoje = date.today()
+                    servico.obter_estatisticas(usuario_id, hoje - timedelta(days=30), hoje)
+                latencias.append(time.perf_counter() - inicio)
+            except Exception as e:
+                erros.append(type(e).__name__)
+            finally:
+                db.close()
+
+    def escrever(semente: int):
+        aleatorio = random.Random(semente)
+        latencias, erros = resultados["escrita"]
+        while not parar.is_set():
+            db = SessionLocal()
+            inicio = time.perf_counter()
+            try:
+                DatabaseService(db).criar_registro(_registro(aleatorio, aleatorio.choice(USUARIOS)))
+                latencias.append(time.perf_counter() - inicio)
+            except Exception as e:
+                erros.append(type(e).__name__)
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=ler, args=(i,)) for i in range(args.leitores)]
+    threads += [threading.Thread(target=escrever, args=(1000 + i,)) for i in range(args.escritores)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duracao)
+    parar.set()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    relatorio = {}
+    for tipo, (latencias, erros) in resultados.items():
+        relatorio[tipo] = {
+            "operacoes": len(latencias),
+            "por_segundo": round(len(latencias) / duracao, 1),
+            "p50_ms": round(_percentil(latencias, 0.5) * 1000, 2) if latencias else None,
+            "p99_ms": round(_percentil(latencias, 0.99) * 1000, 2) if latencias else None,
+            "erros": len(erros),
+            "tipos_erro": sorted(set(erros)),
+        }
+    return relatorio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modos", default="padrao,otimizado", help="SQLITE_MODO a comparar")
+    parser.add_argument("--registros", type=int, default=20_000, help="Registros carregados antes da medição")
+    parser.add_argument("--leitores", type=int, default=8)
+    parser.add_argument("--escritores", type=int, default=4)
+    parser.add_argument("--duracao", type=float, default=5.0, help="Segundos de medição por modo")
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(_medir(args)))
+        return
+
+    relatorio = {}
+    for modo in args.modos.split(","):
+        banco = os.path.join(tempfile.mkdtemp(prefix="agrovoz-bench-"), "concorrencia.db")
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{banco}", SQLITE_MODO=modo)
+        saida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--filho",
+             "--registros", str(args.registros), "--leitores", str(args.leitores),
+             "--escritores", str(args.escritores), "--duracao", str(args.duracao)],
+            cwd=RAIZ_API, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        # A última linha é o JSON; antes dela vêm as mensagens da aplicação
+        relatorio[modo] = json.loads(saida.strip().splitlines()[-1])
+
+    print(json.dumps(relatorio, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Validação com a tabela de regras compilada (src/nlp/regras.py).
+
+Valida os campos extraídos das falas do corpus sintético (processar_texto
+com o cache de resultados desligado), com as regras padrão e com as de
+um usuário com limites, culturas e talhões próprios. Mede por registro:
+
+- validar_us: RegrasCompiladas.validar, um registro por chamada;
+- validar_lote_us: RegrasCompiladas.validar_lote, o corpus em lotes de
+  --lote registros;
+- processar_texto_us / processar_lote_us: o NLP inteiro, fala a fala e
+  com ProcessadorNLPRural.processar_lote (caminho da ingestão em lote e
+  da reextração);
+- compilar_ms: compilar() das regras de um usuário (uma vez por versão
+  do vocabulário);
+- divergencias: registros em que validar_lote difere de validar, ou
+  processar_lote de processar_texto (tem que ser 0).
+
+    python benchmarks/validacao_regras.py
+    python benchmarks/validacao_regras.py --baseline benchmarks/corpus/baseline_validacao.json
+    python benchmarks/validacao_regras.py --salvar-baseline benchmarks/corpus/baseline_validacao.json
+
+Cada tempo é o menor das repetições. Com --baseline, um aumento acima de
+--tolerancia em validar_us ou validar_lote_us, ou qualquer divergência,
+conta como regressão e o script termina com código 1.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Usuário com tudo o que muda as regras cadastrado
+LIMITES_USUARIO = {'valor_maximo': 20000, 'kg_maximo': 10000, 'nome_minimo': 3}
+TALHOES_USUARIO = (1, 2, 3, 4, 5, 7, 12)
+CULTURAS_USUARIO = ('eucalipto', 'mandioca')
+
+
+def _congelada(validacao: dict) -> dict:
+    """Validação com as listas como tuplas, como validar_lote devolve"""
+    return {chave: tuple(valor) if isinstance(valor, list) else valor for chave, valor in validacao.items()}
+
+
+def _menor_us(funcao, registros: int, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return round(min(tempos) / registros * 1e6, 2)
+
+
+def _medir_regras(regras, registros, lote: int, repeticoes: int) -> dict:
+    lotes = [registros[inicio:inicio + lote] for inicio in range(0, len(registros), lote)]
+    validados = [validacao for parte in lotes for validacao in regras.validar_lote(parte)]
+    divergencias = sum(
+        1 for dados, validacao in zip(registros, validados) if _congelada(regras.validar(dados)) != validacao
+    )
+    com_mensagens = sum(
+        1 for validacao in validados if validacao['erros'] or validacao['alertas'] or validacao['sugestoes']
+    )
+    return {
+        'validar_us': _menor_us(lambda: [regras.validar(dados) for dados in registros], len(registros), repeticoes),
+        'validar_lote_us': _menor_us(
+            lambda: [regras.validar_lote(parte) for parte in lotes], len(registros), repeticoes
+        ),
+        'com_mensagens': round(com_mensagens / len(registros), 3),
+        'divergencias': divergencias,
+    }
+
+
+def executar(falas: int, lote: int, repeticoes: int, semente: int) -> dict:
+    sys.path.insert(0, RAIZ_API)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import gerador_corpus
+    from src.nlp.processador import ProcessadorNLPRural
+    from src.nlp.regras import compilar
+    from src.nlp.resultado import CAMPOS_EXTRAIDOS
+    from src.nlp.vocabulario import VocabularioUsuario
+
+    processador = ProcessadorNLPRural()
+    processador.cache_resultados = None
+    textos = [fala['texto'] for fala in gerador_corpus.gerar(falas, semente)]
+    vocabulario = VocabularioUsuario(
+        'benchmark', culturas=CULTURAS_USUARIO, talhoes=TALHOES_USUARIO, limites=LIMITES_USUARIO
+    )
+    registros = [
+        {campo: getattr(resultado, campo) for campo in CAMPOS_EXTRAIDOS}
+        for resultado in (processador.processar_texto(texto, 'benchmark') for texto in textos)
+    ]
+
+    inicio = time.perf_counter()
+    regras_usuario = compilar(vocabulario)
+    compilar_ms = round((time.perf_counter() - inicio) * 1000, 2)
+
+    # NLP inteiro, metade das falas com o vocabulário do usuário
+    itens = [
+        (texto, 'benchmark', vocabulario if indice % 2 else None) for indice, texto in enumerate(textos)
+    ]
+    lotes = [itens[inicio:inicio + lote] for inicio in range(0, len(itens), lote)]
+    divergencias = 0
+    for parte in lotes:
+        for (texto, usuario_id, vocab), (sucesso, resultado) in zip(parte, processador.processar_lote(parte)):
+            esperado = processador.processar_texto(texto, usuario_id, vocab)
+            if not sucesso or resultado.validacao != esperado.validacao or resultado.sugestoes != esperado.sugestoes:
+                divergencias += 1
+
+    return {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'registros': len(registros),
+        'lote': lote,
+        'repeticoes': repeticoes,
+        'compilar_ms': compilar_ms,
+        'regras': {
+            'padrao': _medir_regras(compilar(), registros, lote, repeticoes),
+            'usuario': _medir_regras(regras_usuario, registros, lote, repeticoes),
+        },
+        'processador': {
+            'processar_texto_us': _menor_us(
+                lambda: [processador.processar_texto(*item) for item in itens], len(itens), repeticoes
+            ),
+            'processar_lote_us': _menor_us(
+                lambda: [processador.processar_lote(parte) for parte in lotes], len(itens), repeticoes
+            ),
+            'divergencias': divergencias,
+        },
+    }
+
+
+# Medidas comparadas com o baseline
+MEDIDAS = ('validar_us', 'validar_lote_us')
+
+
+def comparar(atual: dict, baseline: dict, tolerancia: float) -> dict:
+    variacoes = {}
+    regressoes = []
+    if atual['processador']['divergencias']:
+        regressoes.append(f"processar_lote: {atual['processador']['divergencias']} itens divergentes")
+    for nome, medidas in atual['regras'].items():
+        if medidas['divergencias']:
+            regressoes.append(f"{nome}: {medidas['divergencias']} registros divergentes")
+        for medida in MEDIDAS:
+            base = baseline.get('regras', {}).get(nome, {}).get(medida)
+            if not base:
+                continue
+            variacao = (medidas[medida] - base) / base
+            variacoes[f"{nome}.{medida}"] = round(variacao, 4)
+            if variacao > tolerancia:
+                regressoes.append(f"{nome} {medida}: {base} -> {medidas[medida]} (+{variacao:.0%})")
+    return {
+        'baseline_gerado_em': baseline.get('gerado_em'),
+        'variacao': variacoes,
+        'regressoes': regressoes,
+    }
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--falas", type=int, default=5000, help="Falas do corpus sintético validadas")
+    parser.add_argument("--lote", type=int, default=500, help="Registros por chamada de validar_lote")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--baseline", help="Relatório salvo para comparação")
+    parser.add_argument("--salvar-baseline", help="Gravar o relatório como novo baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    relatorio = executar(args.falas, args.lote, args.repeticoes, args.semente)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as arquivo:
+            relatorio['comparacao'] = comparar(relatorio, json.load(arquivo), args.tolerancia)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+
+    if relatorio.get('comparacao', {}).get('regressoes'):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
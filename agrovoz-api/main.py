@@ -1,29 +1,19 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from src.api.routes import router
-from src.database.connection import create_tables
+from src.api.routes import router, executor_nlp, gravador_registros, idempotencia
+from src.api.instrumentacao import MiddlewareMetricas
+from src.database.connection import create_tables, verificar_conexao, verificar_esquema
+from src.config import THREADPOOL_TAMANHO, SAUDE_DB_TIMEOUT_S, MIGRACOES_INICIALIZACAO
+from src import metricas
+from anyio import CapacityLimiter, fail_after, to_thread
 import os
 
-# Criar aplicação FastAPI
-app = FastAPI(
-    title="AgroVoz API",
-    description="API para processamento de comandos de voz rurais",
-    version="1.0.0"
-)
-
-# Configurar CORS para permitir acesso do app mobile
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Em produção, especificar domínios
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Incluir rotas da API
-app.include_router(router, prefix="/api/v1")
-
-@app.get("/")
+# Rotas fora de /api/v1: status, saúde e métricas
+rotas_servico = APIRouter()
+
+@rotas_servico.get("/")
 async def root():
     return {
         "message": "API Online",
@@ -31,15 +21,94 @@ async def root():
         "status": "online"
     }
 
-@app.get("/health")
+# Threads próprias do /health: o ping ao banco não espera na fila do
+# threadpool das rotas e no máximo 2 pings travados ficam pendurados
+_limitador_saude = None
+
+@rotas_servico.get("/health")
 async def health_check():
+    global _limitador_saude
+    if _limitador_saude is None:
+        _limitador_saude = CapacityLimiter(2)
+    try:
+        with fail_after(SAUDE_DB_TIMEOUT_S):
+            await to_thread.run_sync(verificar_conexao, abandon_on_cancel=True, limiter=_limitador_saude)
+    except TimeoutError:
+        return ORJSONResponse(
+            {"status": "unhealthy", "database": "timeout"}, status_code=503
+        )
+    except Exception as e:
+        # O detalhe (host, driver, SQL) só vai para o log: /health é público
+        print(f"Health check: banco com erro: {type(e).__name__}: {e}")
+        return ORJSONResponse(
+            {"status": "unhealthy", "database": "error"}, status_code=503
+        )
     return {"status": "healthy", "database": "connected"}
 
-@app.on_event("startup")
-async def startup_event():
+@rotas_servico.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(metricas.exportar(), media_type=metricas.TIPO_CONTEUDO)
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
     print("Iniciando AgroVoz API...")
-    create_tables()
-    print("Tabelas criadas/verificadas com sucesso!")
+    # Limita as rotas síncronas executando ao mesmo tempo
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_TAMANHO
+    # Sem banco a API não sobe: falhar aqui, e não com 500 nas requisições
+    # (é também aqui que o engine é criado, ver obter_engines)
+    try:
+        verificar_conexao()
+    except Exception as e:
+        print(f"Banco de dados indisponível: {e}")
+        raise
+    # O DDL roda antes, por `python -m src.database.migracoes atualizar`:
+    # vários workers subindo juntos não disputam o esquema
+    if MIGRACOES_INICIALIZACAO == "atualizar":
+        create_tables()
+    elif MIGRACOES_INICIALIZACAO == "verificar":
+        verificar_esquema()
+        print("Esquema do banco verificado")
+    # Processador do NLP e filtro de idempotência carregam em segundo plano:
+    # a API começa a atender antes, e as primeiras falas esperam o NLP
+    executor_nlp.iniciar(esperar=False)
+    gravador_registros.iniciar()
+    idempotencia.iniciar()
+    yield
+    print("Encerrando AgroVoz API...")
+    # Grava o que restou na fila de ingestão antes de desligar
+    gravador_registros.encerrar()
+    idempotencia.encerrar()
+    executor_nlp.encerrar()
+
+def criar_app() -> FastAPI:
+    """Aplicação FastAPI com middlewares e rotas; o que é caro fica no ciclo de vida"""
+    app = FastAPI(
+        title="AgroVoz API",
+        description="API para processamento de comandos de voz rurais",
+        version="1.0.0",
+        default_response_class=ORJSONResponse,
+        lifespan=ciclo_de_vida
+    )
+
+    # Configurar CORS para permitir acesso do app mobile
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Em produção, especificar domínios
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Latência por rota, exposta em /metrics
+    app.add_middleware(MiddlewareMetricas)
+
+    # Incluir rotas da API
+    app.include_router(router, prefix="/api/v1")
+    app.include_router(rotas_servico)
+    return app
+
+# Criar aplicação FastAPI (uvicorn main:app)
+app = criar_app()
 
 if __name__ == "__main__":
     import uvicorn
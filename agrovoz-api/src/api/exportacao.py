@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Iterable, Iterator, Sequence
+
+# Tamanho aproximado de cada pedaço enviado ao cliente
+TAMANHO_PEDACO = 64 * 1024
+
+
+def _valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def gerar_ndjson(linhas: Iterable[dict]) -> Iterator[bytes]:
+    """Um objeto JSON por linha, agrupados em pedaços de ~TAMANHO_PEDACO"""
+    buffer = []
+    tamanho = 0
+    for linha in linhas:
+        texto = json.dumps(linha, ensure_ascii=False, default=_valor_json) + "\n"
+        buffer.append(texto)
+        tamanho += len(texto)
+        if tamanho >= TAMANHO_PEDACO:
+            yield "".join(buffer).encode("utf-8")
+            buffer, tamanho = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def gerar_csv(linhas: Iterable[dict], colunas: Sequence[str]) -> Iterator[bytes]:
+    """CSV com cabeçalho, agrupado em pedaços de ~TAMANHO_PEDACO"""
+    buffer = io.StringIO()
+    # BOM para o Excel abrir acentos corretamente
+    buffer.write("\ufeff")
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for linha in linhas:
+        escritor.writerow([
+            valor.isoformat() if isinstance(valor, (datetime, date)) else valor
+            for valor in (linha[coluna] for coluna in colunas)
+        ])
+        if buffer.tell() >= TAMANHO_PEDACO:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def comprimir_gzip(pedacos: Iterable[bytes]) -> Iterator[bytes]:
+    """Comprime o fluxo em formato gzip sem acumular o arquivo inteiro"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for pedaco in pedacos:
+        comprimido = compressor.compress(pedaco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
@@ -0,0 +1,284 @@
+"""
+Idempotency-Key para /processar-fala.
+
+O app reenvia a mesma fala quando a conexão cai; com a mesma chave, o
+reenvio recebe a resposta original, sem rodar o NLP nem gravar de novo.
+
+As chaves ficam na tabela chaves_idempotencia, gravadas na mesma transação
+do registro. Na frente do banco:
+
+- um LRU com as respostas recentes, que atende os reenvios mais comuns
+  (segundos depois) sem consulta;
+- um filtro de Bloom com as chaves já vistas: chave nova (o caso comum)
+  não consulta o banco. O filtro só conhece as chaves deste processo e as
+  carregadas ao iniciar; uma chave gravada por outro worker escapa dele,
+  e aí a restrição única da tabela (e o id_externo derivado da chave)
+  impede a duplicata.
+
+Uma thread carrega as chaves válidas no filtro (a API atende enquanto
+isso, consultando o banco para toda chave) e depois apaga as chaves
+expiradas e gira as gerações do filtro.
+"""
+import hashlib
+import json
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+import orjson
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from src import metricas
+from src.config import (
+    IDEMPOTENCIA_TTL_S, IDEMPOTENCIA_CACHE_ITENS, IDEMPOTENCIA_BLOOM_CAPACIDADE,
+    IDEMPOTENCIA_PURGA_INTERVALO_S
+)
+from src.database.connection import SessionLocal
+from src.database.models import ChaveIdempotencia
+from src.nlp.cache import CacheLRU
+
+# Chaves apagadas por comando na limpeza
+LOTE_PURGA = 1000
+
+_CONSULTAS = metricas.contador(
+    'agrovoz_idempotencia_consultas_total', 'Consultas de Idempotency-Key por origem da resposta',
+    ('resultado',)
+)
+_REPETIDA_MEMORIA = _CONSULTAS.rotulado('repetida_memoria')
+_REPETIDA_BANCO = _CONSULTAS.rotulado('repetida_banco')
+_NOVA_BLOOM = _CONSULTAS.rotulado('nova_sem_consulta')
+_NOVA_BANCO = _CONSULTAS.rotulado('nova_consultada')
+_EXPIRADAS = metricas.contador(
+    'agrovoz_idempotencia_expiradas_total', 'Chaves de idempotência apagadas pela limpeza'
+).rotulado()
+
+
+class FiltroBloom:
+    """Filtro de Bloom para `capacidade` itens com a taxa de falsos positivos dada"""
+
+    def __init__(self, capacidade: int, taxa_falsos: float = 0.01):
+        self.num_bits = max(8, math.ceil(-capacidade * math.log(taxa_falsos) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacidade * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _posicoes(self, item: str):
+        # Hashing duplo: k posições a partir de dois hashes de 64 bits
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def adicionar(self, item: str):
+        posicoes = self._posicoes(item)
+        with self._lock:
+            for posicao in posicoes:
+                self._bits[posicao >> 3] |= 1 << (posicao & 7)
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(item))
+
+
+class BloomRotativo:
+    """
+    Duas gerações de filtro de Bloom, giradas a cada `duracao` segundos.
+
+    Um filtro não remove itens; girando, uma chave fica no filtro entre uma
+    e duas durações, o suficiente para cobrir o TTL, e o filtro não enche.
+    """
+
+    def __init__(self, capacidade: int, duracao: float):
+        self.capacidade = capacidade
+        self.duracao = duracao
+        self._atual = FiltroBloom(capacidade)
+        self._anterior = FiltroBloom(capacidade)
+        self._inicio_atual = time.monotonic()
+
+    def adicionar(self, item: str):
+        self._atual.adicionar(item)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self._atual or item in self._anterior
+
+    def girar_se_necessario(self):
+        if time.monotonic() - self._inicio_atual >= self.duracao:
+            self._anterior, self._atual = self._atual, FiltroBloom(self.capacidade)
+            self._inicio_atual = time.monotonic()
+
+
+def hash_requisicao(texto: str, id_externo: Optional[str]) -> str:
+    """Impressão digital do conteúdo enviado com a chave"""
+    return hashlib.sha1(f"{texto}\0{id_externo or ''}".encode('utf-8')).hexdigest()
+
+
+def id_externo_da_chave(usuario_id: str, chave: str) -> str:
+    """id_externo determinístico: reenvios com a mesma chave viram o mesmo registro"""
+    return hashlib.sha1(f"{usuario_id}\0{chave}".encode('utf-8')).hexdigest()
+
+
+class RespostaSalva:
+    """Resposta original de uma chave"""
+    __slots__ = ('hash_requisicao', 'status_code', 'corpo', 'registro_id')
+
+    def __init__(self, hash_requisicao: str, status_code: int, corpo: Dict[str, Any],
+                 registro_id: Optional[int]):
+        self.hash_requisicao = hash_requisicao
+        self.status_code = status_code
+        self.corpo = corpo
+        self.registro_id = registro_id
+
+    def conteudo(self) -> Dict[str, Any]:
+        if self.registro_id is None:
+            return self.corpo
+        return dict(self.corpo, id=self.registro_id)
+
+
+class ServicoIdempotencia:
+    def __init__(self, ttl: float = IDEMPOTENCIA_TTL_S,
+                 max_itens: int = IDEMPOTENCIA_CACHE_ITENS,
+                 capacidade_bloom: int = IDEMPOTENCIA_BLOOM_CAPACIDADE,
+                 intervalo_purga: float = IDEMPOTENCIA_PURGA_INTERVALO_S):
+        self.ttl = ttl
+        self.intervalo_purga = intervalo_purga
+        self._respostas = CacheLRU(max_itens, ttl=ttl)
+        self._vistas = BloomRotativo(capacidade_bloom, ttl)
+        self._parar = threading.Event()
+        self._filtro_pronto = threading.Event()
+        self._limpeza: Optional[threading.Thread] = None
+        metricas.observar_cache('idempotencia', self._respostas.estatisticas)
+
+    @staticmethod
+    def _chave_bloom(usuario_id: str, chave: str) -> str:
+        return f"{usuario_id}\0{chave}"
+
+    def iniciar(self):
+        """Inicia a thread que carrega o filtro e faz a limpeza periódica"""
+        if self._limpeza is not None:
+            return
+        self._parar.clear()
+        self._filtro_pronto.clear()
+        self._limpeza = threading.Thread(
+            target=self._executar, name="idempotencia-limpeza", daemon=True
+        )
+        self._limpeza.start()
+
+    def encerrar(self):
+        if self._limpeza is None:
+            return
+        self._parar.set()
+        self._limpeza.join()
+        self._limpeza = None
+
+    def buscar(self, db: Session, usuario_id: str, chave: str,
+               consultar_banco: bool = False) -> Optional[RespostaSalva]:
+        """
+        Resposta já enviada para a chave, ou None se ela é nova.
+        `consultar_banco` ignora o filtro (após um conflito na gravação).
+        """
+        salva = self._respostas.obter((usuario_id, chave))
+        if salva is not None:
+            _REPETIDA_MEMORIA.incrementar()
+            return salva
+        if not consultar_banco and self._filtro_pronto.is_set() \
+                and self._chave_bloom(usuario_id, chave) not in self._vistas:
+            _NOVA_BLOOM.incrementar()
+            return None
+
+        linha = db.execute(
+            select(ChaveIdempotencia.hash_requisicao, ChaveIdempotencia.status_code,
+                   ChaveIdempotencia.resposta, ChaveIdempotencia.registro_id)
+            .where(ChaveIdempotencia.usuario_id == usuario_id,
+                   ChaveIdempotencia.chave == chave,
+                   ChaveIdempotencia.expira_em > datetime.now())
+        ).first()
+        if linha is None:
+            _NOVA_BANCO.incrementar()
+            return None
+        _REPETIDA_BANCO.incrementar()
+        salva = RespostaSalva(linha.hash_requisicao, linha.status_code,
+                              json.loads(linha.resposta), linha.registro_id)
+        # Só guarda em memória respostas definitivas (com o id do registro)
+        if salva.registro_id is not None:
+            self._respostas.guardar((usuario_id, chave), salva)
+        return salva
+
+    def nova_chave(self, usuario_id: str, chave: str, hash_req: str,
+                   status_code: int, corpo: Dict[str, Any]) -> dict:
+        """Colunas de ChaveIdempotencia para gravar junto com o registro"""
+        return {
+            'usuario_id': usuario_id,
+            'chave': chave,
+            'hash_requisicao': hash_req,
+            'status_code': status_code,
+            'resposta': orjson.dumps(corpo).decode('utf-8'),
+            'expira_em': datetime.now() + timedelta(seconds=self.ttl),
+        }
+
+    def lembrar(self, usuario_id: str, chave: str, hash_req: str, status_code: int,
+                corpo: Dict[str, Any], registro_id: Optional[int]):
+        """Registra na memória uma resposta enviada (após gravar ou enfileirar)"""
+        self._respostas.guardar(
+            (usuario_id, chave), RespostaSalva(hash_req, status_code, corpo, registro_id)
+        )
+        self._vistas.adicionar(self._chave_bloom(usuario_id, chave))
+
+    def purgar_expiradas(self) -> int:
+        """Apaga as chaves expiradas em lotes de LOTE_PURGA; devolve quantas"""
+        total = 0
+        db = SessionLocal()
+        try:
+            while True:
+                ids = select(ChaveIdempotencia.id)\
+                    .where(ChaveIdempotencia.expira_em <= datetime.now())\
+                    .limit(LOTE_PURGA)
+                apagadas = db.execute(
+                    delete(ChaveIdempotencia).where(ChaveIdempotencia.id.in_(ids))
+                ).rowcount
+                db.commit()
+                total += apagadas
+                if apagadas < LOTE_PURGA or self._parar.is_set():
+                    break
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        _EXPIRADAS.incrementar(total)
+        return total
+
+    def carregar_filtro(self):
+        """Adiciona ao filtro as chaves ainda válidas no banco"""
+        db = SessionLocal()
+        try:
+            linhas = db.execute(
+                select(ChaveIdempotencia.usuario_id, ChaveIdempotencia.chave)
+                .where(ChaveIdempotencia.expira_em > datetime.now())
+                .execution_options(yield_per=5000)
+            )
+            for usuario_id, chave in linhas:
+                if self._parar.is_set():
+                    return
+                self._vistas.adicionar(self._chave_bloom(usuario_id, chave))
+        finally:
+            db.close()
+        self._filtro_pronto.set()
+
+    def _executar(self):
+        try:
+            self.carregar_filtro()
+        except Exception as e:
+            # Filtro incompleto não é usado: toda chave consulta o banco
+            print(f"Erro ao carregar chaves de idempotência: {e}")
+        self._limpar_periodicamente()
+
+    def _limpar_periodicamente(self):
+        while not self._parar.wait(self.intervalo_purga):
+            self._vistas.girar_se_necessario()
+            try:
+                self.purgar_expiradas()
+            except Exception as e:
+                print(f"Erro ao limpar chaves de idempotência: {e}")
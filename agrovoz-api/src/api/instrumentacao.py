@@ -0,0 +1,44 @@
+import time
+
+from src import metricas
+
+_DURACAO = metricas.histograma(
+    'agrovoz_http_requisicao_segundos', 'Duração das requisições HTTP por rota',
+    ('metodo', 'rota', 'status')
+)
+
+# Rótulo de requisições que não casaram com nenhuma rota (evita um rótulo por URL)
+ROTA_DESCONHECIDA = 'desconhecida'
+
+
+class MiddlewareMetricas:
+    """
+    Middleware ASGI que mede cada requisição HTTP pela rota (o modelo do
+    caminho, ex. /api/v1/registros/{usuario_id}), método e status. Em
+    respostas em streaming a duração inclui o envio do corpo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem['type'] == 'http.response.start':
+                status = mensagem['status']
+            await send(mensagem)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # O roteador do FastAPI guarda a rota encontrada no scope
+            rota = scope.get('route')
+            caminho = getattr(rota, 'path', None) or ROTA_DESCONHECIDA
+            _DURACAO.rotulado(scope['method'], caminho, str(status)).observar(time.perf_counter() - inicio)
@@ -1,78 +1,667 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from anyio import fail_after, to_thread
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from src.database.connection import get_db, DatabaseService
-from src.nlp.processador import ProcessadorNLPRural
-from src.schemas.request_response import ProcessarFalaRequest, ProcessarFalaResponse
-from typing import List
+from src.database.connection import get_db, DatabaseService, SessionLocal, COLUNAS_REGISTRO
+from src.database.ingestao import FilaCheia, criar_gravador
+from src.api.idempotencia import ServicoIdempotencia, RespostaSalva, hash_requisicao, id_externo_da_chave
+from src.api.exportacao import gerar_ndjson, gerar_csv, comprimir_gzip
+from src.nlp.resultado import ResultadoNLP
+from src.config import WS_FALA_INATIVIDADE_S
+from src.nlp.executor import ExecutorIndisponivel, criar_executor
+from src.nlp.regras import LIMITES_PADRAO
+from src.nlp.sessao import SessaoExtracao
+from src.nlp.vocabulario import VocabularioUsuario, obter_vocabulario
+from src.schemas.request_response import (
+    ProcessarFalaRequest, ProcessarFalaResponse, ProcessarFalaLoteResponse,
+    InicioFalaStream, MensagemFalaStream,
+    ConfiguracaoNLPRequest, ConfiguracaoNLPResponse,
+    EstatisticasResponse, ListaRegistrosResponse, BuscaRegistrosResponse,
+    RevisaoLoteRequest, RevisaoLoteResponse, MAX_ITENS_LOTE
+)
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from datetime import date, datetime, timedelta
+import base64
+import orjson
+import uuid
 
+# Rotas síncronas: o FastAPI as executa no threadpool (THREADPOOL_TAMANHO),
+# então NLP e sessão do SQLAlchemy não bloqueiam o event loop.
+#
+# Rotas de alto volume montam o JSON a partir de dicts gerados pelo próprio
+# servidor e devolvem ORJSONResponse direto: o response_model documenta o
+# formato, sem uma segunda validação/serialização pelo Pydantic.
 router = APIRouter()
 
-# Instância global do processador NLP
-nlp_processor = ProcessadorNLPRural()
+# Executor do NLP (local ou pool de processos, ver NLP_EXECUTOR);
+# iniciado e encerrado no ciclo de vida da aplicação em main.py, que
+# carrega o processador (padrões, motor) sem atrasar a subida
+executor_nlp = criar_executor()
+
+# Gravação dos registros de /processar-fala (na requisição ou em fila, ver
+# INGESTAO_MODO); iniciada e encerrada junto com o executor
+gravador_registros = criar_gravador()
+
+# Respostas por Idempotency-Key (ver src/api/idempotencia.py)
+idempotencia = ServicoIdempotencia()
+
+# Tamanho máximo de uma página da listagem de registros
+MAX_ITENS_PAGINA = 500
+
+def _dados_para_banco(resultado_nlp: ResultadoNLP, id_externo: Optional[str] = None) -> Dict[str, Any]:
+    """Monta os campos do registro a partir do resultado do NLP"""
+    return resultado_nlp.para_banco(id_externo or str(uuid.uuid4()))
+
+def _montar_resposta(registro_id: Optional[int], resultado_nlp: ResultadoNLP,
+                     id_externo: Optional[str] = None) -> Dict[str, Any]:
+    """Monta a resposta de uma fala processada e salva (formato ProcessarFalaResponse)"""
+    return resultado_nlp.para_resposta(registro_id, id_externo)
+
+def _id_externo_para_banco(usuario_id: str, id_externo: Optional[str],
+                           chave: Optional[str]) -> Optional[str]:
+    """
+    id_externo gravado: o enviado ou, com chave, o derivado dela (reenvios
+    que escapem da verificação da chave, em outro worker, esbarram no
+    índice único)
+    """
+    if chave and not id_externo:
+        return id_externo_da_chave(usuario_id, chave)
+    return id_externo
+
+def _resposta_salva(salva: RespostaSalva, hash_req: str) -> Tuple[Dict[str, Any], int]:
+    """Resposta original (conteúdo, código HTTP) de uma Idempotency-Key já usada"""
+    if salva.hash_requisicao != hash_req:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key já usada com outro conteúdo"
+        )
+    return salva.conteudo(), salva.status_code
+
+def _registrar_fala(db: Session, usuario_id: str, texto: str, id_externo: Optional[str],
+                    chave: Optional[str], extrair: Callable[[], ResultadoNLP]
+                    ) -> Tuple[Dict[str, Any], int, bool]:
+    """
+    Extrai (`extrair`, chamado só se a chave ainda não foi usada) e grava
+    uma fala, com a resposta guardada sob a chave de idempotência.
+    Erros saem como HTTPException.
+
+    Returns:
+        (resposta, código HTTP, se é a repetição de uma resposta salva)
+    """
+    if chave:
+        hash_req = hash_requisicao(texto, id_externo)
+        salva = idempotencia.buscar(db, usuario_id, chave)
+        if salva is not None:
+            return (*_resposta_salva(salva, hash_req), True)
+    
+    try:
+        resultado_nlp = extrair()
+        
+        dados_banco = _dados_para_banco(resultado_nlp, _id_externo_para_banco(usuario_id, id_externo, chave))
+        resposta = _montar_resposta(None, resultado_nlp, dados_banco['id_externo'])
+        codigo = status.HTTP_200_OK if gravador_registros.sincrono else status.HTTP_202_ACCEPTED
+        
+        # Salvar no banco de dados (ou enfileirar), com a chave na mesma transação
+        chave_banco = None
+        if chave:
+            chave_banco = idempotencia.nova_chave(usuario_id, chave, hash_req, codigo, resposta)
+        registro_id = gravador_registros.gravar(db, dados_banco, chave_banco)
+        resposta['id'] = registro_id
+        if chave:
+            idempotencia.lembrar(usuario_id, chave, hash_req, codigo, resposta, registro_id)
+        
+        return resposta, codigo, False
+        
+    except (FilaCheia, ExecutorIndisponivel) as e:
+        # Indisponibilidade passageira do servidor: o app tenta de novo
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Servidor ocupado, tente novamente: {str(e)}",
+            headers={"Retry-After": "1"}
+        )
+    except IntegrityError:
+        # Mesma chave gravada em paralelo (outra requisição ou worker)
+        if chave:
+            salva = idempotencia.buscar(db, usuario_id, chave, consultar_banco=True)
+            if salva is not None:
+                return (*_resposta_salva(salva, hash_req), True)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Registro {id_externo} já foi gravado"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Erro ao processar fala: {str(e)}"
+        )
 
 @router.post("/processar-fala", response_model=ProcessarFalaResponse)
-async def processar_fala(
+def processar_fala(
     request: ProcessarFalaRequest, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=100)
 ):
     """
     Endpoint principal para processar texto de voz
+    
+    Com o header Idempotency-Key (ou o campo chave_idempotencia), um
+    reenvio com a mesma chave recebe a resposta original, sem processar
+    nem gravar de novo; a mesma chave com outro texto recebe 422.
+    
+    Com INGESTAO_MODO=fila, responde 202 assim que o NLP termina: o
+    registro é gravado logo depois, em lote, e `id` vem nulo (use
+    `id_externo`). Com a fila cheia ou o NLP indisponível (encerrando ou
+    sem resposta dos workers), responde 503 com Retry-After.
+    """
+    resposta, codigo, repetida = _registrar_fala(
+        db, request.usuario_id, request.texto, request.id_externo,
+        idempotency_key or request.chave_idempotencia,
+        # Processar texto com NLP, usando o vocabulário do usuário
+        lambda: executor_nlp.processar(
+            request.texto, request.usuario_id, obter_vocabulario(db, request.usuario_id)
+        )
+    )
+    headers = {"Idempotent-Replayed": "true"} if repetida else None
+    return ORJSONResponse(resposta, status_code=codigo, headers=headers)
+
+@router.post("/processar-fala/lote", response_model=ProcessarFalaLoteResponse)
+def processar_fala_lote(
+    requests: List[ProcessarFalaRequest],
+    db: Session = Depends(get_db)
+):
+    """
+    Processa várias falas de uma vez, gravando todos os registros
+    em um único INSERT e uma única transação
+
+    A idempotência é por item (`chave_idempotencia` de cada fala, como em
+    /processar-fala; o header Idempotency-Key não vale para o lote): um
+    item com chave já usada recebe a resposta original, com `repetido`.
+    Um item com id_externo já gravado (ou repetido no lote) sai como
+    falha, com o ID do registro existente em `id_existente`.
+    """
+    if len(requests) > MAX_ITENS_LOTE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Lote com {len(requests)} itens excede o limite de {MAX_ITENS_LOTE}"
+        )
+    
+    # Itens com chave já usada: resposta original, sem NLP
+    resultados: List[Dict[str, Any]] = []
+    hashes: Dict[int, str] = {}
+    pendentes: List[int] = []
+    for indice, request in enumerate(requests):
+        if request.chave_idempotencia:
+            hashes[indice] = hash_requisicao(request.texto, request.id_externo)
+            salva = idempotencia.buscar(db, request.usuario_id, request.chave_idempotencia)
+            if salva is not None:
+                resultados.append(_item_repetido(indice, salva, hashes[indice]))
+                continue
+        pendentes.append(indice)
+    
+    # Processar NLP do lote inteiro; erros ficam restritos ao item
+    processados = []
+    try:
+        vocabularios = {
+            usuario_id: obter_vocabulario(db, usuario_id)
+            for usuario_id in {requests[indice].usuario_id for indice in pendentes}
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao carregar vocabulário: {str(e)}"
+        )
+    try:
+        saidas = executor_nlp.processar_lote([
+            (requests[indice].texto, requests[indice].usuario_id, vocabularios[requests[indice].usuario_id])
+            for indice in pendentes
+        ])
+    except ExecutorIndisponivel as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Servidor ocupado, tente novamente: {str(e)}",
+            headers={"Retry-After": "1"}
+        )
+    for indice, (sucesso, saida) in zip(pendentes, saidas):
+        if sucesso:
+            processados.append((indice, saida))
+        else:
+            resultados.append({
+                'indice': indice,
+                'sucesso': False,
+                'resultado': None,
+                'erro': f"Erro ao processar fala: {saida}"
+            })
+    
+    dados_banco = []
+    chaves_banco: List[Optional[dict]] = []
+    for indice, resultado_nlp in processados:
+        request = requests[indice]
+        dados = _dados_para_banco(resultado_nlp, _id_externo_para_banco(
+            request.usuario_id, request.id_externo, request.chave_idempotencia
+        ))
+        dados_banco.append(dados)
+        chaves_banco.append(idempotencia.nova_chave(
+            request.usuario_id, request.chave_idempotencia, hashes[indice], status.HTTP_200_OK,
+            _montar_resposta(None, resultado_nlp, dados['id_externo'])
+        ) if request.chave_idempotencia else None)
+    try:
+        gravados = _gravar_lote(DatabaseService(db), dados_banco, chaves_banco)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao salvar lote: {str(e)}"
+        )
+    
+    for (registro_id, novo), dados, chave_banco, (indice, resultado_nlp) in zip(
+            gravados, dados_banco, chaves_banco, processados):
+        if novo:
+            resposta = _montar_resposta(registro_id, resultado_nlp, dados['id_externo'])
+            if chave_banco is not None:
+                idempotencia.lembrar(
+                    chave_banco['usuario_id'], chave_banco['chave'], chave_banco['hash_requisicao'],
+                    status.HTTP_200_OK, resposta, registro_id
+                )
+            resultados.append({
+                'indice': indice,
+                'sucesso': True,
+                'resultado': resposta,
+                'erro': None
+            })
+        else:
+            resultados.append({
+                'indice': indice,
+                'sucesso': False,
+                'resultado': None,
+                'erro': f"Registro {dados['id_externo']} já foi gravado",
+                'id_existente': registro_id
+            })
+    resultados.sort(key=lambda item: item['indice'])
+    
+    sucessos = sum(1 for item in resultados if item['sucesso'])
+    return ORJSONResponse({
+        'total': len(requests),
+        'sucessos': sucessos,
+        'falhas': len(requests) - sucessos,
+        'resultados': resultados
+    })
+
+def _item_repetido(indice: int, salva: RespostaSalva, hash_req: str) -> Dict[str, Any]:
+    """Resultado de um item do lote com chave_idempotencia já usada"""
+    if salva.hash_requisicao != hash_req:
+        return {
+            'indice': indice,
+            'sucesso': False,
+            'resultado': None,
+            'erro': "Idempotency-Key já usada com outro conteúdo"
+        }
+    return {
+        'indice': indice,
+        'sucesso': True,
+        'resultado': salva.conteudo(),
+        'erro': None,
+        'repetido': True
+    }
+
+def _gravar_lote(db_service: DatabaseService, dados_banco: List[Dict[str, Any]],
+                 chaves_banco: List[Optional[dict]]) -> List[Tuple[Optional[int], bool]]:
+    """
+    Grava os registros de um lote, com as chaves de idempotência; (id, se
+    foi criado agora) por item.
+
+    Um id_externo já gravado, ou repetido no lote, não é gravado de novo:
+    o item recebe o id do registro existente. Se outra requisição gravar
+    o mesmo id_externo (ou chave) entre a consulta e o INSERT, o lote é
+    gravado registro a registro.
+    """
+    existentes = db_service.ids_por_id_externo([dados['id_externo'] for dados in dados_banco])
+    novos: Dict[str, int] = {}
+    for indice, dados in enumerate(dados_banco):
+        if dados['id_externo'] not in existentes:
+            novos.setdefault(dados['id_externo'], indice)
+    
+    try:
+        ids = db_service.criar_registros(
+            [dados_banco[indice] for indice in novos.values()],
+            [chaves_banco[indice] for indice in novos.values()]
+        )
+    except IntegrityError:
+        ids = []
+        for indice in novos.values():
+            try:
+                ids.append(db_service.criar_registro(dados_banco[indice], chaves_banco[indice]))
+            except IntegrityError:
+                ids.append(None)
+        existentes.update(db_service.ids_por_id_externo([
+            id_externo for id_externo, registro_id in zip(novos, ids) if registro_id is None
+        ]))
+    
+    criados = {
+        indice: registro_id for indice, registro_id in zip(novos.values(), ids) if registro_id is not None
+    }
+    existentes.update(
+        (dados_banco[indice]['id_externo'], registro_id) for indice, registro_id in criados.items()
+    )
+    return [
+        (criados[indice], True) if indice in criados else (existentes.get(dados['id_externo']), False)
+        for indice, dados in enumerate(dados_banco)
+    ]
+
+def _iniciar_sessao_fala(usuario_id: str) -> SessaoExtracao:
+    """Sessão de extração com o vocabulário do usuário (espera o processador carregar)"""
+    db = SessionLocal()
+    try:
+        vocabulario = obter_vocabulario(db, usuario_id)
+    finally:
+        db.close()
+    return SessaoExtracao(executor_nlp.processador, usuario_id, vocabulario)
+
+def _gravar_sessao_fala(inicio: InicioFalaStream, sessao: SessaoExtracao,
+                        texto: Optional[str]) -> Tuple[Dict[str, Any], int, bool]:
+    """Resultado final da sessão, gravado como em /processar-fala"""
+    resultado = sessao.finalizar(texto)
+    db = SessionLocal()
+    try:
+        return _registrar_fala(
+            db, inicio.usuario_id, resultado.descricao_original, inicio.id_externo,
+            inicio.chave_idempotencia, lambda: resultado
+        )
+    finally:
+        db.close()
+
+async def _enviar(websocket: WebSocket, mensagem: Dict[str, Any]):
+    await websocket.send_text(orjson.dumps(mensagem).decode())
+
+async def _receber(websocket: WebSocket, modelo):
+    """Próxima mensagem do app, validada; sem nada por WS_FALA_INATIVIDADE_S, TimeoutError"""
+    with fail_after(WS_FALA_INATIVIDADE_S):
+        texto = await websocket.receive_text()
+    return modelo.model_validate_json(texto)
+
+async def _encerrar_com_erro(websocket: WebSocket, fechamento: int, codigo: int, detalhe: str):
+    try:
+        await _enviar(websocket, {'tipo': 'erro', 'codigo': codigo, 'detalhe': detalhe})
+        await websocket.close(fechamento)
+    except (WebSocketDisconnect, RuntimeError):
+        # Conexão já fechada pelo app
+        pass
+
+@router.websocket("/ws/processar-fala")
+async def processar_fala_stream(websocket: WebSocket):
+    """
+    /processar-fala enquanto a fala é transcrita.
+    
+    O app manda {"tipo": "iniciar", "usuario_id", "id_externo",
+    "chave_idempotencia"} e depois, a cada trecho reconhecido,
+    {"tipo": "parcial", "texto"} com a transcrição inteira até ali. A
+    extração é incremental (só o trecho alterado é varrido de novo) e cada
+    parcial que muda o resultado recebe {"tipo": "parcial", "sequencia",
+    ...} só com o que mudou: dados_extraidos, validacao, confianca e
+    sugestoes.
+    
+    {"tipo": "finalizar"} (com o texto final ou valendo a última parcial)
+    grava o registro uma vez, como /processar-fala, e recebe
+    {"tipo": "final", "codigo", "repetida", "resposta"} antes do
+    fechamento. {"tipo": "cancelar"} encerra sem gravar. Erros chegam como
+    {"tipo": "erro", "codigo", "detalhe"} e encerram a conexão.
+    """
+    await websocket.accept()
+    try:
+        inicio = await _receber(websocket, InicioFalaStream)
+        sessao = await to_thread.run_sync(_iniciar_sessao_fala, inicio.usuario_id)
+        sequencia = 0
+        while True:
+            mensagem = await _receber(websocket, MensagemFalaStream)
+            if mensagem.tipo == 'cancelar':
+                await websocket.close()
+                return
+            if mensagem.tipo == 'finalizar':
+                resposta, codigo, repetida = await to_thread.run_sync(
+                    _gravar_sessao_fala, inicio, sessao, mensagem.texto
+                )
+                await _enviar(websocket, {
+                    'tipo': 'final', 'codigo': codigo, 'repetida': repetida, 'resposta': resposta
+                })
+                await websocket.close()
+                return
+            if mensagem.texto is None:
+                raise ValueError("Mensagem parcial sem texto")
+            sequencia += 1
+            diferencas = await to_thread.run_sync(sessao.atualizar, mensagem.texto)
+            if diferencas:
+                await _enviar(websocket, {'tipo': 'parcial', 'sequencia': sequencia, **diferencas})
+    except WebSocketDisconnect:
+        # App desconectou no meio da fala: nada é gravado
+        return
+    except TimeoutError:
+        await _encerrar_com_erro(websocket, status.WS_1008_POLICY_VIOLATION,
+                                 status.HTTP_408_REQUEST_TIMEOUT, "Sessão inativa")
+    except (ValidationError, ValueError) as e:
+        await _encerrar_com_erro(websocket, status.WS_1008_POLICY_VIOLATION,
+                                 status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+    except HTTPException as e:
+        fechamento = (status.WS_1011_INTERNAL_ERROR if e.status_code >= 500
+                      else status.WS_1008_POLICY_VIOLATION)
+        await _encerrar_com_erro(websocket, fechamento, e.status_code, e.detail)
+    except Exception as e:
+        await _encerrar_com_erro(websocket, status.WS_1011_INTERNAL_ERROR,
+                                 status.HTTP_500_INTERNAL_SERVER_ERROR, f"Erro ao processar fala: {str(e)}")
+
+def _codificar_cursor(chave: Any, registro_id: int) -> str:
+    """Cursor opaco com a posição (chave de ordenação, id) do último registro da página"""
+    # repr: a relevância da busca volta exatamente igual
+    valor = chave.isoformat() if isinstance(chave, datetime) else repr(chave)
+    posicao = f"{valor}|{registro_id}"
+    return base64.urlsafe_b64encode(posicao.encode()).decode().rstrip("=")
+
+def _decodificar_cursor(cursor: str, tipo_chave=datetime.fromisoformat) -> Tuple[Any, int]:
+    try:
+        posicao = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        chave, registro_id = posicao.split("|")
+        return tipo_chave(chave), int(registro_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+@router.get("/registros/{usuario_id}", response_model=ListaRegistrosResponse)
+def listar_registros(
+    usuario_id: str,
+    limit: int = Query(50, ge=1, le=MAX_ITENS_PAGINA),
+    cursor: Optional[str] = Query(None, description="proximo_cursor da página anterior"),
+    tipo_atividade: Optional[str] = None,
+    cultura: Optional[str] = None,
+    talhao: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Listar registros de um usuário, dos mais recentes para os mais antigos
+    
+    Para a próxima página, repetir a chamada com `cursor=proximo_cursor`
+    (e os mesmos filtros); `proximo_cursor` nulo indica a última página.
     """
+    apos = _decodificar_cursor(cursor) if cursor else None
     try:
-        # Processar texto com NLP
-        resultado_nlp = nlp_processor.processar_texto(
-            request.texto, 
-            request.usuario_id
+        db_service = DatabaseService(db)
+        # Um registro a mais indica se existe próxima página
+        registros = db_service.buscar_registros_usuario(
+            usuario_id, limit + 1, apos=apos,
+            tipo_atividade=tipo_atividade, cultura=cultura, talhao=talhao,
+            data_inicio=data_inicio, data_fim=data_fim
         )
         
-        # Preparar dados para o banco
-        dados_banco = resultado_nlp['dados'].copy()
-        dados_banco['precisa_revisao'] = resultado_nlp['confianca'] < 0.7
+        proximo_cursor = None
+        if len(registros) > limit:
+            registros = registros[:limit]
+            ultimo = registros[-1]
+            proximo_cursor = _codificar_cursor(ultimo['data_registro'], ultimo['id'])
+        
+        return ORJSONResponse({
+            "registros": registros,
+            "total": len(registros),
+            "proximo_cursor": proximo_cursor
+        })
         
-        # Salvar no banco de dados
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao buscar registros: {str(e)}"
+        )
+
+@router.get("/registros/{usuario_id}/busca", response_model=BuscaRegistrosResponse)
+def buscar_registros(
+    usuario_id: str,
+    q: str = Query(..., min_length=1, max_length=200, description="Palavras a buscar na descrição"),
+    limit: int = Query(50, ge=1, le=MAX_ITENS_PAGINA),
+    cursor: Optional[str] = Query(None, description="proximo_cursor da página anterior"),
+    tipo_atividade: Optional[str] = None,
+    cultura: Optional[str] = None,
+    talhao: Optional[int] = None,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Buscar registros de um usuário pelo texto falado, dos mais para os
+    menos relevantes
+    
+    Todas as palavras de `q` precisam aparecer, sem diferença de acentos
+    ou maiúsculas. Aceita os mesmos filtros da listagem; a paginação
+    segue a mesma regra (`cursor=proximo_cursor`, com a mesma busca).
+    """
+    apos = _decodificar_cursor(cursor, float) if cursor else None
+    try:
         db_service = DatabaseService(db)
-        registro_id = db_service.criar_registro(dados_banco)
+        registros = db_service.buscar_registros_texto(
+            usuario_id, q, limit + 1, apos=apos,
+            tipo_atividade=tipo_atividade, cultura=cultura, talhao=talhao,
+            data_inicio=data_inicio, data_fim=data_fim
+        )
+        
+        proximo_cursor = None
+        if len(registros) > limit:
+            registros = registros[:limit]
+            ultimo = registros[-1]
+            proximo_cursor = _codificar_cursor(ultimo['relevancia'], ultimo['id'])
         
-        return ProcessarFalaResponse(
-            id=registro_id,
-            dados_extraidos=resultado_nlp['dados'],
-            validacao=resultado_nlp['validacao'],
-            confianca=resultado_nlp['confianca'],
-            sugestoes=resultado_nlp['sugestoes']
+        return ORJSONResponse({
+            "registros": registros,
+            "total": len(registros),
+            "proximo_cursor": proximo_cursor
+        })
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro na busca: {str(e)}"
         )
+
+def _resposta_configuracao(vocabulario: VocabularioUsuario) -> ConfiguracaoNLPResponse:
+    return ConfiguracaoNLPResponse(
+        usuario_id=vocabulario.usuario_id,
+        nomes_funcionarios=list(vocabulario.nomes_funcionarios),
+        culturas=list(vocabulario.culturas),
+        talhoes=list(vocabulario.talhoes),
+        limites_validacao=vocabulario.limites,
+        versao=vocabulario.versao
+    )
+
+@router.get("/configuracao/{usuario_id}", response_model=ConfiguracaoNLPResponse)
+def obter_configuracao(
+    usuario_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Obter o vocabulário personalizado de um usuário
+    """
+    try:
+        return _resposta_configuracao(obter_vocabulario(db, usuario_id))
         
     except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Erro ao processar fala: {str(e)}"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao buscar configuração: {str(e)}"
         )
 
-@router.get("/registros/{usuario_id}")
-async def listar_registros(
+@router.put("/configuracao/{usuario_id}", response_model=ConfiguracaoNLPResponse)
+def salvar_configuracao(
     usuario_id: str,
-    limit: int = 50,
+    request: ConfiguracaoNLPRequest,
     db: Session = Depends(get_db)
 ):
     """
-    Listar registros de um usuário
+    Salvar o vocabulário personalizado (funcionários, culturas e talhões)
+    e os limites de validação usados pelo NLP nas próximas falas do usuário
     """
+    desconhecidos = sorted(set(request.limites_validacao) - set(LIMITES_PADRAO))
+    if desconhecidos:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Limites desconhecidos: {', '.join(desconhecidos)} "
+                   f"(válidos: {', '.join(LIMITES_PADRAO)})"
+        )
     try:
         db_service = DatabaseService(db)
-        registros = db_service.buscar_registros_usuario(usuario_id, limit)
-        
-        return {
-            "registros": registros,
-            "total": len(registros)
-        }
+        config = db_service.salvar_configuracao_nlp(
+            usuario_id,
+            request.nomes_funcionarios,
+            request.culturas,
+            request.talhoes,
+            request.limites_validacao
+        )
+        return _resposta_configuracao(VocabularioUsuario.de_configuracao(usuario_id, config))
         
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erro ao buscar registros: {str(e)}"
+            detail=f"Erro ao salvar configuração: {str(e)}"
         )
 
+def _gerar_exportacao(usuario_id: str, formato: str, compactar: bool,
+                      data_inicio: Optional[date], data_fim: Optional[date]):
+    """Gera o arquivo em pedaços, com sessão própria aberta durante o envio"""
+    # A sessão de get_db é fechada antes do corpo da resposta ser enviado
+    db = SessionLocal()
+    try:
+        linhas = DatabaseService(db).exportar_registros(usuario_id, data_inicio, data_fim)
+        if formato == "csv":
+            pedacos = gerar_csv(linhas, COLUNAS_REGISTRO)
+        else:
+            pedacos = gerar_ndjson(linhas)
+        if compactar:
+            pedacos = comprimir_gzip(pedacos)
+        yield from pedacos
+    finally:
+        db.close()
+
+@router.get("/registros/{usuario_id}/export")
+def exportar_registros(
+    usuario_id: str,
+    formato: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Compactar o arquivo em gzip"),
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None
+):
+    """
+    Exportar todos os registros de um usuário (NDJSON ou CSV), em ordem
+    cronológica, enviados aos poucos com memória constante
+    """
+    nome_arquivo = f"registros_{usuario_id}.{formato}" + (".gz" if gzip else "")
+    tipo = "application/gzip" if gzip else (
+        "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
+    )
+    return StreamingResponse(
+        _gerar_exportacao(usuario_id, formato, gzip, data_inicio, data_fim),
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="{nome_arquivo}"'}
+    )
+
 @router.put("/registros/{registro_id}/confirmar")
-async def confirmar_registro(
+def confirmar_registro(
     registro_id: int,
     usuario_id: str,
     db: Session = Depends(get_db)
@@ -83,38 +672,134 @@ async def confirmar_registro(
     try:
         db_service = DatabaseService(db)
         sucesso = db_service.confirmar_registro(registro_id, usuario_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao confirmar registro: {str(e)}"
+        )
+    
+    # Fora do try: o 404 não pode virar 500
+    if not sucesso:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Registro não encontrado"
+        )
+    return {"message": "Registro confirmado com sucesso"}
+
+@router.get("/registros/{usuario_id}/revisao", response_model=ListaRegistrosResponse)
+def listar_fila_revisao(
+    usuario_id: str,
+    limit: int = Query(50, ge=1, le=MAX_ITENS_PAGINA),
+    cursor: Optional[str] = Query(None, description="proximo_cursor da página anterior"),
+    db: Session = Depends(get_db)
+):
+    """
+    Registros do usuário que precisam de revisão (confiança baixa) e ainda
+    não foram confirmados, dos mais recentes para os mais antigos
+    
+    Paginação igual à da listagem (`cursor=proximo_cursor`).
+    """
+    apos = _decodificar_cursor(cursor) if cursor else None
+    try:
+        db_service = DatabaseService(db)
+        registros = db_service.buscar_registros_usuario(
+            usuario_id, limit + 1, apos=apos, revisao_pendente=True
+        )
         
-        if sucesso:
-            return {"message": "Registro confirmado com sucesso"}
-        else:
+        proximo_cursor = None
+        if len(registros) > limit:
+            registros = registros[:limit]
+            ultimo = registros[-1]
+            proximo_cursor = _codificar_cursor(ultimo['data_registro'], ultimo['id'])
+        
+        return ORJSONResponse({
+            "registros": registros,
+            "total": len(registros),
+            "proximo_cursor": proximo_cursor
+        })
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao buscar fila de revisão: {str(e)}"
+        )
+
+@router.post("/registros/{usuario_id}/revisao", response_model=RevisaoLoteResponse)
+def revisar_registros(
+    usuario_id: str,
+    request: RevisaoLoteRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Corrigir e/ou confirmar vários registros do usuário em uma transação
+    
+    Em cada item, só os `campos` enviados são alterados; com `confirmar`
+    (padrão) o registro é confirmado e sai da fila de revisão. IDs
+    repetidos: vale o último item. Mais de MAX_ITENS_LOTE itens: 422,
+    já na validação do corpo.
+    """
+    revisoes = {}
+    for item in request.itens:
+        campos = item.campos.model_dump(exclude_unset=True)
+        if 'tipo_atividade' in campos and campos['tipo_atividade'] is None:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Registro não encontrado"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Registro {item.id}: tipo_atividade não pode ser nulo"
             )
-            
+        revisoes[item.id] = (campos, item.confirmar)
+    
+    try:
+        db_service = DatabaseService(db)
+        encontrados, alterados = db_service.revisar_registros(usuario_id, revisoes)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Erro ao confirmar registro: {str(e)}"
+            detail=f"Erro ao revisar registros: {str(e)}"
         )
+    
+    return {
+        "revisados": encontrados,
+        "nao_encontrados": sorted(set(revisoes) - set(encontrados)),
+        "alterados": alterados
+    }
 
-@router.get("/estatisticas/{usuario_id}")
-async def obter_estatisticas(
+@router.get("/estatisticas/{usuario_id}", response_model=EstatisticasResponse)
+def obter_estatisticas(
     usuario_id: str,
+    dias: int = Query(30, ge=1, le=3660, description="Janela terminando hoje, se não houver data_inicio"),
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Obter estatísticas básicas dos registros
+    Obter estatísticas dos registros no período (últimos `dias` ou
+    data_inicio..data_fim), a partir dos agregados diários
     """
+    fim = data_fim or date.today()
+    if data_inicio is not None:
+        inicio, periodo = data_inicio, "personalizado"
+    else:
+        inicio, periodo = fim - timedelta(days=dias - 1), f"últimos_{dias}_dias"
+    if inicio > fim:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="data_inicio posterior a data_fim"
+        )
+    
     try:
-        # Implementar lógica de estatísticas
-        # Por ora, retornar placeholder
-        return {
-            "total_registros": 0,
-            "valor_total_gastos": 0.0,
-            "atividades_por_tipo": {},
-            "periodo": "últimos_30_dias"
-        }
+        db_service = DatabaseService(db)
+        dados = db_service.obter_estatisticas(usuario_id, inicio, fim)
+        
+        return EstatisticasResponse(
+            usuario_id=usuario_id,
+            periodo=periodo,
+            data_inicio=inicio,
+            data_fim=fim,
+            atividades_por_tipo={
+                tipo: resumo['registros'] for tipo, resumo in dados['por_tipo'].items()
+            },
+            **dados
+        )
         
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,109 @@
+import os
+
+def _int_env(nome: str, padrao: int) -> int:
+    """Lê um inteiro de variável de ambiente"""
+    valor = os.getenv(nome)
+    return int(valor) if valor else padrao
+
+def _float_env(nome: str, padrao: float) -> float:
+    """Lê um número decimal de variável de ambiente"""
+    valor = os.getenv(nome)
+    return float(valor) if valor else padrao
+
+def _bool_env(nome: str, padrao: bool) -> bool:
+    """Lê um booleano (1/0, true/false, sim/nao) de variável de ambiente"""
+    valor = os.getenv(nome)
+    if not valor:
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+# URL do banco de dados (Railway PostgreSQL ou SQLite local)
+DATABASE_URL = os.getenv(
+    "DATABASE_URL", 
+    "sqlite:///./agrovoz.db"  
+)
+
+# Migrações do esquema ao subir a API: 'verificar' (só confere a versão e
+# recusa subir com migrações pendentes), 'atualizar' (aplica as pendentes;
+# para desenvolvimento) ou 'ignorar'
+MIGRACOES_INICIALIZACAO = os.getenv("MIGRACOES_INICIALIZACAO", "verificar")
+
+# Threads que o FastAPI usa para executar rotas e dependências síncronas
+THREADPOOL_TAMANHO = _int_env("THREADPOOL_TAMANHO", 40)
+
+# Pool de conexões do banco (deve acompanhar o tamanho do threadpool)
+DB_POOL_SIZE = _int_env("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _int_env("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT = _int_env("DB_POOL_TIMEOUT", 30)
+
+# PostgreSQL: validar a conexão antes de entregá-la (pre_ping), renovar
+# conexões mais velhas que DB_POOL_RECYCLE_S (0 desliga), timeouts de
+# conexão e de comando (0 desliga). DB_DRIVER_PG: 'psycopg2' ou 'psycopg'
+# (psycopg 3), que prepara no servidor os comandos executados mais de
+# DB_PREPARAR_APOS vezes na mesma conexão (-1 desliga)
+DB_POOL_PRE_PING = _bool_env("DB_POOL_PRE_PING", True)
+DB_POOL_RECYCLE_S = _int_env("DB_POOL_RECYCLE_S", 1800)
+DB_CONNECT_TIMEOUT_S = _int_env("DB_CONNECT_TIMEOUT_S", 5)
+DB_STATEMENT_TIMEOUT_MS = _int_env("DB_STATEMENT_TIMEOUT_MS", 30000)
+DB_DRIVER_PG = os.getenv("DB_DRIVER_PG", "psycopg2")
+DB_PREPARAR_APOS = _int_env("DB_PREPARAR_APOS", 5)
+
+# SQLite: 'padrao' (desenvolvimento) ou 'otimizado' (instalações que rodam
+# em SQLite): WAL, PRAGMAs de desempenho, pool de leitura e uma única
+# conexão de escrita
+SQLITE_MODO = os.getenv("SQLITE_MODO", "padrao")
+SQLITE_LEITURA_POOL = _int_env("SQLITE_LEITURA_POOL", DB_POOL_SIZE)
+SQLITE_BUSY_TIMEOUT_MS = _int_env("SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_CACHE_MB = _int_env("SQLITE_CACHE_MB", 64)
+SQLITE_MMAP_MB = _int_env("SQLITE_MMAP_MB", 256)
+
+# Execução do NLP: 'local' (na thread da requisição) ou 'processos'
+NLP_EXECUTOR = os.getenv("NLP_EXECUTOR", "local")
+NLP_WORKERS = _int_env("NLP_WORKERS", os.cpu_count() or 1)
+
+# Micro-lotes do executor em processos: espera máxima e tamanho máximo
+NLP_LOTE_MAX_LATENCIA_MS = _float_env("NLP_LOTE_MAX_LATENCIA_MS", 2.0)
+NLP_LOTE_MAX_ITENS = _int_env("NLP_LOTE_MAX_ITENS", 64)
+# Espera máxima pelo resultado de um lote nos workers (um worker travado
+# não prende a requisição para sempre)
+NLP_TIMEOUT_S = _float_env("NLP_TIMEOUT_S", 30.0)
+
+# Vocabulário personalizado por usuário (ConfiguracaoNLP)
+VOCABULARIO_CACHE_ITENS = _int_env("VOCABULARIO_CACHE_ITENS", 1024)
+VOCABULARIO_CACHE_TTL_S = _float_env("VOCABULARIO_CACHE_TTL_S", 300.0)
+
+# Cache de resultados do NLP por texto normalizado:
+# 'memoria' (por processo), 'redis' (compartilhado) ou 'desligado'
+NLP_CACHE_RESULTADOS = os.getenv("NLP_CACHE_RESULTADOS", "memoria")
+NLP_CACHE_ITENS = _int_env("NLP_CACHE_ITENS", 4096)
+NLP_CACHE_TTL_S = _float_env("NLP_CACHE_TTL_S", 86400.0)
+NLP_CACHE_REDIS_URL = os.getenv("NLP_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Correção das palavras mal transcritas (culturas, atividades, padrões e o
+# vocabulário do usuário) antes da extração; ver src/nlp/aproximado.py
+NLP_CORRECAO_ASR = _bool_env("NLP_CORRECAO_ASR", True)
+
+# /ws/processar-fala: sessão encerrada depois deste tempo sem mensagens do app
+WS_FALA_INATIVIDADE_S = _float_env("WS_FALA_INATIVIDADE_S", 60.0)
+
+# Tempo máximo do ping ao banco feito pelo /health
+SAUDE_DB_TIMEOUT_S = _float_env("SAUDE_DB_TIMEOUT_S", 2.0)
+
+# Gravação dos registros de /processar-fala: 'sincrona' (commit na
+# requisição) ou 'fila' (resposta logo após o NLP; uma thread grava em lotes)
+INGESTAO_MODO = os.getenv("INGESTAO_MODO", "sincrona")
+INGESTAO_FILA_MAX = _int_env("INGESTAO_FILA_MAX", 10000)
+INGESTAO_LOTE_MAX_ITENS = _int_env("INGESTAO_LOTE_MAX_ITENS", 500)
+INGESTAO_LOTE_MAX_LATENCIA_MS = _float_env("INGESTAO_LOTE_MAX_LATENCIA_MS", 50.0)
+# Espera por uma vaga com a fila cheia antes de responder 503
+INGESTAO_ESPERA_FILA_MS = _float_env("INGESTAO_ESPERA_FILA_MS", 100.0)
+# Tempo máximo para gravar o que restar na fila ao desligar
+INGESTAO_DRENAGEM_TIMEOUT_S = _float_env("INGESTAO_DRENAGEM_TIMEOUT_S", 30.0)
+
+# Idempotency-Key de /processar-fala: por quanto tempo uma chave é lembrada,
+# respostas recentes em memória, capacidade do filtro de Bloom (chaves por
+# período de TTL) e intervalo da limpeza das chaves expiradas
+IDEMPOTENCIA_TTL_S = _float_env("IDEMPOTENCIA_TTL_S", 86400.0)
+IDEMPOTENCIA_CACHE_ITENS = _int_env("IDEMPOTENCIA_CACHE_ITENS", 10000)
+IDEMPOTENCIA_BLOOM_CAPACIDADE = _int_env("IDEMPOTENCIA_BLOOM_CAPACIDADE", 500000)
+IDEMPOTENCIA_PURGA_INTERVALO_S = _float_env("IDEMPOTENCIA_PURGA_INTERVALO_S", 600.0)
@@ -0,0 +1,111 @@
+"""
+Busca textual em descricao_original (índices criados pela migração
+0006_busca_texto).
+
+PostgreSQL: índice GIN em to_tsvector('agrovoz_pt', descricao_original),
+uma cópia da configuração 'portuguese' que passa as palavras pelo
+unaccent antes do radical. A consulta usa websearch_to_tsquery (todas as
+palavras; aspas para frase, "or", "-palavra") e a ordem é por ts_rank.
+
+SQLite: tabela FTS5 registros_busca com conteúdo externo em
+registros_rurais, mantida por triggers, e tokenizador unicode61 sem
+acentos. Sem radicais em português: cada palavra vale como prefixo
+("adub" encontra "adubo" e "adubação") e a ordem é por bm25.
+
+Nos dois casos `relevancia` cresce com a relevância, e a paginação é por
+chave em (relevancia, id).
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Float, and_, cast, column, func, literal, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+from src.database.models import RegistroRural
+
+CONFIGURACAO_PG = 'agrovoz_pt'
+TABELA_FTS5 = 'registros_busca'
+
+# Ignoradas na busca do SQLite, como a configuração 'portuguese' faz no PostgreSQL
+_PALAVRAS_VAZIAS = frozenset((
+    'a', 'à', 'ao', 'aos', 'as', 'às', 'com', 'da', 'das', 'de', 'do', 'dos',
+    'e', 'é', 'em', 'na', 'nas', 'no', 'nos', 'o', 'os', 'ou', 'para', 'pela',
+    'pelo', 'por', 'pra', 'que', 'se', 'um', 'uma'
+))
+_PALAVRA = re.compile(r'\w+')
+
+
+def consulta_fts5(texto: str) -> Optional[str]:
+    """
+    Consulta FTS5 com todas as palavras do texto (números exatos, demais
+    como prefixo). None se não sobrar palavra.
+    """
+    termos = []
+    for palavra in _PALAVRA.findall(texto.lower()):
+        if palavra in _PALAVRAS_VAZIAS:
+            continue
+        termos.append(f'"{palavra}"' if palavra.isdigit() else f'"{palavra}"*')
+    return ' '.join(termos) or None
+
+
+def _relevancia_e_condicao(dialeto: str, texto: str):
+    """(expressão da relevância, condição de correspondência, tabela a juntar)"""
+    if dialeto == 'postgresql':
+        # Configuração literal no SQL: com parâmetro o planejador não
+        # reconhece a expressão do índice
+        configuracao = literal_column(f"'{CONFIGURACAO_PG}'::regconfig")
+        documento = func.to_tsvector(configuracao, RegistroRural.descricao_original)
+        consulta = func.websearch_to_tsquery(configuracao, texto)
+        # float8: o ts_rank (real) volta no cursor sem perder precisão
+        return cast(func.ts_rank(documento, consulta), Float), documento.bool_op('@@')(consulta), None
+
+    if dialeto == 'sqlite':
+        consulta = consulta_fts5(texto)
+        if consulta is None:
+            return None
+        fts = table(TABELA_FTS5, column('rowid'), column(TABELA_FTS5))
+        # bm25 é menor para os mais relevantes
+        relevancia = -func.bm25(literal_column(TABELA_FTS5))
+        return relevancia, fts.c[TABELA_FTS5].op('MATCH')(consulta), fts
+
+    # Bancos sem índice textual: todas as palavras, sem ordem de relevância
+    palavras = [p for p in _PALAVRA.findall(texto.lower()) if p not in _PALAVRAS_VAZIAS]
+    if not palavras:
+        return None
+    descricao = func.lower(RegistroRural.descricao_original)
+    condicao = and_(*(descricao.contains(palavra, autoescape=True) for palavra in palavras))
+    return literal(0.0, Float), condicao, None
+
+
+def buscar(db: Session, texto: str, filtros: list, limite: int,
+           apos: Optional[Tuple[float, int]] = None) -> List[Dict[str, Any]]:
+    """
+    Registros que satisfazem `filtros` e contêm as palavras de `texto`,
+    dos mais para os menos relevantes, com a coluna `relevancia`.
+    `apos` é (relevancia, id) do último registro da página anterior.
+    """
+    from src.database.connection import COLUNAS_REGISTRO
+
+    montado = _relevancia_e_condicao(db.get_bind().dialect.name, texto)
+    if montado is None:
+        return []
+    relevancia, condicao, fts = montado
+
+    condicoes = [*filtros, condicao]
+    if apos is not None:
+        relevancia_apos, id_apos = apos
+        condicoes.append(or_(
+            relevancia < relevancia_apos,
+            and_(relevancia == relevancia_apos, RegistroRural.id > id_apos)
+        ))
+
+    stmt = select(
+        *(RegistroRural.__table__.c[nome] for nome in COLUNAS_REGISTRO),
+        relevancia.label('relevancia')
+    )
+    if fts is not None:
+        stmt = stmt.join_from(RegistroRural, fts, fts.c.rowid == RegistroRural.id)
+    stmt = stmt.where(*condicoes)\
+        .order_by(relevancia.desc(), RegistroRural.id)\
+        .limit(limite)
+    return [dict(linha) for linha in db.execute(stmt).mappings()]
@@ -1,44 +1,395 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, insert, select, update, or_, and_, func, text
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.exc import TimeoutError as TimeoutPool
 from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import StaticPool
-from src.database.models import Base
-import os
-from typing import Generator
-
-# URL do banco de dados (Railway PostgreSQL ou SQLite local)
-DATABASE_URL = os.getenv(
-    "DATABASE_URL", 
-    "sqlite:///./agrovoz.db"  
+from sqlalchemy.pool import QueuePool, StaticPool
+from src.config import (
+    DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE_S, DB_CONNECT_TIMEOUT_S, DB_STATEMENT_TIMEOUT_MS, DB_DRIVER_PG,
+    DB_PREPARAR_APOS, SQLITE_MODO,
+    SQLITE_LEITURA_POOL, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_MB, SQLITE_MMAP_MB
 )
+from src.database import busca, estatisticas
+from src import metricas
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import importlib.util
+import json
+import threading
+import time
+from collections import deque
 
-# Configurar engine do SQLAlchemy
-if DATABASE_URL.startswith("sqlite"):
-    # Configuração para SQLite (desenvolvimento)
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-        echo=False  # True para ver queries SQL
-    )
-else:
-    # Configuração para PostgreSQL (produção)
-    engine = create_engine(
-        DATABASE_URL,
-        echo=False,
-        pool_size=10,
-        max_overflow=20
-    )
-
-# Criar sessionmaker
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Métricas do pool de conexões e das operações do DatabaseService
+_ESPERA_POOL = metricas.histograma(
+    'agrovoz_db_pool_espera_segundos', 'Espera para obter uma conexão do pool'
+).rotulado()
+_USO_CONEXAO = metricas.histograma(
+    'agrovoz_db_pool_uso_segundos', 'Tempo entre o checkout e a devolução de uma conexão'
+).rotulado()
+_TIMEOUTS_POOL = metricas.contador(
+    'agrovoz_db_pool_timeouts_total', 'Pedidos de conexão que estouraram DB_POOL_TIMEOUT'
+).rotulado()
+_ABERTURA_CONEXAO = metricas.histograma(
+    'agrovoz_db_conexao_abertura_segundos', 'Tempo para abrir uma conexão nova com o banco'
+).rotulado()
+_INVALIDADAS = metricas.contador(
+    'agrovoz_db_conexoes_invalidadas_total', 'Conexões descartadas por erro (inclui falhas do pre_ping)'
+).rotulado()
+_TEMPO_OPERACAO = metricas.histograma(
+    'agrovoz_db_operacao_segundos', 'Duração das operações do DatabaseService', ('operacao',)
+)
+_ERROS_OPERACAO = metricas.contador(
+    'agrovoz_db_operacao_erros_total', 'Operações do DatabaseService que levantaram exceção', ('operacao',)
+)
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que mede a espera por uma conexão livre"""
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        except TimeoutPool:
+            _TIMEOUTS_POOL.incrementar()
+            raise
+        finally:
+            _ESPERA_POOL.observar(time.perf_counter() - inicio)
+
+class _FilaJusta:
+    """
+    Exclusão mútua em ordem de chegada. Ao liberar, a vez passa direto
+    para o primeiro da fila, e quem acabou de liberar não volta à frente
+    (o que o Condition da fila do QueuePool permite).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ocupada = False
+        self._esperando = deque()
+
+    def entrar(self, timeout: float) -> bool:
+        with self._lock:
+            if not self._ocupada:
+                self._ocupada = True
+                return True
+            vez = threading.Event()
+            self._esperando.append(vez)
+        if vez.wait(timeout):
+            return True
+        with self._lock:
+            if vez.is_set():
+                return True
+            self._esperando.remove(vez)
+            return False
+
+    def sair(self):
+        with self._lock:
+            if self._esperando:
+                self._esperando.popleft().set()
+            else:
+                self._ocupada = False
+
+
+class PoolEscrita(PoolMedido):
+    """Pool da conexão única de escrita: entrega a conexão em ordem de chegada"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fila_justa = _FilaJusta()
+
+    def connect(self):
+        inicio = time.perf_counter()
+        if not self._fila_justa.entrar(self._timeout):
+            _TIMEOUTS_POOL.incrementar()
+            _ESPERA_POOL.observar(time.perf_counter() - inicio)
+            raise TimeoutPool(f"Conexão de escrita ocupada por mais de {self._timeout}s")
+        try:
+            return super().connect()
+        except Exception:
+            self._fila_justa.sair()
+            raise
+
+    def _do_return_conn(self, registro_conexao):
+        try:
+            super()._do_return_conn(registro_conexao)
+        finally:
+            self._fila_justa.sair()
+
+
+def _pragmas_sqlite(somente_leitura: bool):
+    """Listener de connect que aplica os PRAGMAs do modo SQLite otimizado"""
+    pragmas = [
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if somente_leitura:
+        # Escrita que escape do roteamento falha em vez de disputar o lock
+        pragmas.append("PRAGMA query_only=ON")
+    else:
+        # WAL fica gravado no arquivo; synchronous vale por conexão
+        pragmas += ["PRAGMA journal_mode=WAL", "PRAGMA synchronous=NORMAL"]
+
+    def aplicar(conexao_dbapi, registro_conexao):
+        cursor = conexao_dbapi.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+    return aplicar
+
+
+def _url_postgres(url: str) -> URL:
+    """URL do PostgreSQL com o driver de DB_DRIVER_PG, se a URL não indicar um"""
+    url = make_url(url)
+    if url.drivername in ("postgres", "postgresql"):
+        url = url.set(drivername=f"postgresql+{DB_DRIVER_PG}")
+    if url.get_driver_name() == "psycopg" and importlib.util.find_spec("psycopg") is None:
+        # Driver opcional, fora de requirements.txt
+        raise RuntimeError(
+            "DB_DRIVER_PG=psycopg requer o pacote 'psycopg' (pip install -r requirements-opcionais.txt)"
+        )
+    return url
+
+
+def _argumentos_postgres(driver: str) -> dict:
+    """Parâmetros de conexão: timeouts e, no psycopg 3, comandos preparados no servidor"""
+    argumentos = {"connect_timeout": DB_CONNECT_TIMEOUT_S}
+    if DB_STATEMENT_TIMEOUT_MS > 0:
+        argumentos["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    if driver == "psycopg":
+        # Consulta executada DB_PREPARAR_APOS vezes na conexão passa a ser
+        # preparada no servidor (sem novo parse/planejamento a cada vez).
+        # Desligar (-1) atrás de pgbouncer em modo transaction
+        argumentos["prepare_threshold"] = DB_PREPARAR_APOS if DB_PREPARAR_APOS >= 0 else None
+    return argumentos
+
+
+if SQLITE_MODO not in ("padrao", "otimizado"):
+    raise ValueError(f"SQLITE_MODO inválido: '{SQLITE_MODO}'")
+
+
+def _criar_engines() -> Tuple[Engine, Engine]:
+    """
+    Cria `engine`, que recebe todas as escritas (e o DDL), e
+    `engine_leitura`: o mesmo engine, exceto no SQLite otimizado
+    """
+    if DATABASE_URL.startswith("sqlite") and ":memory:" in DATABASE_URL:
+        # SQLite em memória só existe dentro de uma conexão: compartilhar a mesma
+        engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+            echo=False  # True para ver queries SQL
+        )
+        engine_leitura = engine
+    elif DATABASE_URL.startswith("sqlite") and SQLITE_MODO == "otimizado":
+        # SQLite em produção (instalações locais): WAL deixa leituras rodarem
+        # junto com a escrita, então as leituras usam um pool de conexões e as
+        # escritas uma única conexão, que serializa os escritores deste
+        # processo sem disputa pelo lock do arquivo (entre processos, o
+        # busy_timeout espera a vez)
+        engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            echo=False,
+            poolclass=PoolEscrita,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+        event.listen(engine, "connect", _pragmas_sqlite(somente_leitura=False))
+        engine_leitura = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            echo=False,
+            poolclass=PoolMedido,
+            pool_size=SQLITE_LEITURA_POOL,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+        event.listen(engine_leitura, "connect", _pragmas_sqlite(somente_leitura=True))
+    elif DATABASE_URL.startswith("sqlite"):
+        # Configuração para SQLite (desenvolvimento)
+        # Uma conexão por thread do threadpool; StaticPool compartilharia
+        # a mesma conexão (e transação) entre requisições simultâneas
+        engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            echo=False,  # True para ver queries SQL
+            poolclass=PoolMedido,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT
+        )
+        engine_leitura = engine
+    else:
+        # Configuração para PostgreSQL (produção)
+        # pre_ping descarta conexões derrubadas pelo servidor (ou pelo proxy)
+        # antes de entregá-las; recycle renova as antigas
+        url_postgres = _url_postgres(DATABASE_URL)
+        engine = create_engine(
+            url_postgres,
+            connect_args=_argumentos_postgres(url_postgres.get_driver_name()),
+            echo=False,
+            poolclass=PoolMedido,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=DB_POOL_PRE_PING,
+            pool_recycle=DB_POOL_RECYCLE_S if DB_POOL_RECYCLE_S > 0 else -1
+        )
+        engine_leitura = engine
+
+    for _engine in {engine, engine_leitura}:
+        event.listen(_engine, "checkout", _marcar_checkout)
+        event.listen(_engine, "checkin", _medir_uso)
+        event.listen(_engine, "do_connect", _marcar_abertura)
+        event.listen(_engine, "connect", _medir_abertura)
+        event.listen(_engine, "invalidate", _contar_invalidacao)
+    return engine, engine_leitura
+
+
+# Criados no primeiro uso (obter_engines): importar o módulo não carrega
+# o driver do banco nem monta os pools
+_engines: Optional[Tuple[Engine, Engine]] = None
+_lock_engines = threading.Lock()
+
+
+def obter_engines() -> Tuple[Engine, Engine]:
+    """(engine, engine_leitura), criados na primeira chamada"""
+    global _engines
+    if _engines is None:
+        with _lock_engines:
+            if _engines is None:
+                _engines = _criar_engines()
+    return _engines
+
+
+def __getattr__(nome: str):
+    # `from src.database.connection import engine` continua funcionando
+    if nome == 'engine':
+        return obter_engines()[0]
+    if nome == 'engine_leitura':
+        return obter_engines()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
+def _marcar_checkout(conexao_dbapi, registro_conexao, proxy):
+    registro_conexao.info['metricas_checkout'] = time.perf_counter()
+
+
+def _medir_uso(conexao_dbapi, registro_conexao):
+    inicio = registro_conexao.info.pop('metricas_checkout', None)
+    if inicio is not None:
+        _USO_CONEXAO.observar(time.perf_counter() - inicio)
+
+
+def _marcar_abertura(dialeto, registro_conexao, cargs, cparams):
+    registro_conexao.info['metricas_abertura'] = time.perf_counter()
+
+
+def _medir_abertura(conexao_dbapi, registro_conexao):
+    inicio = registro_conexao.info.pop('metricas_abertura', None)
+    if inicio is not None:
+        _ABERTURA_CONEXAO.observar(time.perf_counter() - inicio)
+
+
+def _contar_invalidacao(conexao_dbapi, registro_conexao, excecao):
+    # Inclui as conexões mortas detectadas pelo pre_ping
+    _INVALIDADAS.incrementar()
+
+
+def _estado_pool():
+    # engine.pool é lido a cada coleta: engine.dispose() troca o pool
+    estado = {}
+    if _engines is None:
+        return estado
+    engine, engine_leitura = _engines
+    pools = [('principal', engine)]
+    if engine_leitura is not engine:
+        pools.append(('leitura', engine_leitura))
+    for nome, engine_pool in pools:
+        pool = engine_pool.pool
+        if not isinstance(pool, QueuePool):
+            continue
+        estado.update({
+            (nome, 'em_uso'): pool.checkedout(),
+            (nome, 'livres'): pool.checkedin(),
+            (nome, 'tamanho'): pool.size(),
+            (nome, 'overflow'): max(pool.overflow(), 0),
+        })
+    return estado
+
+
+metricas.coletada(
+    'agrovoz_db_pool_conexoes', 'Conexões do pool por estado', _estado_pool, ('pool', 'estado')
+)
+
+# Colunas de um registro devolvidas pela API (listagem e exportação), nesta ordem
+COLUNAS_REGISTRO = (
+    'id', 'id_externo', 'data_registro', 'tipo_atividade', 'descricao_original',
+    'pessoa_envolvida', 'servico_realizado', 'cultura', 'talhao',
+    'valor_monetario', 'quantidade', 'unidade_medida',
+    'confirmado', 'precisa_revisao'
+)
+
+class SessaoRoteada(Session):
+    """
+    Sessão que envia leituras para `engine_leitura` e escritas para `engine`.
+
+    Vão para o engine de escrita: o flush, comandos INSERT/UPDATE/DELETE e
+    SELECT ... FOR UPDATE (leitura seguida de alteração). Depois da
+    primeira escrita, o resto da transação também fica nele, para ler o
+    que acabou de ser escrito.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        engine, engine_leitura = obter_engines()
+        if engine_leitura is engine or self.info.get('escrevendo'):
+            return engine
+        if self._flushing or (clause is not None and (
+                getattr(clause, 'is_dml', False)
+                or getattr(clause, '_for_update_arg', None) is not None)):
+            self.info['escrevendo'] = True
+            return engine
+        return engine_leitura
+
+
+@event.listens_for(SessaoRoteada, "after_transaction_end")
+def _fim_escrita(sessao, transacao):
+    if transacao.parent is None:
+        sessao.info.pop('escrevendo', None)
+
+
+# Criar sessionmaker (o engine é escolhido, e criado, na primeira consulta)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=SessaoRoteada)
 
 def create_tables():
-    """Criar todas as tabelas no banco"""
+    """Aplica as migrações pendentes do esquema (ver src/database/migracoes.py)"""
+    from src.database import migracoes
+
     try:
-        Base.metadata.create_all(bind=engine)
-        print("Tabelas criadas com sucesso!")
+        aplicadas = migracoes.atualizar(obter_engines()[0])
+        print(f"Tabelas criadas com sucesso! ({len(aplicadas)} migrações aplicadas)")
     except Exception as e:
         print(f"Erro ao criar tabelas: {e}")
+        raise
+
+def verificar_esquema():
+    """Confere se o banco tem todas as migrações; levanta EsquemaDesatualizado se não"""
+    from src.database import migracoes
+
+    migracoes.verificar(obter_engines()[0])
+
+def verificar_conexao():
+    """Executa SELECT 1 no banco; levanta a exceção do driver se estiver indisponível"""
+    # Pelo pool de leitura: não espera na fila da conexão de escrita
+    with obter_engines()[1].connect() as conexao:
+        conexao.execute(text("SELECT 1"))
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency para obter sessão do banco"""
@@ -53,38 +404,341 @@ class DatabaseService:
     def __init__(self, db: Session):
         self.db = db
     
-    def criar_registro(self, registro_data: dict) -> int:
-        """Criar novo registro rural"""
-        from src.database.models import RegistroRural
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def criar_registro(self, registro_data: dict,
+                       chave_idempotencia: Optional[dict] = None) -> int:
+        """
+        Criar novo registro rural
+        
+        `chave_idempotencia` (colunas de ChaveIdempotencia, sem registro_id)
+        é gravada na mesma transação, apontando para o registro criado.
+        """
+        from src.database.models import RegistroRural, ChaveIdempotencia
+        
+        # Data definida aqui para o agregado diário usar o mesmo dia do registro
+        if registro_data.get('data_registro') is None:
+            registro_data = dict(registro_data, data_registro=datetime.now())
         
         registro = RegistroRural(**registro_data)
         self.db.add(registro)
-        self.db.commit()
-        self.db.refresh(registro)
-        return registro.id
+        try:
+            estatisticas.registrar_registros(self.db, [registro_data])
+            # O id sai do flush: dispensa o SELECT de um refresh após o commit
+            self.db.flush()
+            registro_id = registro.id
+            if chave_idempotencia is not None:
+                self.db.add(ChaveIdempotencia(registro_id=registro_id, **chave_idempotencia))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return registro_id
     
-    def buscar_registros_usuario(self, usuario_id: str, limit: int = 50):
-        """Buscar registros de um usuário"""
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def criar_registros(self, registros_data: List[dict],
+                        chaves_idempotencia: Optional[List[Optional[dict]]] = None) -> List[int]:
+        """
+        Criar vários registros em um único INSERT e uma única transação
+        
+        `chaves_idempotencia`, se informada, tem um item (ou None) por
+        registro, como em criar_registro.
+        """
+        from src.database.models import RegistroRural, ChaveIdempotencia
+        
+        if not registros_data:
+            return []
+        
+        agora = datetime.now()
+        registros_data = [
+            dados if 'data_registro' in dados else dict(dados, data_registro=agora)
+            for dados in registros_data
+        ]
+        
+        stmt = insert(RegistroRural).returning(
+            RegistroRural.id, sort_by_parameter_order=True
+        )
+        try:
+            ids = self.db.scalars(stmt, registros_data).all()
+            estatisticas.registrar_registros(self.db, registros_data)
+            chaves = [
+                dict(chave, registro_id=registro_id)
+                for registro_id, chave in zip(ids, chaves_idempotencia or ())
+                if chave is not None
+            ]
+            if chaves:
+                self.db.execute(insert(ChaveIdempotencia), chaves)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return list(ids)
+    
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def ids_por_id_externo(self, ids_externos: List[str]) -> Dict[str, int]:
+        """ID de cada um dos IDs externos já gravados"""
         from src.database.models import RegistroRural
+
+        if not ids_externos:
+            return {}
+        return dict(self.db.execute(
+            select(RegistroRural.id_externo, RegistroRural.id)
+            .where(RegistroRural.id_externo.in_(ids_externos))
+        ).all())
+
+    def ids_externos_existentes(self, ids_externos: List[str]) -> set:
+        """Quais dos IDs externos já estão gravados"""
+        return set(self.ids_por_id_externo(ids_externos))
+    
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def buscar_registros_usuario(self, usuario_id: str, limit: int = 50,
+                                 apos: Optional[Tuple[datetime, int]] = None,
+                                 tipo_atividade: Optional[str] = None,
+                                 cultura: Optional[str] = None,
+                                 talhao: Optional[int] = None,
+                                 data_inicio: Optional[date] = None,
+                                 data_fim: Optional[date] = None,
+                                 revisao_pendente: bool = False) -> List[dict]:
+        """
+        Buscar registros de um usuário, dos mais recentes para os mais antigos
+        
+        Paginação por chave (keyset) em (data_registro, id), seguindo o índice
+        ix_registros_usuario_data_id (ou ix_registros_fila_revisao, com
+        `revisao_pendente`): `apos` é a posição do último registro da página
+        anterior, e a consulta continua a partir dele sem OFFSET.
+        
+        Seleciona só COLUNAS_REGISTRO e devolve dicts, sem montar objetos ORM.
+        """
+        from src.database.models import RegistroRural
+        
+        filtros = self._filtros_registros(
+            usuario_id, tipo_atividade, cultura, talhao, data_inicio, data_fim,
+            revisao_pendente
+        )
+        if apos is not None:
+            data_apos, id_apos = apos
+            filtros.append(or_(
+                RegistroRural.data_registro < data_apos,
+                and_(RegistroRural.data_registro == data_apos, RegistroRural.id > id_apos)
+            ))
+        
+        stmt = select(*(RegistroRural.__table__.c[nome] for nome in COLUNAS_REGISTRO))\
+            .where(*filtros)\
+            .order_by(RegistroRural.data_registro.desc(), RegistroRural.id)\
+            .limit(limit)
+        return [dict(linha) for linha in self.db.execute(stmt).mappings()]
+    
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def buscar_registros_texto(self, usuario_id: str, texto: str, limit: int = 50,
+                               apos: Optional[Tuple[float, int]] = None,
+                               tipo_atividade: Optional[str] = None,
+                               cultura: Optional[str] = None,
+                               talhao: Optional[int] = None,
+                               data_inicio: Optional[date] = None,
+                               data_fim: Optional[date] = None) -> List[dict]:
+        """
+        Buscar registros do usuário cuja descrição contém as palavras de
+        `texto`, dos mais para os menos relevantes (ver src/database/busca.py)
         
-        return self.db.query(RegistroRural)\
-                     .filter(RegistroRural.usuario_id == usuario_id)\
-                     .order_by(RegistroRural.data_registro.desc())\
-                     .limit(limit)\
-                     .all()
+        Paginação por chave em (relevancia, id): `apos` é a posição do
+        último registro da página anterior.
+        """
+        filtros = self._filtros_registros(
+            usuario_id, tipo_atividade, cultura, talhao, data_inicio, data_fim
+        )
+        return busca.buscar(self.db, texto, filtros, limit, apos)
     
+    @staticmethod
+    def _filtros_registros(usuario_id: str,
+                           tipo_atividade: Optional[str] = None,
+                           cultura: Optional[str] = None,
+                           talhao: Optional[int] = None,
+                           data_inicio: Optional[date] = None,
+                           data_fim: Optional[date] = None,
+                           revisao_pendente: bool = False) -> list:
+        """Condições dos filtros de listagem; datas são inclusivas"""
+        from src.database.models import RegistroRural
+        
+        filtros = [RegistroRural.usuario_id == usuario_id]
+        if revisao_pendente:
+            # Escrito como o predicado de ix_registros_fila_revisao
+            filtros.append(RegistroRural.precisa_revisao == True)
+            filtros.append(RegistroRural.confirmado == False)
+        if data_inicio is not None:
+            filtros.append(RegistroRural.data_registro >= data_inicio)
+        if data_fim is not None:
+            filtros.append(RegistroRural.data_registro < data_fim + timedelta(days=1))
+        if tipo_atividade is not None:
+            filtros.append(RegistroRural.tipo_atividade == tipo_atividade)
+        if cultura is not None:
+            filtros.append(func.lower(RegistroRural.cultura) == cultura.lower())
+        if talhao is not None:
+            filtros.append(RegistroRural.talhao == talhao)
+        return filtros
+    
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def exportar_registros(self, usuario_id: str,
+                           data_inicio: Optional[date] = None,
+                           data_fim: Optional[date] = None,
+                           lote: int = 1000) -> Iterator[dict]:
+        """
+        Percorre os registros do usuário em ordem cronológica, sem carregar
+        tudo em memória: yield_per usa cursor do lado do servidor no
+        PostgreSQL e busca `lote` linhas por vez
+        """
+        from src.database.models import RegistroRural
+        
+        colunas = [RegistroRural.__table__.c[nome] for nome in COLUNAS_REGISTRO]
+        stmt = select(*colunas)\
+            .where(*self._filtros_registros(usuario_id, data_inicio=data_inicio, data_fim=data_fim))\
+            .order_by(RegistroRural.data_registro, RegistroRural.id)\
+            .execution_options(yield_per=lote)
+        
+        for linha in self.db.execute(stmt):
+            yield linha._asdict()
+    
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
     def confirmar_registro(self, registro_id: int, usuario_id: str) -> bool:
         """Confirmar um registro como correto"""
         from src.database.models import RegistroRural
         
+        # FOR UPDATE: duas confirmações simultâneas não contam duas vezes nos agregados
         registro = self.db.query(RegistroRural)\
                          .filter(RegistroRural.id == registro_id,
                                 RegistroRural.usuario_id == usuario_id)\
+                         .with_for_update()\
                          .first()
         
         if registro:
+            antes = estatisticas.dados_agregados(registro)
             registro.confirmado = True
             registro.precisa_revisao = False
-            self.db.commit()
+            try:
+                if not antes['confirmado']:
+                    estatisticas.registrar_alteracao(
+                        self.db, antes, estatisticas.dados_agregados(registro)
+                    )
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
             return True
         return False
+    
+    def alterar_registros(self, valores_por_id: Dict[int, Dict[str, Any]],
+                          *filtros) -> Tuple[List[int], int]:
+        """
+        Aplica a cada registro (dos ids que satisfazem `filtros`) as colunas
+        de `valores_por_id` que mudaram, corrigindo os agregados. Os
+        registros são lidos com lock; sem commit.
+        
+        Returns:
+            (ids encontrados, quantidade de registros alterados)
+        """
+        from src.database.models import RegistroRural
+        
+        if not valores_por_id:
+            return [], 0
+        colunas = {'id', 'usuario_id', 'data_registro', 'confirmado', *estatisticas.DIMENSOES,
+                   'valor_monetario'}
+        for valores in valores_por_id.values():
+            colunas.update(valores)
+        tabela = RegistroRural.__table__
+        atuais = self.db.execute(
+            select(*(tabela.c[nome] for nome in sorted(colunas)))
+            .where(RegistroRural.id.in_(list(valores_por_id)), *filtros)
+            .order_by(RegistroRural.id)
+            .with_for_update()
+        ).all()
+        
+        parametros = []
+        deltas: estatisticas.Deltas = {}
+        for linha in atuais:
+            antes = linha._mapping
+            alteradas = {
+                coluna: valor for coluna, valor in valores_por_id[linha.id].items()
+                if antes[coluna] != valor
+            }
+            if not alteradas:
+                continue
+            parametros.append(dict(alteradas, id=linha.id))
+            estatisticas.acumular(deltas, estatisticas.contribuicoes(antes, sinal=-1))
+            estatisticas.acumular(deltas, estatisticas.contribuicoes({**antes, **alteradas}))
+        
+        if parametros:
+            # UPDATE em massa por chave primária (agrupado pelas colunas alteradas)
+            self.db.execute(update(RegistroRural), parametros)
+            estatisticas.aplicar(self.db, deltas)
+        return [linha.id for linha in atuais], len(parametros)
+    
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def revisar_registros(self, usuario_id: str,
+                          revisoes: Dict[int, Tuple[Dict[str, Any], bool]]) -> Tuple[List[int], int]:
+        """
+        Corrige e/ou confirma vários registros do usuário em uma transação
+        
+        Args:
+            revisoes: id -> (campos corrigidos, confirmar)
+            
+        Returns:
+            (ids encontrados, quantidade de registros alterados)
+        """
+        from src.database.models import RegistroRural
+        
+        valores_por_id = {}
+        for registro_id, (campos, confirmar) in revisoes.items():
+            valores = dict(campos)
+            if campos:
+                # Protege a correção da reextração (ver src/nlp/reextracao.py)
+                valores['editado_manualmente'] = True
+            if confirmar:
+                valores['confirmado'] = True
+                valores['precisa_revisao'] = False
+            valores_por_id[registro_id] = valores
+        try:
+            resultado = self.alterar_registros(
+                valores_por_id, RegistroRural.usuario_id == usuario_id
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return resultado
+    
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def obter_estatisticas(self, usuario_id: str, data_inicio: date, data_fim: date) -> dict:
+        """Estatísticas do período a partir dos agregados diários"""
+        return estatisticas.consultar(self.db, usuario_id, data_inicio, data_fim)
+    
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def buscar_configuracao_nlp(self, usuario_id: str):
+        """Buscar a configuração de NLP mais recente de um usuário (também a do vocabulário do NLP)"""
+        from src.database.models import ConfiguracaoNLP
+        
+        return self.db.query(ConfiguracaoNLP)\
+                     .filter(ConfiguracaoNLP.usuario_id == usuario_id)\
+                     .order_by(ConfiguracaoNLP.id.desc())\
+                     .first()
+    
+    @metricas.cronometrar(_TEMPO_OPERACAO, _ERROS_OPERACAO)
+    def salvar_configuracao_nlp(self, usuario_id: str, nomes_funcionarios: List[str],
+                                culturas: List[str], talhoes: List[int],
+                                limites_validacao: Optional[Dict[str, float]] = None):
+        """Criar ou atualizar o vocabulário personalizado de um usuário"""
+        from src.database.models import ConfiguracaoNLP
+        
+        config = self.buscar_configuracao_nlp(usuario_id)
+        if config is None:
+            config = ConfiguracaoNLP(usuario_id=usuario_id)
+            self.db.add(config)
+        
+        config.nomes_funcionarios = json.dumps(nomes_funcionarios, ensure_ascii=False)
+        config.culturas_utilizadas = json.dumps(culturas, ensure_ascii=False)
+        config.talhoes_existentes = json.dumps(talhoes)
+        config.limites_validacao = json.dumps(limites_validacao or {})
+        try:
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        self.db.refresh(config)
+        return config
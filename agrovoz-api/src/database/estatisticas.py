@@ -0,0 +1,318 @@
+"""
+Agregados diários e mensais por usuário (tabela estatisticas_diarias).
+
+Cada registro contribui para a linha 'total' do seu dia e do seu mês e para
+uma linha por recorte (tipo de atividade, cultura e talhão). As contribuições
+são aplicadas por upsert incremental na mesma transação que grava o registro.
+/estatisticas lê os meses inteiros do período nas linhas mensais e só as
+pontas nas diárias, em vez de varrer os registros do usuário.
+
+Reconstrução (backfill ou correção):
+    python -m src.database.estatisticas reconstruir [--usuario ID]
+"""
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, union_all, update
+from sqlalchemy.orm import Session
+
+from src.database.models import EstatisticaDiaria, RegistroRural
+
+# Recortes mantidos além do total do dia
+DIMENSOES = ('tipo_atividade', 'cultura', 'talhao')
+
+# Atividades cujo valor é receita; as demais contam como gasto
+TIPOS_RECEITA = ('venda',)
+
+# (usuario_id, granularidade, dia, dimensao, valor) -> [registros, confirmados, valor_total]
+Chave = Tuple[str, str, date, str, str]
+Deltas = Dict[Chave, List[Any]]
+
+_COLUNAS_CHAVE = ('usuario_id', 'granularidade', 'dia', 'dimensao', 'valor')
+_LOTE_ESCRITA = 1000
+
+
+def _dia(data_registro) -> date:
+    if isinstance(data_registro, datetime):
+        return data_registro.date()
+    if isinstance(data_registro, date):
+        return data_registro
+    return datetime.fromisoformat(str(data_registro)).date()
+
+
+def _proximo_mes(dia: date) -> date:
+    """Primeiro dia do mês seguinte"""
+    return (dia.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def contribuicoes(dados: Mapping[str, Any], sinal: int = 1) -> Deltas:
+    """
+    Contribuição de um registro para os agregados.
+
+    `sinal` -1 retira a contribuição (remoção ou estado anterior de uma
+    alteração).
+    """
+    usuario_id = dados['usuario_id']
+    dia = _dia(dados['data_registro'])
+    delta = [
+        sinal,
+        sinal if dados.get('confirmado') else 0,
+        sinal * (dados.get('valor_monetario') or 0.0)
+    ]
+
+    recortes = [('total', '')]
+    for dimensao in DIMENSOES:
+        valor = dados.get(dimensao)
+        if valor is not None and valor != '':
+            recortes.append((dimensao, str(valor)))
+
+    deltas: Deltas = {}
+    for granularidade, inicio in (('D', dia), ('M', dia.replace(day=1))):
+        for dimensao, valor in recortes:
+            deltas[(usuario_id, granularidade, inicio, dimensao, valor)] = list(delta)
+    return deltas
+
+
+def acumular(destino: Deltas, origem: Deltas) -> Deltas:
+    for chave, (registros, confirmados, valor) in origem.items():
+        atual = destino.get(chave)
+        if atual is None:
+            destino[chave] = [registros, confirmados, valor]
+        else:
+            atual[0] += registros
+            atual[1] += confirmados
+            atual[2] += valor
+    return destino
+
+
+def _linhas(deltas: Deltas) -> List[Dict[str, Any]]:
+    # Ordem fixa das chaves: transações concorrentes travam as linhas na
+    # mesma sequência e não entram em deadlock
+    return [
+        {
+            'usuario_id': usuario_id, 'granularidade': granularidade, 'dia': dia,
+            'dimensao': dimensao, 'valor': valor,
+            'total_registros': registros, 'registros_confirmados': confirmados,
+            'valor_total': valor_total
+        }
+        for (usuario_id, granularidade, dia, dimensao, valor), (registros, confirmados, valor_total)
+        in sorted(deltas.items())
+        if registros or confirmados or valor_total
+    ]
+
+
+def aplicar(db: Session, deltas: Deltas):
+    """
+    Soma os deltas aos agregados, sem commit: roda na transação de quem
+    gravou os registros.
+    """
+    linhas = _linhas(deltas)
+    if not linhas:
+        return
+
+    tabela = EstatisticaDiaria.__table__
+    dialeto = db.get_bind().dialect.name
+    if dialeto == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as insert_upsert
+    elif dialeto == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as insert_upsert
+    else:
+        _aplicar_generico(db, linhas)
+        return
+
+    stmt = insert_upsert(tabela)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(_COLUNAS_CHAVE),
+        set_={
+            'total_registros': tabela.c.total_registros + stmt.excluded.total_registros,
+            'registros_confirmados': tabela.c.registros_confirmados + stmt.excluded.registros_confirmados,
+            'valor_total': tabela.c.valor_total + stmt.excluded.valor_total,
+        }
+    )
+    db.execute(stmt, linhas)
+
+
+def _aplicar_generico(db: Session, linhas: List[Dict[str, Any]]):
+    """UPDATE e, se a linha não existir, INSERT (bancos sem upsert)"""
+    tabela = EstatisticaDiaria.__table__
+    for linha in linhas:
+        resultado = db.execute(
+            update(tabela)
+            .where(*(tabela.c[coluna] == linha[coluna] for coluna in _COLUNAS_CHAVE))
+            .values(
+                total_registros=tabela.c.total_registros + linha['total_registros'],
+                registros_confirmados=tabela.c.registros_confirmados + linha['registros_confirmados'],
+                valor_total=tabela.c.valor_total + linha['valor_total']
+            )
+        )
+        if resultado.rowcount == 0:
+            db.execute(insert(tabela), [linha])
+
+
+def registrar_registros(db: Session, registros: Iterable[Mapping[str, Any]]):
+    """Soma novos registros aos agregados"""
+    deltas: Deltas = {}
+    for dados in registros:
+        acumular(deltas, contribuicoes(dados))
+    aplicar(db, deltas)
+
+
+def registrar_alteracao(db: Session, antes: Mapping[str, Any], depois: Mapping[str, Any]):
+    """Move a contribuição de um registro do estado anterior para o novo"""
+    deltas = contribuicoes(antes, sinal=-1)
+    acumular(deltas, contribuicoes(depois))
+    aplicar(db, deltas)
+
+
+def dados_agregados(registro: RegistroRural) -> Dict[str, Any]:
+    """Campos de um registro que entram nos agregados"""
+    return {
+        'usuario_id': registro.usuario_id,
+        'data_registro': registro.data_registro,
+        'tipo_atividade': registro.tipo_atividade,
+        'cultura': registro.cultura,
+        'talhao': registro.talhao,
+        'valor_monetario': registro.valor_monetario,
+        'confirmado': registro.confirmado,
+    }
+
+
+def consultar(db: Session, usuario_id: str, inicio: date, fim: date) -> Dict[str, Any]:
+    """Estatísticas do usuário entre `inicio` e `fim` (inclusive)"""
+    tabela = EstatisticaDiaria.__table__
+    apos_fim = fim + timedelta(days=1)
+
+    def intervalo(granularidade: str, de: date, ate: date):
+        """Linhas de [de, ate): um intervalo contíguo do índice único"""
+        return select(
+            tabela.c.dimensao, tabela.c.valor, tabela.c.total_registros,
+            tabela.c.registros_confirmados, tabela.c.valor_total
+        ).where(
+            tabela.c.usuario_id == usuario_id, tabela.c.granularidade == granularidade,
+            tabela.c.dia >= de, tabela.c.dia < ate
+        )
+
+    # Meses inteiros dentro do período vêm das linhas mensais; os dias
+    # das pontas, das diárias
+    primeiro_mes = inicio if inicio.day == 1 else _proximo_mes(inicio)
+    fim_meses = apos_fim if apos_fim.day == 1 else fim.replace(day=1)
+    if primeiro_mes < fim_meses:
+        partes = [intervalo('M', primeiro_mes, fim_meses)]
+        if inicio < primeiro_mes:
+            partes.append(intervalo('D', inicio, primeiro_mes))
+        if fim_meses < apos_fim:
+            partes.append(intervalo('D', fim_meses, apos_fim))
+    else:
+        partes = [intervalo('D', inicio, apos_fim)]
+    linhas = union_all(*partes).subquery() if len(partes) > 1 else partes[0].subquery()
+
+    recortes = db.execute(
+        select(
+            linhas.c.dimensao, linhas.c.valor,
+            func.sum(linhas.c.total_registros),
+            func.sum(linhas.c.registros_confirmados),
+            func.sum(linhas.c.valor_total)
+        )
+        .group_by(linhas.c.dimensao, linhas.c.valor)
+    ).all()
+
+    por_dia = db.execute(
+        select(tabela.c.dia, tabela.c.total_registros, tabela.c.valor_total)
+        .where(tabela.c.usuario_id == usuario_id, tabela.c.granularidade == 'D',
+               tabela.c.dia >= inicio, tabela.c.dia < apos_fim,
+               tabela.c.dimensao == 'total', tabela.c.total_registros > 0)
+        .order_by(tabela.c.dia)
+    ).all()
+
+    resultado = {
+        'total_registros': 0,
+        'registros_confirmados': 0,
+        'valor_total_gastos': 0.0,
+        'valor_total_vendas': 0.0,
+        'por_tipo': {},
+        'por_cultura': {},
+        'por_talhao': {},
+        'por_dia': [
+            {'dia': dia, 'registros': registros, 'valor_total': valor_total}
+            for dia, registros, valor_total in por_dia
+        ]
+    }
+    valor_total = 0.0
+    for dimensao, valor, registros, confirmados, soma_valor in recortes:
+        if not registros:
+            continue
+        if dimensao == 'total':
+            resultado['total_registros'] = registros
+            resultado['registros_confirmados'] = confirmados
+            valor_total = soma_valor
+            continue
+        resumo = {'registros': registros, 'confirmados': confirmados, 'valor_total': soma_valor}
+        resultado[f"por_{'tipo' if dimensao == 'tipo_atividade' else dimensao}"][valor] = resumo
+        if dimensao == 'tipo_atividade' and valor in TIPOS_RECEITA:
+            resultado['valor_total_vendas'] += soma_valor
+
+    resultado['valor_total_gastos'] = valor_total - resultado['valor_total_vendas']
+    return resultado
+
+
+def reconstruir(db: Session, usuario_id: Optional[str] = None) -> int:
+    """
+    Recalcula os agregados a partir de registros_rurais (todos os usuários
+    ou um só) e faz commit. Escritas de registros durante a reconstrução
+    podem ficar de fora; rodar com a ingestão pausada.
+
+    Returns:
+        Quantidade de registros agregados
+    """
+    tabela = EstatisticaDiaria.__table__
+    filtro_estatisticas = [tabela.c.usuario_id == usuario_id] if usuario_id else []
+    filtro_registros = [RegistroRural.usuario_id == usuario_id] if usuario_id else []
+
+    consulta = select(
+        RegistroRural.usuario_id, RegistroRural.data_registro,
+        RegistroRural.tipo_atividade, RegistroRural.cultura, RegistroRural.talhao,
+        RegistroRural.valor_monetario, RegistroRural.confirmado
+    ).where(*filtro_registros).execution_options(yield_per=5000)
+
+    try:
+        db.execute(delete(tabela).where(*filtro_estatisticas))
+
+        deltas: Deltas = {}
+        total = 0
+        for linha in db.execute(consulta):
+            acumular(deltas, contribuicoes(linha._mapping))
+            total += 1
+
+        linhas = _linhas(deltas)
+        for inicio in range(0, len(linhas), _LOTE_ESCRITA):
+            db.execute(insert(tabela), linhas[inicio:inicio + _LOTE_ESCRITA])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return total
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Agregados de estatísticas do AgroVoz")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    reconstrucao = comandos.add_parser('reconstruir', help="Recalcula estatisticas_diarias")
+    reconstrucao.add_argument('--usuario', help="Reconstruir só este usuário")
+    args = parser.parse_args(argv)
+
+    from src.database.connection import SessionLocal, create_tables
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        inicio = datetime.now()
+        total = reconstruir(db, args.usuario)
+        duracao = (datetime.now() - inicio).total_seconds()
+        print(f"{total} registros agregados em {duracao:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src import metricas
+from src.config import (
+    INGESTAO_MODO, INGESTAO_FILA_MAX, INGESTAO_LOTE_MAX_ITENS, INGESTAO_LOTE_MAX_LATENCIA_MS,
+    INGESTAO_ESPERA_FILA_MS, INGESTAO_DRENAGEM_TIMEOUT_S
+)
+from src.database.connection import DatabaseService, SessionLocal
+
+_TAMANHO_LOTE = metricas.histograma(
+    'agrovoz_ingestao_lote_itens', 'Registros por lote gravado pela fila de ingestão',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000)
+).rotulado()
+_TEMPO_LOTE = metricas.histograma(
+    'agrovoz_ingestao_lote_segundos', 'Duração da gravação de um lote da fila de ingestão'
+).rotulado()
+_REGISTROS = metricas.contador(
+    'agrovoz_ingestao_registros_total', 'Registros que saíram da fila de ingestão', ('resultado',)
+)
+_GRAVADOS = _REGISTROS.rotulado('gravado')
+_DUPLICADOS = _REGISTROS.rotulado('duplicado')
+_DESCARTADOS = _REGISTROS.rotulado('descartado')
+_REJEICOES = metricas.contador(
+    'agrovoz_ingestao_rejeicoes_total', 'Registros recusados com a fila de ingestão cheia'
+).rotulado()
+
+# Fila do gravador em execução, para a métrica de ocupação
+_fila_ativa: Optional["queue.Queue"] = None
+
+metricas.coletada(
+    'agrovoz_ingestao_fila_itens', 'Registros aguardando gravação',
+    lambda: _fila_ativa.qsize() if _fila_ativa is not None else None
+)
+
+
+class FilaCheia(Exception):
+    """A fila de ingestão não tem vaga (ou está encerrando)"""
+
+
+class GravadorDireto:
+    """Grava o registro na própria requisição, com commit antes de responder"""
+
+    sincrono = True
+
+    def iniciar(self):
+        pass
+
+    def encerrar(self):
+        pass
+
+    def gravar(self, db: Session, dados: Dict,
+               chave_idempotencia: Optional[Dict] = None) -> Optional[int]:
+        return DatabaseService(db).criar_registro(dados, chave_idempotencia)
+
+
+# Sinal para a thread de gravação encerrar
+_PARAR = object()
+
+
+class GravadorFila:
+    """
+    Write-behind dos registros de /processar-fala.
+
+    gravar() só enfileira e devolve None: a requisição responde logo após o
+    NLP, com o id_externo do registro. Uma thread tira da fila lotes de até
+    `max_itens` registros, esperando no máximo `max_latencia_ms` depois do
+    primeiro, e grava cada lote com DatabaseService.criar_registros (um
+    INSERT e um commit, agregados de estatísticas incluídos).
+
+    Com a fila cheia, gravar() espera até `espera_fila_ms` e levanta
+    FilaCheia: o banco lento vira 503 para o app reenviar, em vez de
+    memória crescendo sem limite. Falhas do banco são repetidas com espera
+    crescente; registros com id_externo já gravado são ignorados, então
+    reenvios não duplicam. Ao encerrar, o que estiver na fila é gravado
+    (até `timeout_drenagem_s`).
+    """
+
+    sincrono = False
+
+    def __init__(self, max_fila: int, max_itens: int, max_latencia_ms: float,
+                 espera_fila_ms: float, timeout_drenagem_s: float,
+                 fabrica_sessao: Callable[[], Session] = SessionLocal):
+        self.max_itens = max_itens
+        self.max_latencia = max_latencia_ms / 1000
+        self.espera_fila = espera_fila_ms / 1000
+        self.timeout_drenagem = timeout_drenagem_s
+        self.fabrica_sessao = fabrica_sessao
+        self._fila: "queue.Queue" = queue.Queue(maxsize=max_fila)
+        self._gravadora: Optional[threading.Thread] = None
+        self._encerrando = False
+        # Depois deste instante, lotes que falham são descartados em vez de repetidos
+        self._prazo_drenagem: Optional[float] = None
+
+    def iniciar(self):
+        global _fila_ativa
+        if self._gravadora is not None:
+            return
+        self._encerrando = False
+        self._prazo_drenagem = None
+        self._gravadora = threading.Thread(
+            target=self._gravar_continuamente, name="ingestao-gravacao", daemon=True
+        )
+        self._gravadora.start()
+        _fila_ativa = self._fila
+
+    def encerrar(self):
+        """Para de aceitar registros e grava o que estiver na fila"""
+        if self._gravadora is None:
+            return
+        self._encerrando = True
+        self._prazo_drenagem = time.monotonic() + self.timeout_drenagem
+        try:
+            self._fila.put(_PARAR, timeout=self.timeout_drenagem)
+            self._gravadora.join(max(self._prazo_drenagem - time.monotonic(), 0) + 1)
+        except queue.Full:
+            pass
+        if self._gravadora.is_alive() or self._fila.qsize():
+            print(f"Fila de ingestão não drenada no prazo: {self._fila.qsize()} registros pendentes")
+        self._gravadora = None
+
+    def gravar(self, db: Session, dados: Dict,
+               chave_idempotencia: Optional[Dict] = None) -> Optional[int]:
+        if self._gravadora is None:
+            raise RuntimeError("Fila de ingestão não foi iniciada")
+        if self._encerrando:
+            raise FilaCheia("Servidor encerrando")
+        try:
+            self._fila.put((dados, chave_idempotencia), timeout=self.espera_fila)
+        except queue.Full:
+            _REJEICOES.incrementar()
+            raise FilaCheia(f"Fila de ingestão cheia ({self._fila.maxsize} registros)")
+        return None
+
+    def _gravar_continuamente(self):
+        """Agrupa registros da fila em lotes e os grava"""
+        parar = False
+        while not parar:
+            item = self._fila.get()
+            if item is _PARAR:
+                break
+
+            lote = [item]
+            prazo = time.monotonic() + self.max_latencia
+            while len(lote) < self.max_itens:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is _PARAR:
+                    parar = True
+                    break
+                lote.append(item)
+
+            self._gravar_lote(lote)
+
+    def _gravar_lote(self, lote: List[Tuple[Dict, Optional[Dict]]]):
+        inicio = time.perf_counter()
+        espera = 0.1
+        while True:
+            try:
+                self._inserir(lote)
+                break
+            except IntegrityError:
+                # Algum registro inválido: gravar um a um para isolar o problema
+                self._inserir_individualmente(lote)
+                break
+            except Exception as e:
+                if self._prazo_drenagem is not None and time.monotonic() >= self._prazo_drenagem:
+                    print(f"Descartando lote de {len(lote)} registros ao encerrar: {e}")
+                    _DESCARTADOS.incrementar(len(lote))
+                    break
+                print(f"Erro ao gravar lote de {len(lote)} registros, nova tentativa em {espera:.1f}s: {e}")
+                time.sleep(espera)
+                espera = min(espera * 2, 5.0)
+        _TAMANHO_LOTE.observar(len(lote))
+        _TEMPO_LOTE.observar(time.perf_counter() - inicio)
+
+    def _inserir(self, lote: List[Tuple[Dict, Optional[Dict]]]):
+        db = self.fabrica_sessao()
+        try:
+            servico = DatabaseService(db)
+            # Reenvios: dentro do lote e já gravados antes
+            unicos = {}
+            for item in lote:
+                unicos.setdefault(item[0]['id_externo'], item)
+            existentes = servico.ids_externos_existentes(list(unicos))
+            novos = [item for id_externo, item in unicos.items() if id_externo not in existentes]
+            servico.criar_registros([dados for dados, _ in novos], [chave for _, chave in novos])
+        finally:
+            db.close()
+        _GRAVADOS.incrementar(len(novos))
+        _DUPLICADOS.incrementar(len(lote) - len(novos))
+
+    def _inserir_individualmente(self, lote: List[Tuple[Dict, Optional[Dict]]]):
+        for item in lote:
+            try:
+                self._inserir([item])
+            except Exception as e:
+                print(f"Descartando registro {item[0].get('id_externo')}: {e}")
+                _DESCARTADOS.incrementar()
+
+
+def criar_gravador():
+    """Cria o gravador configurado em INGESTAO_MODO ('sincrona' ou 'fila')"""
+    if INGESTAO_MODO == "fila":
+        return GravadorFila(
+            INGESTAO_FILA_MAX, INGESTAO_LOTE_MAX_ITENS, INGESTAO_LOTE_MAX_LATENCIA_MS,
+            INGESTAO_ESPERA_FILA_MS, INGESTAO_DRENAGEM_TIMEOUT_S
+        )
+    if INGESTAO_MODO != "sincrona":
+        raise ValueError(f"INGESTAO_MODO inválido: '{INGESTAO_MODO}'")
+    return GravadorDireto()
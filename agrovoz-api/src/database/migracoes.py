@@ -0,0 +1,372 @@
+"""
+Migrações do esquema do banco.
+
+Cada revisão tem um id ordenável e uma função que recebe uma conexão em
+transação. As tabelas e índices são declarados aqui como estavam na
+revisão, sem importar os modelos (que continuam mudando). As revisões
+aplicadas ficam na tabela versao_esquema.
+
+Os passos das revisões conferem antes o que já existe: um banco criado
+pelo antigo create_all na inicialização é adotado rodando `atualizar`,
+que só registra o que já estava lá e cria o que faltar.
+
+A aplicação não executa DDL ao subir (ver MIGRACOES_INICIALIZACAO): as
+migrações rodam antes, pela linha de comando.
+
+    python -m src.database.migracoes atualizar
+    python -m src.database.migracoes estado
+    python -m src.database.migracoes marcar 0002_indices_desempenho
+"""
+import argparse
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Float, Index, Integer, MetaData, String, Table, Text,
+    UniqueConstraint, inspect, select, text
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+# Chave do advisory lock do PostgreSQL que serializa as migrações
+_CHAVE_LOCK_PG = 0x41677256
+
+_METADADOS_VERSAO = MetaData()
+versao_esquema = Table(
+    'versao_esquema', _METADADOS_VERSAO,
+    Column('revisao', String(100), primary_key=True),
+    Column('descricao', String(200), nullable=False),
+    Column('aplicada_em', DateTime, nullable=False),
+)
+
+
+class Revisao(NamedTuple):
+    id: str
+    descricao: str
+    aplicar: Callable[[Connection], None]
+
+
+class EsquemaDesatualizado(Exception):
+    """O banco não tem todas as revisões conhecidas por este código"""
+
+
+def _criar_tabela(conexao: Connection, tabela: Table) -> bool:
+    """Cria a tabela (e seus índices) se não existir; diz se criou"""
+    if inspect(conexao).has_table(tabela.name):
+        return False
+    tabela.create(conexao)
+    return True
+
+
+def _criar_indice(conexao: Connection, indice: Index):
+    indice.create(conexao, checkfirst=True)
+
+
+def _adicionar_coluna(conexao: Connection, tabela: str, coluna: Column):
+    """ALTER TABLE ADD COLUMN, se a coluna não existir (só colunas anuláveis)"""
+    existentes = {c['name'] for c in inspect(conexao).get_columns(tabela)}
+    if coluna.name not in existentes:
+        tipo = coluna.type.compile(dialect=conexao.dialect)
+        conexao.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {coluna.name} {tipo}'))
+
+
+def _registros_rurais(metadados: MetaData) -> Table:
+    """registros_rurais como na primeira versão da API"""
+    return Table(
+        'registros_rurais', metadados,
+        Column('id', Integer, primary_key=True, index=True),
+        Column('usuario_id', String(100), nullable=False, index=True),
+        Column('data_registro', DateTime, default=func.now(), nullable=False),
+        Column('tipo_atividade', String(50), nullable=False),
+        Column('descricao_original', Text, nullable=False),
+        Column('pessoa_envolvida', String(100), nullable=True),
+        Column('servico_realizado', String(100), nullable=True),
+        Column('cultura', String(50), nullable=True),
+        Column('talhao', Integer, nullable=True),
+        Column('valor_monetario', Float, nullable=True),
+        Column('quantidade', Float, nullable=True),
+        Column('unidade_medida', String(20), nullable=True),
+        Column('confirmado', Boolean, default=False),
+        Column('precisa_revisao', Boolean, default=False),
+        Column('data_criacao', DateTime, default=func.now()),
+        Column('data_atualizacao', DateTime, default=func.now(), onupdate=func.now()),
+    )
+
+
+def _r0001_base(conexao: Connection):
+    metadados = MetaData()
+    _criar_tabela(conexao, _registros_rurais(metadados))
+    _criar_tabela(conexao, Table(
+        'usuarios', metadados,
+        Column('id', String(100), primary_key=True),
+        Column('nome', String(200), nullable=False),
+        Column('propriedade', String(200), nullable=True),
+        Column('telefone', String(20), nullable=True),
+        Column('data_cadastro', DateTime, default=func.now()),
+        Column('ativo', Boolean, default=True),
+    ))
+    _criar_tabela(conexao, Table(
+        'configuracoes_nlp', metadados,
+        Column('id', Integer, primary_key=True),
+        Column('usuario_id', String(100), nullable=False),
+        Column('nomes_funcionarios', Text, nullable=True),
+        Column('culturas_utilizadas', Text, nullable=True),
+        Column('talhoes_existentes', Text, nullable=True),
+        Column('data_atualizacao', DateTime, default=func.now(), onupdate=func.now()),
+    ))
+
+
+def _r0002_indices_desempenho(conexao: Connection):
+    metadados = MetaData()
+    registros = _registros_rurais(metadados)
+    # Listagem paginada por usuário: WHERE usuario_id = ? ORDER BY data_registro DESC, id
+    _criar_indice(conexao, Index(
+        'ix_registros_usuario_data_id',
+        registros.c.usuario_id, registros.c.data_registro.desc(), registros.c.id
+    ))
+    # Vocabulário do usuário (ConfiguracaoNLP mais recente)
+    configuracoes = Table('configuracoes_nlp', metadados, Column('usuario_id', String(100)))
+    _criar_indice(conexao, Index('ix_configuracoes_nlp_usuario_id', configuracoes.c.usuario_id))
+
+
+def _r0003_estatisticas_diarias(conexao: Connection):
+    metadados = MetaData()
+    criada = _criar_tabela(conexao, Table(
+        'estatisticas_diarias', metadados,
+        Column('id', Integer, primary_key=True),
+        Column('usuario_id', String(100), nullable=False),
+        Column('granularidade', String(1), nullable=False, default='D'),
+        Column('dia', Date, nullable=False),
+        Column('dimensao', String(20), nullable=False),
+        Column('valor', String(100), nullable=False, default=''),
+        Column('total_registros', Integer, nullable=False, default=0),
+        Column('registros_confirmados', Integer, nullable=False, default=0),
+        Column('valor_total', Float, nullable=False, default=0.0),
+        UniqueConstraint('usuario_id', 'granularidade', 'dia', 'dimensao', 'valor',
+                         name='uq_estatisticas_usuario_periodo_recorte'),
+        Index('ix_estatisticas_usuario_total_dia', 'usuario_id', 'granularidade', 'dia',
+              sqlite_where=text("dimensao = 'total'"),
+              postgresql_where=text("dimensao = 'total'")),
+    ))
+    if criada:
+        # Agregados dos registros que já existiam
+        from src.database import estatisticas
+
+        estatisticas.reconstruir(Session(bind=conexao))
+
+
+def _r0004_id_externo(conexao: Connection):
+    _adicionar_coluna(conexao, 'registros_rurais', Column('id_externo', String(64), nullable=True))
+    registros = Table('registros_rurais', MetaData(), Column('id_externo', String(64)))
+    _criar_indice(conexao, Index('ix_registros_id_externo', registros.c.id_externo, unique=True))
+
+
+def _r0005_chaves_idempotencia(conexao: Connection):
+    _criar_tabela(conexao, Table(
+        'chaves_idempotencia', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('usuario_id', String(100), nullable=False),
+        Column('chave', String(100), nullable=False),
+        Column('hash_requisicao', String(40), nullable=False),
+        Column('registro_id', Integer, nullable=True),
+        Column('status_code', Integer, nullable=False),
+        Column('resposta', Text, nullable=False),
+        Column('expira_em', DateTime, nullable=False, index=True),
+        UniqueConstraint('usuario_id', 'chave', name='uq_chaves_idempotencia_usuario_chave'),
+    ))
+
+
+def _r0006_busca_texto(conexao: Connection):
+    """Índice de busca textual em descricao_original (ver src/database/busca.py)"""
+    if conexao.dialect.name == 'postgresql':
+        conexao.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        existe = conexao.scalar(text("SELECT 1 FROM pg_ts_config WHERE cfgname = 'agrovoz_pt'"))
+        if not existe:
+            # 'portuguese' com as palavras sem acento antes do radical
+            conexao.execute(text("CREATE TEXT SEARCH CONFIGURATION agrovoz_pt (COPY = portuguese)"))
+            conexao.execute(text(
+                "ALTER TEXT SEARCH CONFIGURATION agrovoz_pt "
+                "ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem"
+            ))
+        conexao.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_registros_busca ON registros_rurais "
+            "USING gin (to_tsvector('agrovoz_pt'::regconfig, descricao_original))"
+        ))
+    elif conexao.dialect.name == 'sqlite':
+        if inspect(conexao).has_table('registros_busca'):
+            return
+        # Conteúdo externo: o FTS5 guarda só o índice e lê o texto de registros_rurais
+        conexao.exec_driver_sql(
+            "CREATE VIRTUAL TABLE registros_busca USING fts5("
+            "descricao_original, content='registros_rurais', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        conexao.exec_driver_sql(
+            "CREATE TRIGGER registros_busca_ai AFTER INSERT ON registros_rurais BEGIN "
+            "INSERT INTO registros_busca(rowid, descricao_original) "
+            "VALUES (new.id, new.descricao_original); END"
+        )
+        conexao.exec_driver_sql(
+            "CREATE TRIGGER registros_busca_ad AFTER DELETE ON registros_rurais BEGIN "
+            "INSERT INTO registros_busca(registros_busca, rowid, descricao_original) "
+            "VALUES ('delete', old.id, old.descricao_original); END"
+        )
+        conexao.exec_driver_sql(
+            "CREATE TRIGGER registros_busca_au AFTER UPDATE OF descricao_original "
+            "ON registros_rurais BEGIN "
+            "INSERT INTO registros_busca(registros_busca, rowid, descricao_original) "
+            "VALUES ('delete', old.id, old.descricao_original); "
+            "INSERT INTO registros_busca(rowid, descricao_original) "
+            "VALUES (new.id, new.descricao_original); END"
+        )
+        # Indexa os registros que já existiam
+        conexao.exec_driver_sql("INSERT INTO registros_busca(registros_busca) VALUES ('rebuild')")
+
+
+def _r0007_fila_revisao(conexao: Connection):
+    registros = _registros_rurais(MetaData())
+    # Parcial: só os registros pendentes de revisão
+    _criar_indice(conexao, Index(
+        'ix_registros_fila_revisao',
+        registros.c.usuario_id, registros.c.data_registro.desc(), registros.c.id,
+        sqlite_where=text("precisa_revisao = 1 AND confirmado = 0"),
+        postgresql_where=text("precisa_revisao AND NOT confirmado")
+    ))
+
+
+def _r0008_limites_validacao(conexao: Connection):
+    _adicionar_coluna(conexao, 'configuracoes_nlp', Column('limites_validacao', Text, nullable=True))
+
+
+def _r0009_editado_manualmente(conexao: Connection):
+    # Nula nos registros antigos: as consultas usam IS NOT TRUE
+    _adicionar_coluna(conexao, 'registros_rurais', Column('editado_manualmente', Boolean, nullable=True))
+
+
+# Em ordem de aplicação; revisões novas entram no fim
+REVISOES: List[Revisao] = [
+    Revisao('0001_base', "Tabelas registros_rurais, usuarios e configuracoes_nlp", _r0001_base),
+    Revisao('0002_indices_desempenho', "Índices da listagem paginada e do vocabulário",
+            _r0002_indices_desempenho),
+    Revisao('0003_estatisticas_diarias', "Agregados diários e mensais", _r0003_estatisticas_diarias),
+    Revisao('0004_id_externo', "Coluna id_externo única em registros_rurais", _r0004_id_externo),
+    Revisao('0005_chaves_idempotencia', "Tabela de Idempotency-Key", _r0005_chaves_idempotencia),
+    Revisao('0006_busca_texto', "Busca textual em descricao_original", _r0006_busca_texto),
+    Revisao('0007_fila_revisao', "Índice parcial da fila de revisão", _r0007_fila_revisao),
+    Revisao('0008_limites_validacao', "Limites de validação por usuário em configuracoes_nlp",
+            _r0008_limites_validacao),
+    Revisao('0009_editado_manualmente', "Marca dos registros corrigidos pelo usuário",
+            _r0009_editado_manualmente),
+]
+
+
+def revisoes_aplicadas(conexao: Connection) -> List[str]:
+    if not inspect(conexao).has_table(versao_esquema.name):
+        return []
+    return list(conexao.scalars(select(versao_esquema.c.revisao).order_by(versao_esquema.c.revisao)))
+
+
+def pendentes(aplicadas: List[str]) -> List[Revisao]:
+    return [revisao for revisao in REVISOES if revisao.id not in set(aplicadas)]
+
+
+def _travar(conexao: Connection):
+    """Impede que dois processos apliquem a mesma revisão (até o fim da transação)"""
+    if conexao.dialect.name == 'postgresql':
+        conexao.execute(text("SELECT pg_advisory_xact_lock(:chave)"), {'chave': _CHAVE_LOCK_PG})
+    elif conexao.dialect.name == 'sqlite':
+        # O pysqlite não abre transação antes de DDL: abrir já com o lock de escrita
+        conexao.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _registrar(conexao: Connection, revisao: Revisao):
+    versao_esquema.create(conexao, checkfirst=True)
+    conexao.execute(versao_esquema.insert().values(
+        revisao=revisao.id, descricao=revisao.descricao, aplicada_em=datetime.now()
+    ))
+
+
+def atualizar(engine: Engine, ate: Optional[str] = None) -> List[str]:
+    """
+    Aplica as revisões pendentes (até `ate`, inclusive), cada uma na sua
+    transação. Devolve os ids aplicados.
+    """
+    aplicadas_agora = []
+    for revisao in REVISOES:
+        with engine.begin() as conexao:
+            _travar(conexao)
+            # Conferido já com o lock: outro processo pode ter aplicado antes
+            if revisao.id not in revisoes_aplicadas(conexao):
+                revisao.aplicar(conexao)
+                _registrar(conexao, revisao)
+                aplicadas_agora.append(revisao.id)
+        if revisao.id == ate:
+            break
+    return aplicadas_agora
+
+
+def marcar(engine: Engine, revisao_id: str):
+    """Registra a revisão como aplicada sem executá-la"""
+    revisao = next((r for r in REVISOES if r.id == revisao_id), None)
+    if revisao is None:
+        raise ValueError(f"Revisão desconhecida: {revisao_id}")
+    with engine.begin() as conexao:
+        _travar(conexao)
+        if revisao.id not in revisoes_aplicadas(conexao):
+            _registrar(conexao, revisao)
+
+
+def verificar(engine: Engine):
+    """
+    Checagem rápida para a inicialização: uma consulta a versao_esquema.
+    Levanta EsquemaDesatualizado se faltar alguma revisão.
+    """
+    try:
+        with engine.connect() as conexao:
+            aplicadas = list(conexao.scalars(select(versao_esquema.c.revisao)))
+    except Exception:
+        aplicadas = []
+    faltando = pendentes(aplicadas)
+    if faltando:
+        raise EsquemaDesatualizado(
+            f"Esquema do banco desatualizado, faltam {[r.id for r in faltando]}: "
+            "rode `python -m src.database.migracoes atualizar`"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Migrações do esquema do AgroVoz")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+    atualizacao = comandos.add_parser('atualizar', help="Aplica as revisões pendentes")
+    atualizacao.add_argument('--ate', help="Parar nesta revisão")
+    comandos.add_parser('estado', help="Revisões aplicadas e pendentes")
+    marcacao = comandos.add_parser('marcar', help="Registra uma revisão sem executá-la")
+    marcacao.add_argument('revisao')
+    args = parser.parse_args(argv)
+
+    from src.database.connection import engine
+
+    if args.comando == 'atualizar':
+        inicio = datetime.now()
+        aplicadas = atualizar(engine, args.ate)
+        duracao = (datetime.now() - inicio).total_seconds()
+        for revisao_id in aplicadas:
+            print(f"Aplicada {revisao_id}")
+        print(f"{len(aplicadas)} revisões aplicadas em {duracao:.1f}s")
+    elif args.comando == 'estado':
+        with engine.connect() as conexao:
+            aplicadas = revisoes_aplicadas(conexao)
+        for revisao in REVISOES:
+            situacao = "aplicada" if revisao.id in aplicadas else "pendente"
+            print(f"{revisao.id:<32} {situacao:<9} {revisao.descricao}")
+        desconhecidas = sorted(set(aplicadas) - {r.id for r in REVISOES})
+        for revisao_id in desconhecidas:
+            print(f"{revisao_id:<32} aplicada  (desconhecida por esta versão)")
+    elif args.comando == 'marcar':
+        marcar(engine, args.revisao)
+        print(f"Revisão {args.revisao} marcada como aplicada")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Boolean, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from datetime import datetime
 
 Base = declarative_base()
@@ -10,6 +10,8 @@ class RegistroRural(Base):
     __tablename__ = "registros_rurais"
     
     id = Column(Integer, primary_key=True, index=True)
+    # ID do app (ou gerado pelo servidor), conhecido antes da gravação
+    id_externo = Column(String(64), nullable=True)
     usuario_id = Column(String(100), nullable=False, index=True)
     data_registro = Column(DateTime, default=func.now(), nullable=False)
     tipo_atividade = Column(String(50), nullable=False)  
@@ -29,10 +31,25 @@ class RegistroRural(Base):
     # Status e validação
     confirmado = Column(Boolean, default=False)
     precisa_revisao = Column(Boolean, default=False)
+    # Corrigido pelo usuário na revisão: a reextração não mexe mais nele
+    editado_manualmente = Column(Boolean, default=False)
     
     # Metadados
     data_criacao = Column(DateTime, default=func.now())
     data_atualizacao = Column(DateTime, default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        # Listagem paginada por usuário: WHERE usuario_id = ? ORDER BY data_registro DESC, id
+        Index('ix_registros_usuario_data_id', usuario_id, data_registro.desc(), id),
+        # Reenvio do mesmo registro pelo app ou pela fila de gravação
+        Index('ix_registros_id_externo', id_externo, unique=True),
+        # Fila de revisão: só os pendentes, pequena qualquer que seja o histórico.
+        # As consultas usam precisa_revisao == True e confirmado == False, que
+        # o SQLite só casa com o predicado escrito da mesma forma
+        Index('ix_registros_fila_revisao', usuario_id, data_registro.desc(), id,
+              sqlite_where=text("precisa_revisao = 1 AND confirmado = 0"),
+              postgresql_where=text("precisa_revisao AND NOT confirmado")),
+    )
 
 class Usuario(Base):
     """Modelo para usuários do sistema"""
@@ -50,11 +67,68 @@ class ConfiguracaoNLP(Base):
     __tablename__ = "configuracoes_nlp"
     
     id = Column(Integer, primary_key=True)
-    usuario_id = Column(String(100), nullable=False)
+    usuario_id = Column(String(100), nullable=False, index=True)
     
     # Vocabulário personalizado
     nomes_funcionarios = Column(Text, nullable=True)  # JSON com nomes
     culturas_utilizadas = Column(Text, nullable=True)  # JSON com culturas
     talhoes_existentes = Column(Text, nullable=True)   # JSON com números
+    limites_validacao = Column(Text, nullable=True)    # JSON {limite: valor}, ver LIMITES_PADRAO
     
     data_atualizacao = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class EstatisticaDiaria(Base):
+    """Agregado diário e mensal por usuário, mantido junto com a gravação dos registros"""
+    __tablename__ = "estatisticas_diarias"
+    
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(String(100), nullable=False)
+    
+    # 'D' (dia) ou 'M' (mês, com `dia` no primeiro dia do mês)
+    granularidade = Column(String(1), nullable=False, default='D')
+    dia = Column(Date, nullable=False)
+    
+    # Recorte do agregado: 'total', 'tipo_atividade', 'cultura' ou 'talhao';
+    # `valor` é o valor do recorte ('' no total)
+    dimensao = Column(String(20), nullable=False)
+    valor = Column(String(100), nullable=False, default='')
+    
+    total_registros = Column(Integer, nullable=False, default=0)
+    registros_confirmados = Column(Integer, nullable=False, default=0)
+    valor_total = Column(Float, nullable=False, default=0.0)
+    
+    __table_args__ = (
+        # Também serve as consultas por usuário e período
+        UniqueConstraint('usuario_id', 'granularidade', 'dia', 'dimensao', 'valor',
+                         name='uq_estatisticas_usuario_periodo_recorte'),
+        # Série diária (linhas 'total'); parcial para não competir com o
+        # índice único nas consultas por recorte
+        Index('ix_estatisticas_usuario_total_dia', 'usuario_id', 'granularidade', 'dia',
+              sqlite_where=text("dimensao = 'total'"),
+              postgresql_where=text("dimensao = 'total'")),
+    )
+
+
+class ChaveIdempotencia(Base):
+    """Resposta enviada para uma Idempotency-Key, repetida quando o app reenvia"""
+    __tablename__ = "chaves_idempotencia"
+    
+    id = Column(Integer, primary_key=True)
+    usuario_id = Column(String(100), nullable=False)
+    chave = Column(String(100), nullable=False)
+    
+    # SHA-1 do corpo original: a mesma chave com outro conteúdo é recusada
+    hash_requisicao = Column(String(40), nullable=False)
+    
+    # Resposta original (JSON); `id` vem de registro_id, nulo até a
+    # gravação quando a requisição foi aceita pela fila de ingestão
+    registro_id = Column(Integer, nullable=True)
+    status_code = Column(Integer, nullable=False)
+    resposta = Column(Text, nullable=False)
+    
+    expira_em = Column(DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        UniqueConstraint('usuario_id', 'chave', name='uq_chaves_idempotencia_usuario_chave'),
+    )
@@ -0,0 +1,365 @@
+"""
+Métricas da aplicação no formato texto do Prometheus (GET /metrics).
+
+Implementação mínima, sem dependências: contadores e histogramas com
+rótulos e medidores calculados na hora da coleta. Cada série tem seu
+próprio lock e buckets fixos, então registrar uma observação custa uma
+busca binária e algumas somas, barato o bastante para ficar sempre ligado.
+
+Os valores são por processo. Com uvicorn --workers N, cada worker expõe
+os seus; os workers do executor de NLP em processos devolvem o que
+mediram junto com cada lote (ver drenar/incorporar).
+"""
+import bisect
+import functools
+import inspect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets em segundos: requisições/banco e etapas do NLP (microssegundos)
+BUCKETS_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_NLP = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+Rotulos = Tuple[str, ...]
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{nome}="{_escapar(str(valor))}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatar_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class _ValorContador:
+    __slots__ = ('_lock', 'valor')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.valor = 0.0
+
+    def incrementar(self, quantidade: float = 1.0):
+        with self._lock:
+            self.valor += quantidade
+
+
+class _ValorHistograma:
+    __slots__ = ('_lock', '_limites', 'contagens', 'soma')
+
+    def __init__(self, limites: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._limites = limites
+        # Uma posição por bucket mais a do +Inf; acumuladas só na exportação
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0.0
+
+    def observar(self, valor: float):
+        posicao = bisect.bisect_left(self._limites, valor)
+        with self._lock:
+            self.contagens[posicao] += 1
+            self.soma += valor
+
+
+class _Metrica(ABC):
+    tipo = ''
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+
+    def exportar(self) -> Iterator[str]:
+        yield f"# HELP {self.nome} {self.ajuda}"
+        yield f"# TYPE {self.nome} {self.tipo}"
+        yield from self._amostras()
+
+    @abstractmethod
+    def _amostras(self) -> Iterator[str]:
+        ...
+
+
+class _MetricaComSeries(_Metrica):
+    """Métrica que acumula valores por série de rótulos (drenáveis entre processos)"""
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        super().__init__(nome, ajuda, rotulos)
+        self._series: Dict[Rotulos, Any] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _nova_serie(self):
+        ...
+
+    @abstractmethod
+    def drenar(self) -> Dict[Rotulos, Any]:
+        ...
+
+    @abstractmethod
+    def incorporar(self, dados: Dict[Rotulos, Any]):
+        ...
+
+    def rotulado(self, *valores: str):
+        """Série dos rótulos dados; guarde o retorno para evitar a busca no caminho quente"""
+        serie = self._series.get(valores)
+        if serie is None:
+            if len(valores) != len(self.rotulos):
+                raise ValueError(f"{self.nome} espera os rótulos {self.rotulos}")
+            with self._lock:
+                serie = self._series.setdefault(valores, self._nova_serie())
+        return serie
+
+    def series(self) -> List[Tuple[Rotulos, Any]]:
+        with self._lock:
+            return list(self._series.items())
+
+
+class Contador(_MetricaComSeries):
+    tipo = 'counter'
+
+    def _nova_serie(self):
+        return _ValorContador()
+
+    def incrementar(self, quantidade: float = 1.0):
+        self.rotulado().incrementar(quantidade)
+
+    def _amostras(self) -> Iterator[str]:
+        for valores, serie in self.series():
+            yield f"{self.nome}{_formatar_rotulos(self.rotulos, valores)} {_formatar_numero(serie.valor)}"
+
+    def drenar(self) -> Dict[Rotulos, float]:
+        dados = {}
+        for valores, serie in self.series():
+            with serie._lock:
+                if serie.valor:
+                    dados[valores] = serie.valor
+                serie.valor = 0.0
+        return dados
+
+    def incorporar(self, dados: Dict[Rotulos, float]):
+        for valores, quantidade in dados.items():
+            self.rotulado(*valores).incrementar(quantidade)
+
+
+class Histograma(_MetricaComSeries):
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                 buckets: Sequence[float] = BUCKETS_LATENCIA):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(sorted(buckets))
+
+    def _nova_serie(self):
+        return _ValorHistograma(self.buckets)
+
+    def observar(self, valor: float):
+        self.rotulado().observar(valor)
+
+    def _amostras(self) -> Iterator[str]:
+        limites = self.buckets + (float("inf"),)
+        for valores, serie in self.series():
+            with serie._lock:
+                contagens = list(serie.contagens)
+                soma = serie.soma
+            acumulado = 0
+            for limite, contagem in zip(limites, contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(self.rotulos, valores, f'le="{_formatar_numero(limite)}"')
+                yield f"{self.nome}_bucket{rotulos} {acumulado}"
+            rotulos = _formatar_rotulos(self.rotulos, valores)
+            yield f"{self.nome}_sum{rotulos} {_formatar_numero(soma)}"
+            yield f"{self.nome}_count{rotulos} {acumulado}"
+
+    def drenar(self) -> Dict[Rotulos, Tuple[List[int], float]]:
+        dados = {}
+        for valores, serie in self.series():
+            with serie._lock:
+                if any(serie.contagens):
+                    dados[valores] = (serie.contagens, serie.soma)
+                serie.contagens = [0] * len(serie.contagens)
+                serie.soma = 0.0
+        return dados
+
+    def incorporar(self, dados: Dict[Rotulos, Tuple[List[int], float]]):
+        for valores, (contagens, soma) in dados.items():
+            serie = self.rotulado(*valores)
+            with serie._lock:
+                for posicao, contagem in enumerate(contagens):
+                    serie.contagens[posicao] += contagem
+                serie.soma += soma
+
+
+class Coletada(_Metrica):
+    """
+    Métrica calculada na coleta por `funcao`, que devolve um número ou um
+    dict {tupla de rótulos: número}. Não custa nada fora do /metrics.
+    """
+
+    def __init__(self, nome: str, ajuda: str, funcao: Callable[[], Union[float, Dict[Rotulos, float]]],
+                 rotulos: Sequence[str] = (), tipo: str = 'gauge'):
+        super().__init__(nome, ajuda, rotulos)
+        self.tipo = tipo
+        self.funcao = funcao
+
+    def _amostras(self) -> Iterator[str]:
+        valores = self.funcao()
+        if not isinstance(valores, dict):
+            valores = {(): valores}
+        for rotulos, valor in valores.items():
+            if valor is not None:
+                yield f"{self.nome}{_formatar_rotulos(self.rotulos, rotulos)} {_formatar_numero(valor)}"
+
+
+class Registro:
+    """Conjunto de métricas exportadas juntas"""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        # Registrar de novo o mesmo nome devolve a métrica existente
+        with self._lock:
+            return self._metricas.setdefault(metrica.nome, metrica)
+
+    def exportar(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+        linhas = []
+        for metrica in metricas:
+            try:
+                linhas.extend(metrica.exportar())
+            except Exception as e:
+                # Uma métrica coletada com erro não derruba as demais
+                linhas.append(f"# ERRO {metrica.nome}: {_escapar(str(e))}")
+        return "\n".join(linhas) + "\n"
+
+    def drenar(self, prefixo: str) -> Dict[str, Dict]:
+        """Valores acumulados das métricas com o prefixo, zerando-as (para enviar a outro processo)"""
+        with self._lock:
+            metricas = [m for nome, m in self._metricas.items()
+                        if nome.startswith(prefixo) and isinstance(m, _MetricaComSeries)]
+        return {metrica.nome: dados for metrica in metricas if (dados := metrica.drenar())}
+
+    def incorporar(self, drenado: Dict[str, Dict]):
+        """Soma valores drenados em outro processo às métricas deste"""
+        for nome, dados in drenado.items():
+            metrica = self._metricas.get(nome)
+            if metrica is not None:
+                metrica.incorporar(dados)
+
+
+REGISTRO = Registro()
+
+
+def contador(nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Contador:
+    return REGISTRO.registrar(Contador(nome, ajuda, rotulos))
+
+
+def histograma(nome: str, ajuda: str, rotulos: Sequence[str] = (),
+               buckets: Sequence[float] = BUCKETS_LATENCIA) -> Histograma:
+    return REGISTRO.registrar(Histograma(nome, ajuda, rotulos, buckets))
+
+
+def coletada(nome: str, ajuda: str, funcao: Callable, rotulos: Sequence[str] = (),
+             tipo: str = 'gauge') -> Coletada:
+    return REGISTRO.registrar(Coletada(nome, ajuda, funcao, rotulos, tipo))
+
+
+def exportar() -> str:
+    return REGISTRO.exportar()
+
+
+# Caches observados: nome -> função que devolve o dict de estatisticas()
+# (acertos, faltas e opcionalmente itens), como o de CacheLRU
+_CACHES: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def observar_cache(nome: str, estatisticas: Callable[[], Dict[str, Any]]):
+    """Exporta acertos, faltas, taxa de acerto e itens de um cache, lidos na coleta"""
+    _CACHES[nome] = estatisticas
+
+
+def _estatisticas_caches() -> Dict[str, Dict[str, Any]]:
+    return {nome: funcao() for nome, funcao in list(_CACHES.items())}
+
+
+def _consultas_caches():
+    return {
+        (nome, resultado): dados[chave]
+        for nome, dados in _estatisticas_caches().items()
+        for resultado, chave in (('acerto', 'acertos'), ('falta', 'faltas'))
+    }
+
+
+def _taxa_acerto_caches():
+    taxas = {}
+    for nome, dados in _estatisticas_caches().items():
+        consultas = dados['acertos'] + dados['faltas']
+        taxas[(nome,)] = dados['acertos'] / consultas if consultas else None
+    return taxas
+
+
+def _itens_caches():
+    return {(nome,): dados.get('itens') for nome, dados in _estatisticas_caches().items()}
+
+
+coletada('agrovoz_cache_consultas_total', 'Consultas aos caches em memória',
+         _consultas_caches, ('cache', 'resultado'), tipo='counter')
+coletada('agrovoz_cache_taxa_acerto', 'Fração das consultas respondidas pelo cache',
+         _taxa_acerto_caches, ('cache',))
+coletada('agrovoz_cache_itens', 'Itens guardados no cache', _itens_caches, ('cache',))
+
+
+def cronometrar(tempos: Histograma, erros: Optional[Contador] = None):
+    """
+    Decorador: observa a duração da função em `tempos`, rotulada pelo nome
+    da função, e conta exceções em `erros`. Em geradores, mede a iteração
+    inteira.
+    """
+    relogio = time.perf_counter
+
+    def decorar(funcao):
+        serie = tempos.rotulado(funcao.__name__)
+        serie_erros = erros.rotulado(funcao.__name__) if erros is not None else None
+
+        if inspect.isgeneratorfunction(funcao):
+            @functools.wraps(funcao)
+            def gerador(*args, **kwargs):
+                inicio = relogio()
+                try:
+                    yield from funcao(*args, **kwargs)
+                except Exception:
+                    if serie_erros is not None:
+                        serie_erros.incrementar()
+                    raise
+                finally:
+                    serie.observar(relogio() - inicio)
+            return gerador
+
+        @functools.wraps(funcao)
+        def cronometrada(*args, **kwargs):
+            inicio = relogio()
+            try:
+                return funcao(*args, **kwargs)
+            except Exception:
+                if serie_erros is not None:
+                    serie_erros.incrementar()
+                raise
+            finally:
+                serie.observar(relogio() - inicio)
+        return cronometrada
+
+    return decorar
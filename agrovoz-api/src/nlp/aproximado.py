@@ -0,0 +1,224 @@
+"""
+Correção das palavras que o reconhecimento de voz (ASR) erra.
+
+A transcrição troca, come ou acrescenta letras ("soya", "talião",
+"eduardu") e perde acentos ("feijao"), e a extração procura palavras
+exatas. IndiceAproximado guarda as palavras de referência (as fixas dos
+padrões, culturas e atividades e, por usuário, nomes de funcionários e
+culturas cadastradas) e troca cada palavra do texto pela de referência a
+até 1 edição (2 nas palavras longas), comparando sem acentos.
+
+A busca usa um dicionário de deleções, como o SymSpell: cada palavra de
+referência é guardada sob as formas obtidas apagando até 2 letras dela;
+uma palavra do texto gera as próprias deleções e só as referências que
+coincidem em alguma forma passam pela distância de edição. O custo por
+palavra depende do tamanho dela (no máximo C(L, 2) + L + 1 consultas),
+não do tamanho do vocabulário, e o resultado de cada palavra fica
+guardado: as falas repetem muito as mesmas palavras.
+"""
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Palavras do texto (já minúsculo) candidatas a correção: só letras, 4 ou
+# mais, dentro de cada trecho entre espaços
+_PALAVRA = re.compile(r'[^\W\d_]{4,}')
+_TRECHO = re.compile(r'\S+')
+
+# Referências de até 5 letras: a palavra precisa começar com a mesma letra
+# (em palavras curtas, uma edição em qualquer lugar acha palavras comuns)
+CURTA = 5
+# Referências a partir de 9 letras aceitam 2 edições; as outras, 1
+LONGA = 9
+# Palavras maiores que isto não são corrigidas (limita as deleções geradas)
+MAXIMO = 20
+# Palavras já vistas guardadas por índice; cheio, começa de novo. Os
+# índices por usuário (um por vocabulário em cache) guardam menos
+_MEMO_MAXIMO = 50_000
+_MEMO_USUARIO = 2_000
+
+_AUSENTE = object()
+
+# Letras acentuadas do Latin-1 e Latin Extended-A -> letra sem acento
+_SEM_ACENTOS = str.maketrans({
+    chr(codigo): unicodedata.normalize('NFKD', chr(codigo))[0]
+    for codigo in range(0xC0, 0x180)
+    if unicodedata.normalize('NFKD', chr(codigo))[0].isascii()
+    and unicodedata.normalize('NFKD', chr(codigo))[0] != chr(codigo)
+})
+
+
+def sem_acentos(palavra: str) -> str:
+    return palavra.translate(_SEM_ACENTOS)
+
+
+def edicoes_permitidas(tamanho: int) -> int:
+    """Edições aceitas para uma referência deste tamanho"""
+    return 2 if tamanho >= LONGA else 1
+
+
+# Terminações regulares por conjugação (presente, pretérito, imperfeito,
+# particípio, gerúndio e subjuntivo)
+_TERMINACOES = {
+    'ar': ('o', 'a', 'as', 'am', 'amos', 'ou', 'ei', 'aram', 'ava', 'avam', 'ado', 'ada', 'ando',
+           'ar', 'e', 'em', 'ara'),
+    'er': ('o', 'e', 'es', 'em', 'emos', 'eu', 'i', 'eram', 'ia', 'iam', 'ido', 'ida', 'endo',
+           'er', 'a', 'am'),
+    'ir': ('o', 'e', 'es', 'em', 'imos', 'iu', 'i', 'iram', 'ia', 'iam', 'ido', 'ida', 'indo',
+           'ir', 'a', 'am'),
+}
+
+
+def conjugacoes(infinitivo: str) -> Tuple[str, ...]:
+    """Formas regulares de um verbo (sem as mudanças de grafia, como pagar -> paguei)"""
+    radical, conjugacao = infinitivo[:-2], infinitivo[-2:]
+    return tuple(radical + terminacao for terminacao in _TERMINACOES.get(conjugacao, ()))
+
+
+def _delecoes(palavra: str, edicoes: int) -> Set[str]:
+    """A palavra e as formas com até `edicoes` letras apagadas"""
+    formas = {palavra}
+    atuais = {palavra}
+    for _ in range(edicoes):
+        atuais = {forma[:i] + forma[i + 1:] for forma in atuais for i in range(len(forma))}
+        formas |= atuais
+    return formas
+
+
+def distancia_edicao(a: str, b: str, limite: int) -> int:
+    """
+    Distância de edição com transposição de vizinhas (Damerau restrita);
+    qualquer valor acima de `limite` é devolvido como limite + 1
+    """
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+    anterior2: List[int] = []
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        atual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            custo = a[i - 1] != b[j - 1]
+            atual[j] = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + custo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                atual[j] = min(atual[j], anterior2[j - 2] + 1)
+        if min(atual) > limite:
+            return limite + 1
+        anterior2, anterior = anterior, atual
+    return min(anterior[-1], limite + 1)
+
+
+class IndiceAproximado:
+    """
+    Palavras de referência para corrigir o texto transcrito.
+
+    `protegidas` são palavras comuns a uma edição de alguma referência
+    ("cada" e "cana", "milhão" e "milho"): aparecendo no texto, ficam
+    como estão. Uma palavra a mesma distância de duas referências
+    diferentes também fica como está.
+
+    Um índice com `base` (o do usuário, criado por com()) guarda só as
+    próprias palavras e consulta também as da base, sem copiá-las.
+    """
+
+    __slots__ = ('referencias', 'protegidas', 'base', '_delecoes', '_memo', '_memo_maximo')
+
+    def __init__(self, palavras: Iterable[str], protegidas: Iterable[str] = (),
+                 base: Optional['IndiceAproximado'] = None, memo_maximo: int = _MEMO_MAXIMO):
+        self.base = base
+        # Sem acentos -> grafia de referência (a primeira recebida)
+        self.referencias: Dict[str, str] = {}
+        for palavra in palavras:
+            palavra = palavra.strip().lower()
+            if len(palavra) < 4 or ' ' in palavra:
+                continue
+            chave = sem_acentos(palavra)
+            if base is None or chave not in base.referencias:
+                self.referencias.setdefault(chave, palavra)
+        # As referências são procuradas antes das protegidas: uma palavra
+        # que é as duas coisas fica como referência
+        self.protegidas = frozenset(sem_acentos(palavra.lower()) for palavra in protegidas)
+        if base is not None:
+            self.protegidas = self.protegidas | base.protegidas if self.protegidas else base.protegidas
+
+        delecoes: Dict[str, List[str]] = {}
+        for chave in self.referencias:
+            for forma in _delecoes(chave, edicoes_permitidas(len(chave))):
+                delecoes.setdefault(forma, []).append(chave)
+        self._delecoes: Dict[str, Tuple[str, ...]] = {
+            forma: tuple(chaves) for forma, chaves in delecoes.items()
+        }
+        self._memo: Dict[str, Optional[str]] = {}
+        self._memo_maximo = memo_maximo
+
+    def com(self, palavras: Iterable[str]) -> 'IndiceAproximado':
+        """Índice com estas palavras somadas às referências (vocabulário do usuário)"""
+        return IndiceAproximado(palavras, base=self, memo_maximo=_MEMO_USUARIO)
+
+    def _referencia(self, chave: str) -> Optional[str]:
+        referencia = self.referencias.get(chave)
+        if referencia is None and self.base is not None:
+            referencia = self.base.referencias.get(chave)
+        return referencia
+
+    def buscar(self, palavra: str) -> Optional[str]:
+        """
+        Referência da palavra: a igual sem acentos ou a única mais próxima
+        dentro das edições permitidas; None se não há (ou há empate)
+        """
+        chave = sem_acentos(palavra)
+        referencia = self._referencia(chave)
+        if referencia is not None:
+            return referencia
+        if chave in self.protegidas or not 4 <= len(chave) <= MAXIMO:
+            return None
+
+        # Referências até 2 letras maiores que a palavra podem aceitar 2 edições
+        indices = (self,) if self.base is None else (self, self.base)
+        candidatas = set()
+        for forma in _delecoes(chave, edicoes_permitidas(len(chave) + 2)):
+            for indice in indices:
+                candidatas.update(indice._delecoes.get(forma, ()))
+
+        melhor, escolhidas = None, []
+        for candidata in candidatas:
+            if len(candidata) <= CURTA and candidata[0] != chave[0]:
+                continue
+            distancia = distancia_edicao(chave, candidata, edicoes_permitidas(len(candidata)))
+            if distancia > edicoes_permitidas(len(candidata)):
+                continue
+            if melhor is None or distancia < melhor:
+                melhor, escolhidas = distancia, [candidata]
+            elif distancia == melhor:
+                escolhidas.append(candidata)
+        if len(escolhidas) != 1:
+            return None
+        return self._referencia(escolhidas[0])
+
+    def _corrigir_palavra(self, palavra: str) -> Optional[str]:
+        """Trecho do texto (entre espaços) corrigido, ou None se fica igual"""
+        trocado = _PALAVRA.sub(lambda match: self.buscar(match.group()) or match.group(), palavra)
+        return trocado if trocado != palavra else None
+
+    def corrigir(self, texto: str) -> Tuple[str, int]:
+        """Texto com as palavras trocadas pelas de referência, e quantas foram trocadas"""
+        memo = self._memo
+        trocas = None
+        # Cada trecho entre espaços é procurado uma vez; os seguintes saem do memo
+        palavras = texto.split()
+        for palavra in palavras:
+            correcao = memo.get(palavra, _AUSENTE)
+            if correcao is _AUSENTE:
+                correcao = self._corrigir_palavra(palavra)
+                if len(memo) >= self._memo_maximo:
+                    memo.clear()
+                memo[palavra] = correcao
+            if correcao is not None:
+                if trocas is None:
+                    trocas = {}
+                trocas[palavra] = correcao
+        if trocas is None:
+            return texto, 0
+        # Espaços simples (o comum): remontar pelos trechos sai mais barato que o regex
+        if ' '.join(palavras) == texto:
+            return ' '.join([trocas.get(palavra, palavra) for palavra in palavras]), len(trocas)
+        return _TRECHO.sub(lambda match: trocas.get(match.group(), match.group()), texto), len(trocas)
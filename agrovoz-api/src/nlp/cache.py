@@ -0,0 +1,251 @@
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from src.config import (
+    NLP_CACHE_RESULTADOS, NLP_CACHE_ITENS, NLP_CACHE_TTL_S, NLP_CACHE_REDIS_URL
+)
+
+# Sentinela para diferenciar "ausente" de um valor None guardado
+_AUSENTE = object()
+
+
+class CacheLRU:
+    """
+    Cache LRU limitado, com TTL opcional e contadores de acerto/falta.
+
+    Seguro para uso por várias threads. Com `ttl` None as entradas só
+    saem por despejo LRU ou invalidação explícita.
+    """
+
+    def __init__(self, max_itens: int, ttl: Optional[float] = None):
+        if max_itens <= 0:
+            raise ValueError("max_itens deve ser positivo")
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def obter(self, chave: Hashable, padrao: Any = None) -> Any:
+        """Retorna o valor da chave ou `padrao`, contando acerto/falta"""
+        with self._lock:
+            item = self._itens.get(chave, _AUSENTE)
+            if item is not _AUSENTE:
+                valor, expira_em = item
+                if expira_em is None or expira_em > time.monotonic():
+                    self._itens.move_to_end(chave)
+                    self.acertos += 1
+                    return valor
+                del self._itens[chave]
+            self.faltas += 1
+            return padrao
+
+    def guardar(self, chave: Hashable, valor: Any):
+        """Guarda o valor, despejando o item usado há mais tempo se necessário"""
+        expira_em = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._itens[chave] = (valor, expira_em)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.despejos += 1
+
+    def obter_ou_criar(self, chave: Hashable, criar: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou cria, guarda e retorna um novo"""
+        valor = self.obter(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = criar()
+            self.guardar(chave, valor)
+        return valor
+
+    def invalidar(self, chave: Hashable):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        consultas = self.acertos + self.faltas
+        return {
+            'itens': len(self._itens),
+            'max_itens': self.max_itens,
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'despejos': self.despejos,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0
+        }
+
+
+class BackendResultados(ABC):
+    """
+    Interface dos backends do cache de resultados do NLP.
+
+    Chaves são strings; valores são estruturas simples (dict, list, str,
+    números, None), serializáveis em JSON para backends compartilhados.
+    """
+
+    @abstractmethod
+    def obter(self, chave: str) -> Optional[Any]:
+        ...
+
+    @abstractmethod
+    def guardar(self, chave: str, valor: Any):
+        ...
+
+    @abstractmethod
+    def limpar(self):
+        ...
+
+    @abstractmethod
+    def estatisticas(self) -> Dict[str, Any]:
+        ...
+
+
+class BackendMemoria(BackendResultados):
+    """Cache no próprio processo (padrão); cada worker tem o seu"""
+
+    def __init__(self, max_itens: int):
+        self._cache = CacheLRU(max_itens)
+
+    def obter(self, chave: str) -> Optional[Any]:
+        return self._cache.obter(chave)
+
+    def guardar(self, chave: str, valor: Any):
+        self._cache.guardar(chave, valor)
+
+    def limpar(self):
+        self._cache.limpar()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return dict(self._cache.estatisticas(), backend='memoria')
+
+
+class _BackendSerializado(BackendResultados):
+    """Base dos backends que guardam o valor serializado em JSON"""
+
+    nome = ''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    @abstractmethod
+    def _ler(self, chave: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def _escrever(self, chave: str, dados: bytes):
+        ...
+
+    def obter(self, chave: str) -> Optional[Any]:
+        dados = self._ler(chave)
+        with self._lock:
+            if dados is None:
+                self.faltas += 1
+                return None
+            self.acertos += 1
+        return json.loads(dados)
+
+    def guardar(self, chave: str, valor: Any):
+        self._escrever(chave, json.dumps(valor, ensure_ascii=False).encode('utf-8'))
+
+    def estatisticas(self) -> Dict[str, Any]:
+        consultas = self.acertos + self.faltas
+        return {
+            'backend': self.nome,
+            'acertos': self.acertos,
+            'faltas': self.faltas,
+            'taxa_acerto': self.acertos / consultas if consultas else 0.0
+        }
+
+
+class BackendLocalCompartilhado(_BackendSerializado):
+    """
+    Substituto local de um backend compartilhado, para testes e benchmarks.
+
+    Guarda os valores serializados, como um servidor externo faria: cada
+    leitura devolve uma cópia nova e valores não serializáveis falham na
+    escrita. Uma mesma instância pode ser passada a vários processadores.
+    """
+
+    nome = 'local'
+
+    def __init__(self, max_itens: int):
+        super().__init__()
+        self._cache = CacheLRU(max_itens)
+
+    def _ler(self, chave: str) -> Optional[bytes]:
+        return self._cache.obter(chave)
+
+    def _escrever(self, chave: str, dados: bytes):
+        self._cache.guardar(chave, dados)
+
+    def limpar(self):
+        self._cache.limpar()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return dict(super().estatisticas(), itens=len(self._cache))
+
+
+class BackendRedis(_BackendSerializado):
+    """
+    Cache compartilhado entre workers e instâncias via Redis.
+
+    Dependência opcional (requirements-opcionais.txt), importada só aqui:
+    sem ela, NLP_CACHE_RESULTADOS=redis falha ao subir, com o motivo. A
+    memória é limitada pelo TTL das chaves e pela política de despejo do
+    servidor.
+    """
+
+    nome = 'redis'
+
+    def __init__(self, url: str, ttl: Optional[float] = None, prefixo: str = 'agrovoz:nlp:'):
+        super().__init__()
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "NLP_CACHE_RESULTADOS=redis requer o pacote 'redis' (pip install -r requirements-opcionais.txt); "
+                "use NLP_CACHE_RESULTADOS=memoria para o cache em cada processo"
+            ) from e
+        self._cliente = redis.Redis.from_url(url)
+        self._ttl = int(ttl) if ttl else None
+        self._prefixo = prefixo
+
+    def _chave(self, chave: str) -> str:
+        # Textos longos viram chaves de tamanho fixo no servidor
+        return self._prefixo + hashlib.sha1(chave.encode('utf-8')).hexdigest()
+
+    def _ler(self, chave: str) -> Optional[bytes]:
+        return self._cliente.get(self._chave(chave))
+
+    def _escrever(self, chave: str, dados: bytes):
+        self._cliente.set(self._chave(chave), dados, ex=self._ttl)
+
+    def limpar(self):
+        for chave in self._cliente.scan_iter(match=self._prefixo + '*'):
+            self._cliente.delete(chave)
+
+
+def criar_backend_resultados() -> Optional[BackendResultados]:
+    """Backend configurado em NLP_CACHE_RESULTADOS ('memoria', 'redis' ou 'desligado')"""
+    if NLP_CACHE_RESULTADOS == 'desligado':
+        return None
+    if NLP_CACHE_RESULTADOS == 'memoria':
+        return BackendMemoria(NLP_CACHE_ITENS)
+    if NLP_CACHE_RESULTADOS == 'redis':
+        return BackendRedis(NLP_CACHE_REDIS_URL, ttl=NLP_CACHE_TTL_S)
+    raise ValueError(f"NLP_CACHE_RESULTADOS inválido: '{NLP_CACHE_RESULTADOS}'")
@@ -0,0 +1,316 @@
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src import metricas
+from src.config import (
+    NLP_CACHE_ITENS, NLP_EXECUTOR, NLP_WORKERS, NLP_LOTE_MAX_LATENCIA_MS, NLP_LOTE_MAX_ITENS,
+    NLP_TIMEOUT_S
+)
+from src.nlp.cache import BackendMemoria
+from src.nlp.resultado import ResultadoNLP
+from src.nlp.vocabulario import VocabularioUsuario
+
+if TYPE_CHECKING:
+    # Importado só ao criar o processador: padrões, motor e validador
+    # ficam fora da importação da API
+    from src.nlp.processador import ProcessadorNLPRural
+
+# Item a processar: (texto, usuario_id, vocabulário do usuário)
+ItemNLP = Tuple[str, Optional[str], Optional[VocabularioUsuario]]
+
+# Resultado de um item: (sucesso, ResultadoNLP ou mensagem de erro)
+ResultadoItem = Tuple[bool, Any]
+
+
+class ErroProcessamentoNLP(Exception):
+    """Falha ao processar um texto no executor de NLP"""
+
+
+class ExecutorIndisponivel(ErroProcessamentoNLP):
+    """O executor não atendeu (encerrando ou workers sem resposta); vale tentar de novo"""
+
+
+def _processar_itens(processador: "ProcessadorNLPRural",
+                     itens: List[ItemNLP]) -> List[ResultadoItem]:
+    """Processa uma lista de (texto, usuario_id, vocabulario) isolando erros por item"""
+    if len(itens) == 1:
+        texto, usuario_id, vocabulario = itens[0]
+        try:
+            return [(True, processador.processar_texto(texto, usuario_id, vocabulario))]
+        except Exception as e:
+            return [(False, str(e))]
+    # Validação do lote inteiro de uma vez (ver ProcessadorNLPRural.processar_lote)
+    return processador.processar_lote(itens)
+
+
+class ExecutorLocal:
+    """
+    Executa o NLP na própria thread da requisição.
+
+    Sem um processador pronto, ele é criado em iniciar() ou, se ainda não
+    existir, na primeira fala.
+    """
+
+    def __init__(self, processador: Optional["ProcessadorNLPRural"] = None):
+        self._processador = processador
+        self._lock = threading.Lock()
+
+    @property
+    def processador(self) -> "ProcessadorNLPRural":
+        if self._processador is None:
+            with self._lock:
+                if self._processador is None:
+                    from src.nlp.processador import ProcessadorNLPRural
+                    self._processador = ProcessadorNLPRural()
+        return self._processador
+
+    def iniciar(self, esperar: bool = True):
+        """Cria o processador; sem `esperar`, numa thread (as rotas já atendem enquanto isso)"""
+        if self._processador is not None:
+            return
+        if esperar:
+            self.processador
+            return
+        threading.Thread(
+            target=lambda: self.processador, name="nlp-aquecimento", daemon=True
+        ).start()
+
+    def encerrar(self):
+        pass
+
+    def processar(self, texto: str, usuario_id: Optional[str] = None,
+                  vocabulario: Optional[VocabularioUsuario] = None) -> ResultadoNLP:
+        return self.processador.processar_texto(texto, usuario_id, vocabulario)
+
+    def processar_lote(self, itens: List[ItemNLP]) -> List[ResultadoItem]:
+        return _processar_itens(self.processador, itens)
+
+
+# Processador de cada worker, criado uma única vez no initializer do pool
+_processador_worker: Optional["ProcessadorNLPRural"] = None
+
+
+def _inicializar_worker(cache_privado: bool = False):
+    global _processador_worker
+    from src.nlp.processador import ProcessadorNLPRural
+
+    _processador_worker = ProcessadorNLPRural(
+        BackendMemoria(NLP_CACHE_ITENS) if cache_privado else None
+    )
+
+
+def _aquecer_worker() -> bool:
+    return _processador_worker is not None
+
+
+def _processar_lote_worker(itens: List[ItemNLP]) -> Tuple[List[ResultadoItem], Dict]:
+    # As métricas do NLP medidas no worker voltam com o lote para o /metrics do servidor
+    return _processar_itens(_processador_worker, itens), metricas.REGISTRO.drenar('agrovoz_nlp_')
+
+
+def _resultados_worker(retorno: Tuple[List[ResultadoItem], Dict]) -> List[ResultadoItem]:
+    resultados, drenado = retorno
+    metricas.REGISTRO.incorporar(drenado)
+    return resultados
+
+
+# Sinal para a thread de despacho encerrar
+_PARAR = object()
+
+
+class ExecutorProcessos:
+    """
+    Executa o NLP em um pool de processos pré-aquecido.
+
+    Cada worker carrega padrões e vocabulário no initializer. Requisições
+    individuais entram em uma fila e são agrupadas em micro-lotes: o lote
+    segue para um worker quando atinge `max_itens` ou quando o primeiro item
+    espera `max_latencia_ms`, o que amortiza o custo de IPC por item.
+
+    Com `cache_privado`, cada worker usa um cache de resultados em memória
+    em vez do configurado em NLP_CACHE_RESULTADOS.
+
+    Cada lote tem `timeout_s` para voltar dos workers. Depois que
+    encerrar() começa, falas novas são recusadas com ExecutorIndisponivel.
+    """
+
+    def __init__(self, workers: int, max_latencia_ms: float, max_itens: int,
+                 cache_privado: bool = False, timeout_s: float = NLP_TIMEOUT_S):
+        self.workers = workers
+        self.cache_privado = cache_privado
+        self.max_latencia = max_latencia_ms / 1000
+        self.max_itens = max_itens
+        self.timeout = timeout_s
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._fila: "queue.Queue" = queue.Queue()
+        self._despachante: Optional[threading.Thread] = None
+        self._processador: Optional["ProcessadorNLPRural"] = None
+        self._lock = threading.Lock()
+        # Ordena a entrada de trabalho com o início do encerramento
+        self._lock_envio = threading.Lock()
+        self._encerrando = False
+
+    @property
+    def processador(self) -> "ProcessadorNLPRural":
+        """
+        Processador no próprio servidor, para a extração que guarda estado
+        entre chamadas (sessões de /ws/processar-fala) e não vai aos
+        workers; criado no primeiro uso, com cache em memória
+        """
+        if self._processador is None:
+            with self._lock:
+                if self._processador is None:
+                    from src.nlp.processador import ProcessadorNLPRural
+                    self._processador = ProcessadorNLPRural(BackendMemoria(NLP_CACHE_ITENS))
+        return self._processador
+
+    def iniciar(self, esperar: bool = True):
+        """
+        Sobe os workers e espera todos carregarem o processador. Sem
+        `esperar`, retorna logo: as primeiras falas aguardam na fila até
+        um worker ficar pronto.
+        """
+        if self._pool is not None:
+            return
+        # Registra aqui as métricas do NLP que os workers devolvem com cada lote
+        import src.nlp.processador
+        # spawn: fork de um servidor com threads ativas pode herdar locks travados
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_inicializar_worker,
+            initargs=(self.cache_privado,)
+        )
+        aquecimento = [self._pool.submit(_aquecer_worker) for _ in range(self.workers)]
+        if esperar:
+            wait(aquecimento)
+
+        self._despachante = threading.Thread(
+            target=self._despachar, name="nlp-microlotes", daemon=True
+        )
+        self._despachante.start()
+
+    def encerrar(self):
+        """
+        Recusa falas novas, despacha o que já estava na fila e desliga os
+        workers. O que sobrar na fila (despachante morto) falha.
+        """
+        with self._lock_envio:
+            if self._pool is None or self._encerrando:
+                return
+            self._encerrando = True
+            # Com o lock: nenhuma fala entra na fila depois do sinal
+            self._fila.put(_PARAR)
+        self._despachante.join()
+        self._pool.shutdown(wait=True)
+        self._falhar_pendentes()
+        with self._lock_envio:
+            self._pool = None
+            self._despachante = None
+            self._encerrando = False
+
+    def processar(self, texto: str, usuario_id: Optional[str] = None,
+                  vocabulario: Optional[VocabularioUsuario] = None) -> ResultadoNLP:
+        futuro: Future = Future()
+        with self._lock_envio:
+            self._verificar_iniciado()
+            self._fila.put(((texto, usuario_id, vocabulario), futuro))
+        sucesso, resultado = self._aguardar(futuro)
+        if not sucesso:
+            raise ErroProcessamentoNLP(resultado)
+        return resultado
+
+    def processar_lote(self, itens: List[ItemNLP]) -> List[ResultadoItem]:
+        # Lotes explícitos já chegam agrupados: vão direto ao pool, em pedaços
+        with self._lock_envio:
+            self._verificar_iniciado()
+            pedacos = [
+                self._pool.submit(_processar_lote_worker, itens[i:i + self.max_itens])
+                for i in range(0, len(itens), self.max_itens)
+            ]
+        resultados: List[ResultadoItem] = []
+        for pedaco in pedacos:
+            resultados.extend(_resultados_worker(self._aguardar(pedaco)))
+        return resultados
+
+    def _aguardar(self, futuro: Future) -> Any:
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TimeoutError:
+            raise ExecutorIndisponivel(f"NLP sem resposta em {self.timeout:g}s") from None
+
+    def _verificar_iniciado(self):
+        if self._pool is None:
+            raise RuntimeError("Executor de NLP em processos não foi iniciado")
+        if self._encerrando:
+            raise ExecutorIndisponivel("Executor de NLP em encerramento")
+
+    def _falhar_pendentes(self):
+        while True:
+            try:
+                item = self._fila.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _PARAR:
+                item[1].set_exception(ExecutorIndisponivel("Executor de NLP encerrado"))
+
+    def _despachar(self):
+        """Agrupa itens da fila em micro-lotes e os envia ao pool"""
+        parar = False
+        while not parar:
+            item = self._fila.get()
+            if item is _PARAR:
+                break
+
+            lote = [item]
+            prazo = time.monotonic() + self.max_latencia
+            while len(lote) < self.max_itens:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = self._fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is _PARAR:
+                    parar = True
+                    break
+                lote.append(item)
+
+            self._enviar(lote)
+
+    def _enviar(self, lote: List[Tuple[ItemNLP, Future]]):
+        futuros = [futuro for _, futuro in lote]
+        try:
+            envio = self._pool.submit(_processar_lote_worker, [item for item, _ in lote])
+        except Exception as e:
+            for futuro in futuros:
+                futuro.set_exception(e)
+            return
+
+        def _distribuir(concluido: Future):
+            erro = concluido.exception()
+            if erro is not None:
+                for futuro in futuros:
+                    futuro.set_exception(erro)
+                return
+            for futuro, resultado in zip(futuros, _resultados_worker(concluido.result())):
+                futuro.set_result(resultado)
+
+        envio.add_done_callback(_distribuir)
+
+
+def criar_executor(processador: Optional["ProcessadorNLPRural"] = None):
+    """
+    Cria o executor de NLP configurado em NLP_EXECUTOR ('local' ou
+    'processos'). Sem `processador`, o local cria o seu em iniciar().
+    """
+    if NLP_EXECUTOR == "processos":
+        return ExecutorProcessos(NLP_WORKERS, NLP_LOTE_MAX_LATENCIA_MS, NLP_LOTE_MAX_ITENS)
+    if NLP_EXECUTOR != "local":
+        raise ValueError(f"NLP_EXECUTOR inválido: '{NLP_EXECUTOR}'")
+    return ExecutorLocal(processador)
@@ -0,0 +1,332 @@
+import re
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Qualquer caractere fora do Latin-1 ou maiúsculo tira o texto do caminho rápido
+_FORA_DO_DOMINIO = re.compile(r'[^\x00-\xff]|[A-ZÀ-ÖØ-Þ]')
+_DOMINIO_MINUSCULO = [
+    chr(c) for c in range(0x100) if not _FORA_DO_DOMINIO.match(chr(c))
+]
+
+# Escapes e classes de caracteres são analisados à parte na versão sem IGNORECASE
+_ESCAPE = re.compile(r'\\.')
+_CLASSE = re.compile(r'\[\^?\]?[^\]]*\]')
+
+# Abaixo deste tamanho a VarreduraIncremental procura no texto todo
+# (no texto curto a busca em C custa menos que conferir os estados)
+LIMIAR_INCREMENTAL = 160
+
+# Trechos de espaço em branco (o que `\s` aceita), unidade do alcance dos padrões
+_ESPACOS = re.compile(r'\s+')
+
+
+def _versao_minuscula(padrao: re.Pattern) -> Optional[str]:
+    """
+    Fonte do padrão sem IGNORECASE, equivalente ao original em texto minúsculo Latin-1.
+
+    Retorna None quando não é possível garantir a equivalência (ex.: literais
+    maiúsculos fora de classes de caracteres).
+    """
+    fonte = padrao.pattern
+    if not padrao.flags & re.IGNORECASE:
+        return fonte
+
+    sem_escapes = _ESCAPE.sub('', fonte)
+    for classe in _CLASSE.findall(sem_escapes):
+        try:
+            sensivel = re.compile(classe)
+            insensivel = re.compile(classe, re.IGNORECASE)
+        except re.error:
+            return None
+        if any(bool(sensivel.match(c)) != bool(insensivel.match(c)) for c in _DOMINIO_MINUSCULO):
+            return None
+
+    literais = _CLASSE.sub('', sem_escapes)
+    if literais != literais.lower():
+        return None
+    return fonte
+
+
+def trechos_de_espaco(literal: str) -> int:
+    """Trechos de espaço em branco de um texto literal (alcance de um padrão que só o procura)"""
+    return len(_ESPACOS.findall(literal))
+
+
+def prefixo_comum(a: str, b: str) -> int:
+    """Tamanho do maior prefixo comum de dois textos"""
+    if b.startswith(a):
+        return len(a)
+    # Busca binária comparando fatias (a comparação roda em C)
+    inicio, fim = 0, min(len(a), len(b))
+    while inicio < fim:
+        meio = (inicio + fim + 1) // 2
+        if a[:meio] == b[:meio]:
+            inicio = meio
+        else:
+            fim = meio - 1
+    return inicio
+
+
+class Varredura:
+    """Padrões e vocabulário escolhidos para extrair um texto"""
+
+    __slots__ = ('texto', 'padroes', 'indices', 'palavras')
+
+    def __init__(self, texto: str, padroes: List[re.Pattern], indices: Dict[str, int],
+                 palavras: Dict[str, Tuple[str, ...]]):
+        self.texto = texto
+        self.padroes = padroes
+        self.indices = indices
+        self.palavras = palavras
+
+    def primeiro(self, nome: str) -> Optional[str]:
+        """Valor capturado na primeira ocorrência do padrão (como `re.search`)"""
+        match = self.padroes[self.indices[nome]].search(self.texto)
+        return match.group(1) if match is not None else None
+
+    def todos(self, nome: str) -> List[str]:
+        """Valores capturados em todas as ocorrências do padrão, em ordem"""
+        return [m.group(1) for m in self.padroes[self.indices[nome]].finditer(self.texto)]
+
+    def contem(self, rotulo: str) -> bool:
+        """Indica se alguma palavra do rótulo aparece no texto (como `palavra in texto`)"""
+        texto = self.texto
+        for palavra in self.palavras[rotulo]:
+            if palavra in texto:
+                return True
+        return False
+
+    def buscar(self, padrao: re.Pattern, alcance: Optional[int] = None) -> Optional[re.Match]:
+        """Primeira ocorrência de um padrão fora do motor (vocabulário do usuário)"""
+        return padrao.search(self.texto)
+
+    def contem_palavra(self, palavra: str) -> bool:
+        return palavra in self.texto
+
+
+class _Estado:
+    """
+    Resultado de um padrão ou palavra na versão do texto em que foi
+    calculado e o quanto desse texto continua igual (prefixo comum com o
+    texto atual)
+    """
+    __slots__ = ('valor', 'prefixo', 'versao')
+
+    def __init__(self, valor, prefixo: int, versao: int):
+        self.valor = valor
+        self.prefixo = prefixo
+        self.versao = versao
+
+
+class VarreduraIncremental:
+    """
+    Varredura de um texto que muda aos poucos (transcrição parcial de uma
+    fala): a cada atualizar(), cada padrão só é procurado de novo a partir
+    do ponto em que a alteração pode mudar o resultado.
+
+    O alcance de um padrão é o máximo de trechos de espaço em branco que
+    uma tentativa dele percorre (ALCANCE_EM_TRECHOS em patterns.py; para
+    os nomes do usuário, trechos_de_espaco). Uma tentativa que começa em
+    `s` e percorre no máximo R trechos nunca lê além do início do
+    (R+1)-ésimo trecho depois de `s` (o `re` olha só um caractere além do
+    que consumiu). Assim as tentativas que terminam antes do prefixo
+    comum com o texto anterior dão o mesmo resultado nos dois: a primeira
+    ocorrência antiga que começa nelas continua valendo, e a busca
+    recomeça na primeira tentativa que pode ter lido a parte alterada.
+    Padrões sem alcance conhecido são procurados no texto todo. Os
+    resultados são os mesmos de uma Varredura do texto inteiro.
+
+    Os resultados são calculados na primeira consulta e lembrados junto
+    com o prefixo que continua igual desde então. Textos menores que
+    LIMIAR_INCREMENTAL são procurados inteiros, sem estado.
+    """
+
+    def __init__(self, motor: 'MotorExtracao'):
+        self._motor = motor
+        self.texto = ''
+        self.versao = 0
+        self.padroes: List[re.Pattern] = motor._minusculos
+        self._inicio_fora: Optional[int] = None
+        self._trechos: List[int] = []
+        self._primeiros: Dict[re.Pattern, _Estado] = {}
+        self._todos: Dict[re.Pattern, _Estado] = {}
+        self._palavras: Dict[str, _Estado] = {}
+        self._rotulos: Dict[str, _Estado] = {}
+        self._direta = True
+
+    def atualizar(self, texto: str) -> int:
+        """Troca o texto varrido; devolve o tamanho do prefixo que não mudou"""
+        if texto == self.texto:
+            return len(texto)
+        comum = prefixo_comum(self.texto, texto)
+        self.texto = texto
+        self.versao += 1
+
+        # Conjunto de padrões: o rápido só com o texto inteiro no domínio
+        if self._inicio_fora is None or self._inicio_fora >= comum:
+            fora = _FORA_DO_DOMINIO.search(texto, comum)
+            self._inicio_fora = fora.start() if fora is not None else None
+        padroes = self._motor._minusculos if self._inicio_fora is None else self._motor._originais
+        if padroes is not self.padroes:
+            self.padroes = padroes
+            self._primeiros.clear()
+            self._todos.clear()
+
+        # Inícios dos trechos de espaço: os anteriores ao ponto alterado continuam
+        trechos = self._trechos
+        del trechos[bisect_left(trechos, comum):]
+        for espacos in _ESPACOS.finditer(texto, comum):
+            inicio = espacos.start()
+            if inicio == comum and comum > 0 and _ESPACOS.match(texto, comum - 1):
+                continue
+            trechos.append(inicio)
+
+        # Texto curto: procurar no texto todo sai mais barato que manter os estados
+        self._direta = len(texto) < LIMIAR_INCREMENTAL
+        for estados in (self._primeiros, self._todos, self._palavras, self._rotulos):
+            if self._direta:
+                estados.clear()
+                continue
+            for estado in estados.values():
+                if estado.prefixo > comum:
+                    estado.prefixo = comum
+        return comum
+
+    def _reinicio(self, alcance: Optional[int], prefixo: int) -> int:
+        """Primeira posição em que uma tentativa do padrão pode ler além de `prefixo`"""
+        if alcance is None:
+            return 0
+        # Seguras: as tentativas com alcance + 1 inícios de trecho antes de `prefixo`
+        antes = bisect_left(self._trechos, prefixo)
+        return self._trechos[antes - alcance - 1] if antes > alcance else 0
+
+    def buscar(self, padrao: re.Pattern, alcance: Optional[int] = None) -> Optional[re.Match]:
+        if self._direta:
+            return padrao.search(self.texto)
+        estado = self._primeiros.get(padrao)
+        if estado is None:
+            match = padrao.search(self.texto)
+            self._primeiros[padrao] = _Estado(match, len(self.texto), self.versao)
+            return match
+        if estado.versao == self.versao:
+            return estado.valor
+        reinicio = self._reinicio(alcance, estado.prefixo)
+        match = estado.valor
+        if match is None or match.start() >= reinicio:
+            match = padrao.search(self.texto, reinicio)
+        estado.valor, estado.prefixo, estado.versao = match, len(self.texto), self.versao
+        return match
+
+    def primeiro(self, nome: str) -> Optional[str]:
+        indice = self._motor._indices[nome]
+        match = self.buscar(self.padroes[indice], self._motor._alcances[indice])
+        return match.group(1) if match is not None else None
+
+    def todos(self, nome: str) -> List[str]:
+        indice = self._motor._indices[nome]
+        padrao = self.padroes[indice]
+        if self._direta:
+            return [match.group(1) for match in padrao.finditer(self.texto)]
+        estado = self._todos.get(padrao)
+        if estado is None:
+            matches = list(padrao.finditer(self.texto))
+            self._todos[padrao] = _Estado(matches, len(self.texto), self.versao)
+        elif estado.versao == self.versao:
+            matches = estado.valor
+        else:
+            reinicio = self._reinicio(self._motor._alcances[indice], estado.prefixo)
+            matches = [match for match in estado.valor if match.start() < reinicio]
+            posicao = max(matches[-1].end(), reinicio) if matches else reinicio
+            matches.extend(padrao.finditer(self.texto, posicao))
+            estado.valor, estado.prefixo, estado.versao = matches, len(self.texto), self.versao
+        return [match.group(1) for match in matches]
+
+    def _procurar(self, estados: Dict[str, _Estado], chave: str, palavras) -> bool:
+        """
+        Alguma das palavras aparece no texto? O estado guarda o fim de uma
+        ocorrência achada (ou None): enquanto ela estiver no prefixo que não
+        mudou, continua valendo; se não havia nenhuma, uma nova só pode
+        cruzar o ponto alterado.
+        """
+        if self._direta:
+            texto = self.texto
+            for palavra in palavras:
+                if palavra in texto:
+                    return True
+            return False
+        estado = estados.get(chave)
+        if estado is not None and estado.versao == self.versao:
+            return estado.valor is not None
+        texto = self.texto
+        if estado is None or (estado.valor is not None and estado.valor > estado.prefixo):
+            prefixo = 0
+        elif estado.valor is not None:
+            estado.prefixo, estado.versao = len(texto), self.versao
+            return True
+        else:
+            prefixo = estado.prefixo
+        fim = None
+        for palavra in palavras:
+            posicao = texto.find(palavra, max(prefixo - len(palavra) + 1, 0))
+            if posicao >= 0:
+                fim = posicao + len(palavra)
+                break
+        if estado is None:
+            estados[chave] = _Estado(fim, len(texto), self.versao)
+        else:
+            estado.valor, estado.prefixo, estado.versao = fim, len(texto), self.versao
+        return fim is not None
+
+    def contem_palavra(self, palavra: str) -> bool:
+        return self._procurar(self._palavras, palavra, (palavra,))
+
+    def contem(self, rotulo: str) -> bool:
+        return self._procurar(self._rotulos, rotulo, self._motor._palavras[rotulo])
+
+
+class MotorExtracao:
+    """
+    Motor de extração com padrões e vocabulário pré-compilados.
+
+    Como `_limpar_texto` entrega o texto em minúsculas, cada padrão com
+    IGNORECASE ganha uma versão sensível a maiúsculas, que o `re` acelera
+    com busca por prefixo literal. A versão rápida só é usada no domínio em
+    que é comprovadamente equivalente (Latin-1 sem maiúsculas); fora dele
+    valem os padrões originais.
+
+    As listas de palavras-chave ficam em tuplas imutáveis: para listas
+    curtas, `palavra in texto` em laço simples é mais rápido que qualquer
+    alternância de regex. `alcances` dá o alcance em trechos de espaço de
+    cada padrão (ver VarreduraIncremental); sem ele, o padrão é procurado
+    no texto todo a cada atualização.
+    """
+
+    def __init__(self, padroes: Dict[str, re.Pattern], palavras: Dict[str, Iterable[str]],
+                 alcances: Optional[Dict[str, Optional[int]]] = None):
+        self._indices: Dict[str, int] = {nome: i for i, nome in enumerate(padroes)}
+        self._alcances: List[Optional[int]] = [(alcances or {}).get(nome) for nome in padroes]
+        self._originais: List[re.Pattern] = list(padroes.values())
+        self._minusculos: List[re.Pattern] = []
+        self._palavras: Dict[str, Tuple[str, ...]] = {
+            rotulo: tuple(lista) for rotulo, lista in palavras.items()
+        }
+
+        for nome, padrao in padroes.items():
+            if not padrao.groups:
+                raise ValueError(f"Padrão '{nome}' precisa de um grupo de captura")
+
+            fonte = _versao_minuscula(padrao)
+            if fonte is None:
+                self._minusculos.append(padrao)
+            else:
+                self._minusculos.append(re.compile(fonte, padrao.flags & ~re.IGNORECASE))
+
+    def varredura_incremental(self) -> VarreduraIncremental:
+        """Varredura para um texto que vai ser atualizado aos poucos"""
+        return VarreduraIncremental(self)
+
+    def varrer(self, texto: str) -> Varredura:
+        """Escolhe o conjunto de padrões adequado ao texto"""
+        if _FORA_DO_DOMINIO.search(texto) is None:
+            return Varredura(texto, self._minusculos, self._indices, self._palavras)
+        return Varredura(texto, self._originais, self._indices, self._palavras)
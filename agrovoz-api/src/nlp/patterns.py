@@ -33,7 +33,7 @@ PATTERNS_REGEX = {
     
     # Valores monetários - padrão mais robusto
     'valor_monetario': re.compile(
-        r'(?:por\s+|custou\s+|gastei\s+|paguei\s+|valor\s+de\s+)?(?:R\$\s*)?(\d{1,6}(?:[.,]\d{3})*(?:[.,]\d{2})?)\s*(?:reais?|R\$)',
+        r'(?:por\s+|custou\s+|gastei\s+|paguei\s+|valor\s+de\s+)?(?:r\$\s*)?(\d{1,6}(?:[.,]\d{3})*(?:[.,]\d{2})?)\s*(?:reais?|r\$)',
         re.IGNORECASE
     ),
     
@@ -75,7 +75,7 @@ PATTERNS_REGEX = {
 PATTERNS_ALTERNATIVOS = {
     # Formas coloquiais de valores
     'valor_contexto': re.compile(
-        r'(?:por|custou|gastei|paguei|valor de)\s+(?:R\$\s*)?(\d{1,6}(?:[.,]\d{3})*(?:[.,]\d{2})?)',
+        r'(?:por|custou|gastei|paguei|valor de)\s+(?:r\$\s*)?(\d{1,6}(?:[.,]\d{3})*(?:[.,]\d{2})?)',
         re.IGNORECASE
     ),
     
@@ -89,5 +89,75 @@ PATTERNS_ALTERNATIVOS = {
     'area_aproximada': re.compile(
         r'(?:cerca\s+de\s+|aproximadamente\s+|uns\s+)?(\d+(?:[.,]\d+)?)\s*(?:hectares?|ha)',
         re.IGNORECASE
+    ),
+    
+    # Último recurso: números grandes (> 100) após palavras de contexto
+    'valor_fallback': re.compile(
+        r'(?:por|custou|gastei|paguei)\s+.*?(\d{3,})'
     )
 }
+
+# Máximo de trechos de espaço em branco que uma ocorrência de cada padrão
+# percorre: cada `\s+`, `\s*` ou espaço literal conta um, e alternativas
+# contam pela maior (None: sem limite, como o `.*?` do valor_fallback).
+# A VarreduraIncremental recomeça a busca a essa distância da alteração
+# do texto; um padrão alterado aqui em cima precisa ter o alcance revisto
+ALCANCE_EM_TRECHOS = {
+    'pessoa_contratacao': 3,    # verbo\s+ artigo? \s* nome \s+para
+    'pessoa_geral': 2,          # com\s+o\s+ nome
+    'atividade_verbo': 0,
+    'cultura': 0,
+    'talhao': 1,
+    'valor_monetario': 4,       # valor\s+de\s+ r$\s* 100 \s*reais
+    'quantidade_kg': 1,
+    'quantidade_sacas': 1,
+    'quantidade_litros': 1,
+    'quantidade_hectares': 1,
+    'insumos': 0,
+    'maquinas': 0,
+    'valor_contexto': 3,        # valor de\s+ r$\s* 100
+    'periodo_tempo': 2,
+    'area_aproximada': 3,
+    'valor_fallback': None,
+}
+
+# Palavras-chave por tipo de atividade (ordem define a prioridade)
+CLASSIFICACAO_ATIVIDADES = {
+    'contratacao': ['contratei', 'chamei', 'paguei', 'contrato'],
+    'compra_insumo': ['comprei', 'adquiri', 'compra'],
+    'venda': ['vendi', 'entreguei', 'comercializei'],
+    'plantio': ['plantei', 'plantar', 'semeei', 'semear'],
+    'colheita': ['colhi', 'colher', 'colhendo'],
+    'pulverizacao': ['pulverizei', 'apliquei', 'pulverizar'],
+    'preparo_solo': ['arei', 'arar', 'preparei', 'gradear']
+}
+
+# Palavras fixas dos padrões acima, corrigidas quando a transcrição erra
+# (ver src/nlp/aproximado.py); as atividades e culturas vêm do vocabulário
+PALAVRAS_DOS_PADROES = (
+    'talhão', 'área', 'gleba', 'reais', 'custou', 'gastei', 'valor',
+    'quilos', 'quilogramas', 'sacas', 'litros', 'hectares', 'alqueires',
+    'plantar', 'plantei', 'colher', 'colhi', 'pulverizar', 'pulverizei', 'arar', 'arei',
+    'semear', 'semeei', 'aplicar', 'apliquei', 'fertilizar', 'fertilizei',
+)
+
+# Verbos das palavras de referência: as conjugações regulares deles ficam
+# como estão ("colheu" não é "colher" mal transcrito)
+VERBOS_DAS_REFERENCIAS = (
+    'contratar', 'chamar', 'pagar', 'comprar', 'adquirir', 'vender', 'entregar', 'comercializar',
+    'plantar', 'semear', 'colher', 'pulverizar', 'aplicar', 'fertilizar', 'arar', 'preparar',
+    'gradear', 'custar', 'gastar',
+)
+
+# Palavras comuns a uma edição de alguma palavra de referência, que não
+# podem ser "corrigidas" para ela (cada -> cana, milhão -> milho)
+PALAVRAS_COMUNS = (
+    # soja, milho, cana, trigo
+    'sola', 'sopa', 'soma', 'sova', 'sofá', 'milha', 'milhão',
+    'cada', 'cama', 'casa', 'cara', 'caro', 'cano', 'cena', 'cata', 'capa', 'cala', 'calo',
+    'cava', 'canal', 'trago',
+    # atividades
+    'planta', 'plantas', 'plantel', 'entregue', 'areia', 'ares', 'amar', 'arma',
+    # padrões
+    'reis', 'valer', 'vapor',
+)
@@ -1,210 +1,537 @@
+import hashlib
 import re
-import json
+import time
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple, Any
-from src.nlp.patterns import PATTERNS_REGEX
+from typing import Dict, List, Optional, Sequence, Tuple, Union, Any
+from src.nlp.patterns import (
+    PATTERNS_REGEX, PATTERNS_ALTERNATIVOS, ALCANCE_EM_TRECHOS, CLASSIFICACAO_ATIVIDADES,
+    PALAVRAS_DOS_PADROES, PALAVRAS_COMUNS, VERBOS_DAS_REFERENCIAS
+)
+from src.nlp import aproximado, regras
+from src.nlp.aproximado import IndiceAproximado, conjugacoes
+from src.nlp.motor import MotorExtracao, Varredura, VarreduraIncremental
 from src.nlp.validador import ValidadorDados
+from src.nlp.cache import CacheLRU, BackendResultados, criar_backend_resultados
+from src.nlp.vocabulario import VocabularioUsuario, MatchersUsuario
+from src.nlp.resultado import ResultadoNLP, Extracao
+from src.config import VOCABULARIO_CACHE_ITENS, NLP_CORRECAO_ASR
+from src import metricas
+
+# Normalização de números falados
+_NUMERO_MIL = re.compile(r'(\d+)\s*mil')
+_NUMERO_E = re.compile(r'(\d+)\s*e\s*(\d+)')
+
+# Unidades na ordem de prioridade da extração
+_PADROES_UNIDADE = (
+    ('kg', 'quantidade_kg'),
+    ('sacas', 'quantidade_sacas'),
+    ('litros', 'quantidade_litros'),
+    ('hectares', 'quantidade_hectares')
+)
+
+# Vocabulário básico do agronegócio
+VOCABULARIO_BASE = {
+    'culturas': ('soja', 'milho', 'algodão', 'feijão', 'café', 'cana', 'arroz', 'trigo'),
+    'atividades_plantio': ('plantar', 'plantei', 'semear', 'semeei'),
+    'atividades_colheita': ('colher', 'colhi', 'colhendo'),
+    'atividades_pulverizacao': ('pulverizar', 'pulverizei', 'aplicar', 'apliquei'),
+    'atividades_preparo': ('arar', 'arei', 'preparar', 'gradear'),
+    'unidades_medida': ('kg', 'sacas', 'litros', 'hectares', 'alqueires')
+}
+
+# Nomes no motor de extração, montados uma vez: (tipo, palavra do motor)
+_ATIVIDADES = tuple((tipo, f'atividade_{tipo}') for tipo in CLASSIFICACAO_ATIVIDADES)
+# (palavra do motor, cultura como é gravada)
+_CULTURAS = tuple((f'cultura_{cultura}', cultura.title()) for cultura in VOCABULARIO_BASE['culturas'])
+
+# Verbos conjugados normalizados para o infinitivo
+_INFINITIVOS = {
+    'plantei': 'plantar', 'colhi': 'colher',
+    'pulverizei': 'pulverizar', 'arei': 'arar',
+    'apliquei': 'aplicar', 'fertilizei': 'fertilizar'
+}
+
+# Mudança só no código da extração ou da validação (não nas tabelas
+# abaixo): incremente, para o cache de resultados não servir o antigo
+_REVISAO_CODIGO = 1
+
+
+def _forma_estavel(valor: Any) -> str:
+    """repr independente da ordem de dicts e conjuntos (e do PYTHONHASHSEED)"""
+    if isinstance(valor, dict):
+        pares = (f'{_forma_estavel(chave)}:{_forma_estavel(item)}' for chave, item in valor.items())
+        return '{' + ','.join(sorted(pares)) + '}'
+    if isinstance(valor, (set, frozenset)):
+        return '{' + ','.join(sorted(_forma_estavel(item) for item in valor)) + '}'
+    if isinstance(valor, (list, tuple)):
+        return '(' + ','.join(_forma_estavel(item) for item in valor) + ')'
+    if isinstance(valor, re.Pattern):
+        return f're({valor.pattern!r},{valor.flags})'
+    if isinstance(valor, regras.Regra):
+        return _forma_estavel(tuple(getattr(valor, nome) for nome in regras.Regra.__slots__))
+    return repr(valor)
+
+
+def _versao_extracao() -> str:
+    """
+    Hash das tabelas que decidem o resultado de uma fala: padrões,
+    vocabulário base, regras de validação e referências da correção
+    """
+    tabelas = (
+        _REVISAO_CODIGO,
+        PATTERNS_REGEX, PATTERNS_ALTERNATIVOS, ALCANCE_EM_TRECHOS, CLASSIFICACAO_ATIVIDADES,
+        VOCABULARIO_BASE, _PADROES_UNIDADE, _INFINITIVOS,
+        regras.REGRAS, regras.LIMITES_PADRAO, regras.CULTURAS_CONHECIDAS, regras.UNIDADES_VALIDAS,
+        regras.PESO_ERRO, regras.PESO_ALERTA,
+        PALAVRAS_DOS_PADROES, PALAVRAS_COMUNS, VERBOS_DAS_REFERENCIAS,
+        aproximado.CURTA, aproximado.LONGA, aproximado.MAXIMO,
+    )
+    return hashlib.sha1(_forma_estavel(tabelas).encode('utf-8')).hexdigest()[:12]
+
+
+# Entra na chave do cache de resultados: um cache compartilhado (Redis)
+# entre servidores com padrões diferentes não devolve a extração do outro
+VERSAO_EXTRACAO = _versao_extracao()
+
+# Métricas: poucas etapas, para manter o custo por fala em poucas observações
+# (o detalhe por extrator fica no benchmark, benchmarks/nlp_extracao.py)
+_TEMPO_ETAPA = metricas.histograma(
+    'agrovoz_nlp_etapa_segundos', 'Duração de cada etapa do NLP por fala',
+    ('etapa',), metricas.BUCKETS_NLP
+)
+_ETAPA_LIMPEZA = _TEMPO_ETAPA.rotulado('limpar_texto')
+# Varredura dos padrões e extratores de campos
+_ETAPA_EXTRACAO = _TEMPO_ETAPA.rotulado('extracao')
+# ValidadorDados e sugestões
+_ETAPA_VALIDACAO = _TEMPO_ETAPA.rotulado('validacao')
+_TEMPO_TOTAL = metricas.histograma(
+    'agrovoz_nlp_processamento_segundos', 'Duração de processar_texto por fala',
+    buckets=metricas.BUCKETS_NLP
+).rotulado()
+_CONSULTAS_CACHE = metricas.contador(
+    'agrovoz_nlp_cache_resultados_total', 'Consultas ao cache de resultados do NLP', ('resultado',)
+)
+_CACHE_ACERTO = _CONSULTAS_CACHE.rotulado('acerto')
+_CACHE_FALTA = _CONSULTAS_CACHE.rotulado('falta')
+_PALAVRAS_CORRIGIDAS = metricas.contador(
+    'agrovoz_nlp_palavras_corrigidas_total', 'Palavras mal transcritas trocadas pela de referência'
+).rotulado()
+
+# Contado aqui (e não lido do backend) porque o cache pode estar nos workers
+# do executor em processos, que devolvem o contador junto com cada lote
+metricas.observar_cache(
+    'nlp_resultados', lambda: {'acertos': _CACHE_ACERTO.valor, 'faltas': _CACHE_FALTA.valor}
+)
 
 class ProcessadorNLPRural:
     """Classe principal para processamento de linguagem natural rural"""
     
-    def __init__(self):
+    def __init__(self, cache_resultados: Optional[BackendResultados] = None):
         self.patterns = PATTERNS_REGEX
         self.validador = ValidadorDados()
-        self.vocabulario = self._carregar_vocabulario_base()
-    
-    def _carregar_vocabulario_base(self) -> Dict[str, List[str]]:
-        """Carrega vocabulário básico do agronegócio"""
-        return {
-            'culturas': ['soja', 'milho', 'algodão', 'feijão', 'café', 'cana', 'arroz', 'trigo'],
-            'atividades_plantio': ['plantar', 'plantei', 'semear', 'semeei'],
-            'atividades_colheita': ['colher', 'colhi', 'colhendo'],
-            'atividades_pulverizacao': ['pulverizar', 'pulverizei', 'aplicar', 'apliquei'],
-            'atividades_preparo': ['arar', 'arei', 'preparar', 'gradear'],
-            'unidades_medida': ['kg', 'sacas', 'litros', 'hectares', 'alqueires']
+        self.vocabulario = VOCABULARIO_BASE
+        self.motor = self._compilar_motor()
+        # Correção das palavras mal transcritas (None com NLP_CORRECAO_ASR desligado)
+        self.correcao = self._compilar_correcao() if NLP_CORRECAO_ASR else None
+        # Vocabulário de usuários já compilado, por versão do conteúdo
+        self._matchers_usuario = CacheLRU(VOCABULARIO_CACHE_ITENS)
+        # Resultados por texto normalizado (ver NLP_CACHE_RESULTADOS)
+        self.cache_resultados = cache_resultados or criar_backend_resultados()
+    
+    def _compilar_motor(self) -> MotorExtracao:
+        """Pré-compila padrões e vocabulário usados na extração"""
+        padroes = {
+            'pessoa_contratacao': self.patterns['pessoa_contratacao'],
+            'pessoa_geral': self.patterns['pessoa_geral'],
+            'atividade_verbo': self.patterns['atividade_verbo'],
+            'talhao': self.patterns['talhao'],
+            'valor_monetario': self.patterns['valor_monetario'],
+            'valor_contexto': PATTERNS_ALTERNATIVOS['valor_contexto'],
+            'valor_fallback': PATTERNS_ALTERNATIVOS['valor_fallback'],
         }
+        for _, nome in _PADROES_UNIDADE:
+            padroes[nome] = self.patterns[nome]
+        
+        palavras = {
+            nome: CLASSIFICACAO_ATIVIDADES[tipo] for tipo, nome in _ATIVIDADES
+        }
+        for cultura in self.vocabulario['culturas']:
+            palavras[f'cultura_{cultura}'] = [cultura]
+        
+        return MotorExtracao(padroes, palavras, ALCANCE_EM_TRECHOS)
     
-    def processar_texto(self, texto: str, usuario_id: str = None) -> Dict[str, Any]:
+    def _compilar_correcao(self) -> IndiceAproximado:
+        """Índice das palavras que a extração procura, para corrigir o texto transcrito"""
+        palavras = list(PALAVRAS_DOS_PADROES)
+        palavras += self.vocabulario['culturas']
+        for palavras_atividade in CLASSIFICACAO_ATIVIDADES.values():
+            palavras += palavras_atividade
+        protegidas = list(PALAVRAS_COMUNS)
+        for verbo in VERBOS_DAS_REFERENCIAS:
+            protegidas += conjugacoes(verbo)
+        return IndiceAproximado(palavras, protegidas)
+    
+    def _compilar_vocabulario(self, vocabulario: Optional[VocabularioUsuario]) -> Optional[MatchersUsuario]:
+        """Vocabulário do usuário compilado, reaproveitado enquanto a versão não mudar"""
+        if vocabulario is None or vocabulario.vazio:
+            return None
+        return self._matchers_usuario.obter_ou_criar(
+            vocabulario.versao, lambda: MatchersUsuario(vocabulario, self.correcao)
+        )
+    
+    def processar_texto(self, texto: str, usuario_id: str = None,
+                        vocabulario: VocabularioUsuario = None) -> ResultadoNLP:
         """
         Processa um texto e extrai informações estruturadas
         
         Args:
             texto: Texto falado pelo usuário
-            usuario_id: ID do usuário (para personalização futura)
+            usuario_id: ID do usuário
+            vocabulario: Vocabulário personalizado do usuário (funcionários,
+                culturas e talhões cadastrados em ConfiguracaoNLP)
             
         Returns:
-            Dict com dados extraídos e metadados
+            ResultadoNLP com dados extraídos, validação, confiança e sugestões
+        """
+        inicio = time.perf_counter()
+        if vocabulario is not None and vocabulario.vazio:
+            vocabulario = None
+        matchers = self._compilar_vocabulario(vocabulario)
+        texto_limpo = self._limpar_texto(texto, matchers)
+        _ETAPA_LIMPEZA.observar(time.perf_counter() - inicio)
+        
+        # Falas repetidas: extração e validação dependem só do texto
+        # normalizado e das versões da extração e do vocabulário
+        chave = f"{VERSAO_EXTRACAO}|{vocabulario.versao if vocabulario else ''}|{texto_limpo}"
+        extraido = self.cache_resultados.obter(chave) if self.cache_resultados is not None else None
+        if extraido is None:
+            extraido = self._extrair(texto_limpo, vocabulario, matchers)
+            if self.cache_resultados is not None:
+                _CACHE_FALTA.incrementar()
+                self.cache_resultados.guardar(chave, extraido)
+        else:
+            _CACHE_ACERTO.incrementar()
+        
+        # usuario_id, texto e data são da chamada, nunca do cache
+        resultado = ResultadoNLP(
+            usuario_id, texto, datetime.now(), extraido,
+            self._calcular_confianca(extraido[0], usuario_id)
+        )
+        _TEMPO_TOTAL.observar(time.perf_counter() - inicio)
+        return resultado
+    
+    def processar_parcial(self, varredura: VarreduraIncremental, texto: str,
+                          usuario_id: str = None,
+                          vocabulario: VocabularioUsuario = None) -> ResultadoNLP:
         """
-        texto_limpo = self._limpar_texto(texto)
+        processar_texto para uma transcrição que ainda está crescendo.
         
+        `varredura` (uma por fala, de motor.varredura_incremental()) guarda
+        o estado do texto anterior: só o trecho alterado é varrido de novo.
+        O resultado é o mesmo de processar_texto com o texto inteiro; não
+        usa o cache de resultados nem entra nas métricas por fala.
+        """
+        if vocabulario is not None and vocabulario.vazio:
+            vocabulario = None
+        matchers = self._compilar_vocabulario(vocabulario)
+        texto_limpo = self._limpar_texto(texto, matchers)
+        varredura.atualizar(texto_limpo)
+        campos = self._extrair_campos(texto_limpo, varredura, matchers)
+        extraido = self._validar(campos, texto_limpo, vocabulario)
+        return ResultadoNLP(
+            usuario_id, texto, datetime.now(), extraido,
+            self._calcular_confianca(extraido[0], usuario_id)
+        )
+
+    def processar_lote(self, itens: Sequence[Tuple[str, Optional[str], Optional[VocabularioUsuario]]]
+                       ) -> List[Tuple[bool, Any]]:
+        """
+        processar_texto de vários (texto, usuario_id, vocabulario) de uma vez.
+
+        Cada texto fora do cache é extraído sozinho; a validação de todos
+        eles é uma chamada só a ValidadorDados.validar_lote. Erros ficam
+        isolados por item: (True, ResultadoNLP) ou (False, mensagem).
+        """
+        relogio = time.perf_counter
+        saidas: List[Optional[Tuple[bool, Any]]] = [None] * len(itens)
+        extraidos: List[Optional[Extracao]] = [None] * len(itens)
+        tempos = [0.0] * len(itens)
+        # Itens a validar: (índice, chave do cache, texto limpo, vocabulário, campos)
+        pendentes = []
+        for indice, (texto, usuario_id, vocabulario) in enumerate(itens):
+            inicio = relogio()
+            try:
+                if vocabulario is not None and vocabulario.vazio:
+                    vocabulario = None
+                matchers = self._compilar_vocabulario(vocabulario)
+                texto_limpo = self._limpar_texto(texto, matchers)
+                marca = relogio()
+                _ETAPA_LIMPEZA.observar(marca - inicio)
+                chave = f"{VERSAO_EXTRACAO}|{vocabulario.versao if vocabulario else ''}|{texto_limpo}"
+                extraido = self.cache_resultados.obter(chave) if self.cache_resultados is not None else None
+                if extraido is not None:
+                    _CACHE_ACERTO.incrementar()
+                    extraidos[indice] = extraido
+                else:
+                    varredura = self.motor.varrer(texto_limpo)
+                    campos = self._extrair_campos(texto_limpo, varredura, matchers)
+                    _ETAPA_EXTRACAO.observar(relogio() - marca)
+                    pendentes.append((indice, chave, texto_limpo, vocabulario, campos))
+            except Exception as e:
+                saidas[indice] = (False, str(e))
+            tempos[indice] = relogio() - inicio
+
+        if pendentes:
+            inicio = relogio()
+            try:
+                validacoes = self.validador.validar_lote(
+                    [campos for *_, campos in pendentes],
+                    [vocabulario for _, _, _, vocabulario, _ in pendentes]
+                )
+            except Exception:
+                # Um registro que quebra o lote: cada um validado sozinho, com o erro no item
+                validacoes = None
+            for posicao, (indice, chave, texto_limpo, vocabulario, campos) in enumerate(pendentes):
+                try:
+                    if validacoes is None:
+                        extraido = self._validar(campos, texto_limpo, vocabulario)
+                    else:
+                        # validar_lote já devolve as listas como tuplas
+                        extraido = (
+                            tuple(campos.values()), validacoes[posicao],
+                            tuple(self._gerar_sugestoes(campos, texto_limpo))
+                        )
+                except Exception as e:
+                    saidas[indice] = (False, str(e))
+                    continue
+                extraidos[indice] = extraido
+                if self.cache_resultados is not None:
+                    _CACHE_FALTA.incrementar()
+                    self.cache_resultados.guardar(chave, extraido)
+            # Tempo da validação dividido entre os itens do lote
+            parcela = (relogio() - inicio) / len(pendentes)
+            for indice, *_ in pendentes:
+                _ETAPA_VALIDACAO.observar(parcela)
+                tempos[indice] += parcela
+
+        agora = datetime.now()
+        for indice, (texto, usuario_id, _) in enumerate(itens):
+            if saidas[indice] is not None:
+                continue
+            inicio = relogio()
+            try:
+                extraido = extraidos[indice]
+                saidas[indice] = (True, ResultadoNLP(
+                    usuario_id, texto, agora, extraido,
+                    self._calcular_confianca(extraido[0], usuario_id)
+                ))
+            except Exception as e:
+                saidas[indice] = (False, str(e))
+                continue
+            _TEMPO_TOTAL.observar(tempos[indice] + relogio() - inicio)
+        return saidas
+
+    def _extrair(self, texto_limpo: str, vocabulario: Optional[VocabularioUsuario],
+                 matchers: Optional[MatchersUsuario]) -> Extracao:
+        """Extrai e valida os campos de um texto já normalizado"""
+        relogio = time.perf_counter
+        inicio = relogio()
+        
+        # Padrões pré-compilados compartilhados por todos os extratores
+        varredura = self.motor.varrer(texto_limpo)
+        campos = self._extrair_campos(texto_limpo, varredura, matchers)
+        marca = relogio()
+        _ETAPA_EXTRACAO.observar(marca - inicio)
+        
+        extraido = self._validar(campos, texto_limpo, vocabulario)
+        _ETAPA_VALIDACAO.observar(relogio() - marca)
+        return extraido
+    
+    def _extrair_campos(self, texto_limpo: str, varredura: Union[Varredura, VarreduraIncremental],
+                        matchers: Optional[MatchersUsuario]) -> Dict[str, Any]:
+        """Campos de CAMPOS_EXTRAIDOS, com a varredura (inteira ou incremental) do texto"""
         # Extrair informações básicas
-        dados_extraidos = {
-            'usuario_id': usuario_id,
-            'descricao_original': texto,
-            'tipo_atividade': self._classificar_atividade(texto_limpo),
-            'pessoa_envolvida': self._extrair_pessoa(texto_limpo),
-            'servico_realizado': self._extrair_servico(texto_limpo),
-            'cultura': self._extrair_cultura(texto_limpo),
-            'talhao': self._extrair_talhao(texto_limpo),
-            'valor_monetario': self._extrair_valor(texto_limpo),
-            'data_registro': datetime.now()
+        campos = {
+            'tipo_atividade': self._classificar_atividade(texto_limpo, varredura),
+            'pessoa_envolvida': self._extrair_pessoa(texto_limpo, varredura, matchers),
+            'servico_realizado': self._extrair_servico(texto_limpo, varredura),
+            'cultura': self._extrair_cultura(texto_limpo, varredura, matchers),
+            'talhao': self._extrair_talhao(texto_limpo, varredura, matchers),
+            'valor_monetario': self._extrair_valor(texto_limpo, varredura),
         }
         
         # Extrair quantidade e unidade
-        quantidade, unidade = self._extrair_quantidade_unidade(texto_limpo)
-        dados_extraidos['quantidade'] = quantidade
-        dados_extraidos['unidade_medida'] = unidade
-        
-        # Validar dados extraídos
-        validacao = self.validador.validar_dados(dados_extraidos)
-        
-        return {
-            'dados': dados_extraidos,
-            'validacao': validacao,
-            'confianca': self._calcular_confianca(dados_extraidos),
-            'sugestoes': self._gerar_sugestoes(dados_extraidos, texto_limpo)
-        }
+        quantidade, unidade = self._extrair_quantidade_unidade(texto_limpo, varredura)
+        campos['quantidade'] = quantidade
+        campos['unidade_medida'] = unidade
+        return campos
+    
+    def _validar(self, campos: Dict[str, Any], texto_limpo: str,
+                 vocabulario: Optional[VocabularioUsuario]) -> Extracao:
+        """Validação e sugestões dos campos extraídos, no formato Extracao"""
+        validacao = self.validador.validar_dados(campos, vocabulario)
+        sugestoes = self._gerar_sugestoes(campos, texto_limpo)
+        
+        # Listas da validação congeladas: o resultado é compartilhado pelos acertos do cache
+        for chave, valor in validacao.items():
+            if isinstance(valor, list):
+                validacao[chave] = tuple(valor)
+        return tuple(campos.values()), validacao, tuple(sugestoes)
+    
+    def estatisticas_cache(self) -> Optional[Dict[str, Any]]:
+        """Acertos/faltas do cache de resultados (None se desligado)"""
+        return self.cache_resultados.estatisticas() if self.cache_resultados is not None else None
     
-    def _limpar_texto(self, texto: str) -> str:
+    def _limpar_texto(self, texto: str, matchers: Optional[MatchersUsuario] = None) -> str:
         """Limpa e normaliza o texto"""
         # Converter para minúsculas
         texto = texto.lower().strip()
         
-        # Remover acentos desnecessários para matching
-        
         # Normalizar números
-        texto = re.sub(r'(\d+)\s*mil', r'\1000', texto)
-        texto = re.sub(r'(\d+)\s*e\s*(\d+)', r'\1.\2', texto)
+        texto = _NUMERO_MIL.sub(r'\1000', texto)
+        texto = _NUMERO_E.sub(r'\1.\2', texto)
+        
+        # Palavras mal transcritas (sem acento, letra trocada) pela grafia que
+        # a extração procura, com os nomes e culturas do usuário
+        correcao = matchers.correcao if matchers is not None else self.correcao
+        if correcao is not None:
+            texto, trocas = correcao.corrigir(texto)
+            if trocas:
+                _PALAVRAS_CORRIGIDAS.incrementar(trocas)
         
         return texto
     
-    def _classificar_atividade(self, texto: str) -> str:
+    def _classificar_atividade(self, texto: str, varredura: Varredura = None) -> str:
         """Classifica o tipo principal da atividade"""
-        classificacoes = {
-            'contratacao': ['contratei', 'chamei', 'paguei', 'contrato'],
-            'compra_insumo': ['comprei', 'adquiri', 'compra'],
-            'venda': ['vendi', 'entreguei', 'comercializei'],
-            'plantio': ['plantei', 'plantar', 'semeei', 'semear'],
-            'colheita': ['colhi', 'colher', 'colhendo'],
-            'pulverizacao': ['pulverizei', 'apliquei', 'pulverizar'],
-            'preparo_solo': ['arei', 'arar', 'preparei', 'gradear']
-        }
+        varredura = varredura or self.motor.varrer(texto)
         
-        for tipo, palavras in classificacoes.items():
-            if any(palavra in texto for palavra in palavras):
+        for tipo, nome in _ATIVIDADES:
+            if varredura.contem(nome):
                 return tipo
         
         return 'atividade_geral'
     
-    def _extrair_pessoa(self, texto: str) -> Optional[str]:
+    def _extrair_pessoa(self, texto: str, varredura: Varredura = None,
+                        matchers: MatchersUsuario = None) -> Optional[str]:
         """Extrai nome de pessoa"""
-        match = re.search(self.patterns['pessoa_contratacao'], texto)
-        if match:
-            nome = match.group(1).strip().title()
-            return nome
+        varredura = varredura or self.motor.varrer(texto)
+        
+        # Funcionários cadastrados pelo usuário têm prioridade
+        if matchers is not None:
+            nome = matchers.extrair_pessoa(varredura)
+            if nome:
+                return nome
+        
+        nome = varredura.primeiro('pessoa_contratacao')
+        if nome:
+            return nome.strip().title()
         
         # Padrão alternativo
-        match = re.search(self.patterns['pessoa_geral'], texto)
-        if match:
-            return match.group(1).strip().title()
+        nome = varredura.primeiro('pessoa_geral')
+        if nome:
+            return nome.strip().title()
         
         return None
     
-    def _extrair_servico(self, texto: str) -> Optional[str]:
+    def _extrair_servico(self, texto: str, varredura: Varredura = None) -> Optional[str]:
         """Extrai tipo de serviço/atividade"""
-        match = re.search(self.patterns['atividade_verbo'], texto)
-        if match:
-            atividade = match.group(1)
+        varredura = varredura or self.motor.varrer(texto)
+        
+        atividade = varredura.primeiro('atividade_verbo')
+        if atividade:
             # Normalizar para infinitivo
-            normalizacao = {
-                'plantei': 'plantar', 'colhi': 'colher', 
-                'pulverizei': 'pulverizar', 'arei': 'arar',
-                'apliquei': 'aplicar', 'fertilizei': 'fertilizar'
-            }
-            return normalizacao.get(atividade, atividade)
+            return _INFINITIVOS.get(atividade, atividade)
         return None
     
-    def _extrair_cultura(self, texto: str) -> Optional[str]:
+    def _extrair_cultura(self, texto: str, varredura: Varredura = None,
+                         matchers: MatchersUsuario = None) -> Optional[str]:
         """Extrai tipo de cultura"""
-        for cultura in self.vocabulario['culturas']:
-            if cultura in texto:
-                return cultura.title()
+        varredura = varredura or self.motor.varrer(texto)
+        
+        for nome, cultura in _CULTURAS:
+            if varredura.contem(nome):
+                return cultura
+        
+        # Culturas cadastradas pelo usuário fora do vocabulário base
+        if matchers is not None:
+            return matchers.extrair_cultura(varredura)
         return None
     
-    def _extrair_talhao(self, texto: str) -> Optional[int]:
+    def _extrair_talhao(self, texto: str, varredura: Varredura = None,
+                        matchers: MatchersUsuario = None) -> Optional[int]:
         """Extrai número do talhão"""
-        match = re.search(self.patterns['talhao'], texto)
-        if match:
-            return int(match.group(1))
+        varredura = varredura or self.motor.varrer(texto)
+        
+        # Com talhões cadastrados, preferir o primeiro número que existe na propriedade
+        if matchers is not None and matchers.talhoes:
+            talhao = matchers.escolher_talhao(varredura.todos('talhao'))
+            if talhao is not None:
+                return talhao
+        
+        numero = varredura.primeiro('talhao')
+        if numero:
+            return int(numero)
         return None
     
-    def _extrair_valor(self, texto: str) -> Optional[float]:
+    def _extrair_valor(self, texto: str, varredura: Varredura = None) -> Optional[float]:
         """Extrai valores monetários com contexto específico"""
+        varredura = varredura or self.motor.varrer(texto)
         
-        # Primeiro tentar padrão com "reais"
-        match = re.search(self.patterns['valor_monetario'], texto)
-        if match:
-            valor_str = match.group(1).replace('.', '').replace(',', '.')
-            try:
-                return float(valor_str)
-            except ValueError:
-                pass
-        
-        # Segundo tentar padrão por contexto 
-        match = re.search(self.patterns['valor_contexto'], texto)
-        if match:
-            valor_str = match.group(1).replace('.', '').replace(',', '.')
-            try:
-                return float(valor_str)
-            except ValueError:
-                pass
+        # Primeiro tentar padrão com "reais", depois por contexto
+        for nome in ('valor_monetario', 'valor_contexto'):
+            valor_str = varredura.primeiro(nome)
+            if valor_str:
+                try:
+                    return float(valor_str.replace('.', '').replace(',', '.'))
+                except ValueError:
+                    pass
         
         # Fallback: buscar números grandes (> 100) após palavras de contexto
-        fallback_pattern = r'(?:por|custou|gastei|paguei)\s+.*?(\d{3,})'
-        match = re.search(fallback_pattern, texto)
-        if match:
+        valor_str = varredura.primeiro('valor_fallback')
+        if valor_str:
             try:
-                return float(match.group(1))
+                return float(valor_str)
             except ValueError:
                 pass
         
         return None
-
     
-    def _extrair_quantidade_unidade(self, texto: str) -> Tuple[Optional[float], Optional[str]]:
+    def _extrair_quantidade_unidade(self, texto: str, varredura: Varredura = None) -> Tuple[Optional[float], Optional[str]]:
         """Extrai quantidade e unidade de medida"""
-        # Procurar padrões específicos
-        padroes_unidade = {
-            'kg': self.patterns['quantidade_kg'],
-            'sacas': self.patterns['quantidade_sacas'],
-            'litros': self.patterns['quantidade_litros'],
-            'hectares': self.patterns['quantidade_hectares']
-        }
+        varredura = varredura or self.motor.varrer(texto)
         
-        for unidade, padrao in padroes_unidade.items():
-            match = re.search(padrao, texto)
-            if match:
+        # Procurar padrões específicos
+        for unidade, nome in _PADROES_UNIDADE:
+            quantidade_str = varredura.primeiro(nome)
+            if quantidade_str:
                 try:
-                    quantidade = float(match.group(1).replace(',', '.'))
+                    quantidade = float(quantidade_str.replace(',', '.'))
                     return quantidade, unidade
                 except ValueError:
                     continue
         
         return None, None
     
-    def _calcular_confianca(self, dados: Dict[str, Any]) -> float:
-        """Calcula nível de confiança na extração"""
-        campos_preenchidos = sum(1 for v in dados.values() if v is not None)
-        total_campos = len(dados)
+    def _calcular_confianca(self, campos: Sequence[Any], usuario_id: Optional[str] = None) -> float:
+        """
+        Calcula nível de confiança na extração
+        
+        `campos` na ordem de CAMPOS_EXTRAIDOS; conta também os campos da
+        chamada (descricao_original e data_registro, sempre preenchidos, e
+        usuario_id)
+        """
+        campos_preenchidos = 2 + (usuario_id is not None) + sum(1 for v in campos if v is not None)
+        total_campos = len(campos) + 3
         
         confianca_base = campos_preenchidos / total_campos
         
         # Ajustar baseado em campos críticos
-        if dados.get('valor_monetario'):
+        _, pessoa, _, _, talhao, valor = campos[:6]
+        if valor:
             confianca_base += 0.1
-        if dados.get('pessoa_envolvida'):
+        if pessoa:
             confianca_base += 0.1
-        if dados.get('talhao'):
+        if talhao:
             confianca_base += 0.05
             
         return min(confianca_base, 1.0)
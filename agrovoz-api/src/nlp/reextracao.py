@@ -0,0 +1,258 @@
+"""
+Reextração em massa dos registros já gravados.
+
+Depois de mudar os padrões ou o vocabulário do NLP, reprocessa a
+descricao_original dos registros e grava só os campos que mudaram.
+Registros confirmados ou corrigidos pelo usuário (na revisão) nunca são
+alterados.
+
+Os registros são lidos em lotes por id, até o maior id existente no
+início da execução (o que chega depois já foi extraído pelo código novo).
+Os textos distintos de cada lote vão para o pool de processos do NLP, e
+as alterações são gravadas com um UPDATE em massa por chave primária,
+junto com a correção de estatisticas_diarias, na mesma transação. Depois
+de cada lote o progresso vai para o arquivo de checkpoint: rodar de novo
+com o mesmo arquivo continua de onde parou.
+
+    python -m src.nlp.reextracao --checkpoint reextracao.json
+    python -m src.nlp.reextracao --usuario ID --simular
+    python -m src.nlp.reextracao --workers 8 --lote 2000 --checkpoint reextracao.json
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from src.config import NLP_CACHE_ITENS, NLP_LOTE_MAX_LATENCIA_MS, NLP_WORKERS
+from src.database.models import RegistroRural
+from src.nlp.cache import BackendMemoria
+from src.nlp.executor import ExecutorLocal, ExecutorProcessos
+from src.nlp.processador import ProcessadorNLPRural
+from src.nlp.resultado import CAMPOS_EXTRAIDOS, CONFIANCA_MINIMA, ResultadoNLP
+from src.nlp.vocabulario import VocabularioUsuario, carregar_vocabulario
+
+# Colunas que a reextração pode reescrever
+COLUNAS_REEXTRAIDAS = CAMPOS_EXTRAIDOS + ('precisa_revisao',)
+
+# Textos por tarefa enviada a um worker
+_ITENS_POR_TAREFA = 256
+
+# Registros que a reextração pode alterar: nem confirmados nem corrigidos
+# pelo usuário (as colunas são nulas nos registros antigos)
+_ABERTOS = (RegistroRural.confirmado.isnot(True), RegistroRural.editado_manualmente.isnot(True))
+
+# Colunas lidas de cada registro: as reescritas e as que entram nos agregados
+_COLUNAS_REGISTRO = (
+    RegistroRural.id, RegistroRural.usuario_id, RegistroRural.data_registro,
+    RegistroRural.confirmado,
+    *(getattr(RegistroRural, coluna) for coluna in COLUNAS_REEXTRAIDAS)
+)
+
+
+def _novos_valores(resultado: ResultadoNLP) -> Dict[str, Any]:
+    valores = {campo: getattr(resultado, campo) for campo in CAMPOS_EXTRAIDOS}
+    valores['precisa_revisao'] = resultado.confianca < CONFIANCA_MINIMA
+    return valores
+
+
+def _diferencas(linha, valores: Dict[str, Any]) -> Dict[str, Any]:
+    """Colunas cujo valor gravado difere do extraído agora"""
+    return {
+        coluna: valor for coluna, valor in valores.items()
+        if linha._mapping[coluna] != valor
+    }
+
+
+def gravar_alteracoes(db: Session, valores_por_id: Dict[int, Dict[str, Any]]) -> int:
+    """
+    Grava os valores reextraídos nos registros ainda não confirmados nem
+    corrigidos e ajusta os agregados, com commit. Os registros são relidos
+    com lock: uma revisão feita depois da leitura do lote vence a reextração.
+
+    Returns:
+        Quantidade de registros alterados
+    """
+    from src.database.connection import DatabaseService
+
+    try:
+        _, alterados = DatabaseService(db).alterar_registros(
+            valores_por_id, *_ABERTOS
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return alterados
+
+
+def _ler_checkpoint(arquivo: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not arquivo or not os.path.exists(arquivo):
+        return None
+    with open(arquivo, encoding='utf-8') as entrada:
+        return json.load(entrada)
+
+
+def _salvar_checkpoint(arquivo: str, progresso: Dict[str, Any]):
+    # Escrita atômica: uma interrupção no meio não corrompe o checkpoint
+    temporario = f"{arquivo}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as saida:
+        json.dump(progresso, saida, indent=2)
+    os.replace(temporario, arquivo)
+
+
+def reextrair(fabrica_sessao: Callable[[], Session], executor, lote: int = 1000,
+              usuario_id: Optional[str] = None, arquivo_checkpoint: Optional[str] = None,
+              simular: bool = False, intervalo_relatorio: float = 10.0) -> Dict[str, Any]:
+    """
+    Reextrai os registros não confirmados nem corrigidos (de todos os usuários ou de um)
+    com o executor de NLP já iniciado.
+
+    Com `simular`, só conta os registros que mudariam, sem gravar nada
+    (nem o checkpoint).
+
+    Returns:
+        Progresso final: último id, registros lidos, textos extraídos,
+        registros alterados, erros de extração e duração
+    """
+    progresso = _ler_checkpoint(arquivo_checkpoint)
+    if progresso is not None:
+        if progresso['usuario_id'] != usuario_id:
+            raise ValueError(
+                f"Checkpoint {arquivo_checkpoint} é de outra execução "
+                f"(usuario_id={progresso['usuario_id']!r})"
+            )
+        print(f"Continuando do checkpoint: último id {progresso['ultimo_id']}")
+    else:
+        with fabrica_sessao() as db:
+            id_maximo = db.scalar(select(func.max(RegistroRural.id))) or 0
+        progresso = {
+            'usuario_id': usuario_id, 'id_maximo': id_maximo, 'ultimo_id': 0,
+            'lidos': 0, 'extraidos': 0, 'alterados': 0, 'erros': 0, 'segundos': 0.0,
+            'iniciado_em': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    filtros = [RegistroRural.id <= progresso['id_maximo'], *_ABERTOS]
+    if usuario_id:
+        filtros.append(RegistroRural.usuario_id == usuario_id)
+
+    # Vocabulário de cada usuário, lido uma vez por execução
+    vocabularios: Dict[str, VocabularioUsuario] = {}
+    inicio = time.perf_counter()
+    segundos_anteriores = progresso['segundos']
+    lidos_nesta_execucao = 0
+    proximo_relatorio = inicio + intervalo_relatorio
+
+    while True:
+        with fabrica_sessao() as db:
+            linhas = db.execute(
+                select(*_COLUNAS_REGISTRO, RegistroRural.descricao_original)
+                .where(RegistroRural.id > progresso['ultimo_id'], *filtros)
+                .order_by(RegistroRural.id)
+                .limit(lote)
+            ).all()
+            for linha in linhas:
+                if linha.usuario_id not in vocabularios:
+                    vocabularios[linha.usuario_id] = carregar_vocabulario(db, linha.usuario_id)
+        if not linhas:
+            break
+
+        # Falas repetidas (mesmo texto e vocabulário) são extraídas uma vez
+        # por lote; o usuario_id só pesa na confiança por estar presente
+        posicoes: Dict[Tuple[str, str], int] = {}
+        posicao_linha = []
+        fila = []
+        for linha in linhas:
+            vocabulario = vocabularios[linha.usuario_id]
+            chave = (linha.descricao_original, vocabulario.versao)
+            if chave not in posicoes:
+                posicoes[chave] = len(fila)
+                fila.append((linha.descricao_original, linha.usuario_id, vocabulario))
+            posicao_linha.append(posicoes[chave])
+        resultados = executor.processar_lote(fila)
+
+        valores_por_id: Dict[int, Dict[str, Any]] = {}
+        for linha, posicao in zip(linhas, posicao_linha):
+            sucesso, resultado = resultados[posicao]
+            if not sucesso:
+                progresso['erros'] += 1
+                continue
+            valores = _novos_valores(resultado)
+            if _diferencas(linha, valores):
+                valores_por_id[linha.id] = valores
+
+        if simular:
+            alterados = len(valores_por_id)
+        elif valores_por_id:
+            with fabrica_sessao() as db:
+                alterados = gravar_alteracoes(db, valores_por_id)
+        else:
+            alterados = 0
+
+        agora = time.perf_counter()
+        lidos_nesta_execucao += len(linhas)
+        progresso['ultimo_id'] = linhas[-1].id
+        progresso['lidos'] += len(linhas)
+        progresso['extraidos'] += len(fila)
+        progresso['alterados'] += alterados
+        progresso['segundos'] = round(segundos_anteriores + agora - inicio, 3)
+        if arquivo_checkpoint and not simular:
+            _salvar_checkpoint(arquivo_checkpoint, progresso)
+
+        if agora >= proximo_relatorio:
+            proximo_relatorio = agora + intervalo_relatorio
+            print(
+                f"id {progresso['ultimo_id']}/{progresso['id_maximo']}: "
+                f"{progresso['lidos']} lidos, {progresso['alterados']} alterados, "
+                f"{lidos_nesta_execucao / (agora - inicio):.0f} registros/s"
+            )
+
+    return progresso
+
+
+def _criar_executor(workers: int):
+    """Pool de processos com cache privado: os textos antigos não ocupam o cache compartilhado"""
+    if workers > 1:
+        return ExecutorProcessos(workers, NLP_LOTE_MAX_LATENCIA_MS, _ITENS_POR_TAREFA,
+                                 cache_privado=True)
+    return ExecutorLocal(ProcessadorNLPRural(BackendMemoria(NLP_CACHE_ITENS)))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Reextração dos registros com o NLP atual")
+    parser.add_argument('--usuario', help="Reextrair só este usuário")
+    parser.add_argument('--lote', type=int, default=1000,
+                        help="Registros lidos e gravados por transação")
+    parser.add_argument('--workers', type=int, default=NLP_WORKERS,
+                        help="Processos de NLP (1 extrai no próprio processo)")
+    parser.add_argument('--checkpoint', help="Arquivo de progresso; se existir, continua dele")
+    parser.add_argument('--simular', action='store_true',
+                        help="Só conta os registros que mudariam, sem gravar")
+    args = parser.parse_args(argv)
+
+    from src.database.connection import SessionLocal, verificar_esquema
+
+    verificar_esquema()
+    executor = _criar_executor(args.workers)
+    executor.iniciar()
+    try:
+        progresso = reextrair(SessionLocal, executor, args.lote, args.usuario,
+                              args.checkpoint, args.simular)
+    finally:
+        executor.encerrar()
+
+    taxa = progresso['lidos'] / progresso['segundos'] if progresso['segundos'] else 0.0
+    verbo = "mudariam" if args.simular else "alterados"
+    print(
+        f"{progresso['lidos']} registros lidos ({progresso['extraidos']} textos distintos "
+        f"extraídos), {progresso['alterados']} {verbo}, {progresso['erros']} erros, "
+        f"em {progresso['segundos']:.1f}s ({taxa:.0f} registros/s)"
+    )
+
+
+if __name__ == '__main__':
+    main()
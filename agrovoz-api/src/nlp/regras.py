@@ -0,0 +1,293 @@
+"""
+Regras de validação dos dados extraídos, declaradas como tabela (REGRAS).
+
+Cada regra diz o que um campo precisa cumprir; quando não cumpre, a
+mensagem vai para os erros, alertas ou sugestões da validação. Os
+limites numéricos (LIMITES_PADRAO) e os conjuntos de referência
+(culturas, unidades, talhões) são parâmetros: compilar() monta as
+verificações com os valores de cada usuário (limites_validacao,
+culturas e talhões cadastrados em ConfiguracaoNLP), uma vez por versão
+do vocabulário.
+"""
+import operator
+import re
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from src.nlp.vocabulario import VocabularioUsuario
+
+CULTURAS_CONHECIDAS = (
+    'soja', 'milho', 'algodão', 'feijão', 'café', 'cana',
+    'arroz', 'trigo', 'sorgo', 'girassol'
+)
+
+UNIDADES_VALIDAS = frozenset((
+    'kg', 'sacas', 'litros', 'hectares', 'alqueires', 'unidades'
+))
+
+# Limites das regras; cada usuário pode trocar qualquer um (limites_validacao)
+LIMITES_PADRAO: Dict[str, float] = {
+    'nome_minimo': 2,            # caracteres
+    'nome_maximo': 50,
+    'valor_minimo': 10,          # R$
+    'valor_maximo': 100000,
+    'talhao_maximo': 200,        # com talhões cadastrados, o maior deles
+    'hectares_maximo': 10000,
+    'kg_maximo': 50000,
+    'sacas_maximo': 1000,
+}
+
+# Peso de cada erro e alerta na confiança da validação (que parte de 1.0)
+PESO_ERRO = 0.3
+PESO_ALERTA = 0.1
+
+# Condições para a regra valer: campo preenchido (valor verdadeiro) ou
+# definido (diferente de None); um frozenset exige um dos valores
+PRESENTE = 'presente'
+DEFINIDO = 'definido'
+
+_NOME_VALIDO = re.compile(r'^[A-Za-zÀ-ÿ\s]+$')
+_SUGESTAO_CULTURAS = f"Culturas comuns: {', '.join(CULTURAS_CONHECIDAS)}"
+_TIPOS_COM_VALOR = frozenset(('compra_insumo', 'venda'))
+
+# Posição em (erros, alertas, sugestoes) da mensagem de cada nível
+_NIVEIS = {'erro': 0, 'alerta': 1, 'sugestao': 2}
+
+
+class Regra:
+    """
+    Uma linha da tabela: `campo` precisa cumprir `teste` (com o limite ou
+    conjunto `parametro`) sempre que as condições `quando` valem (por
+    padrão, o campo definido). Das regras de um mesmo `grupo`, só a
+    primeira que falha gera mensagem (o elif das validações).
+    """
+    __slots__ = ('campo', 'teste', 'parametro', 'nivel', 'mensagem', 'quando', 'grupo', 'sugestao')
+
+    def __init__(self, campo: str, teste: str, parametro: Optional[str], nivel: str, mensagem: str,
+                 quando: Optional[Tuple[Tuple[str, Any], ...]] = None, grupo: Optional[str] = None,
+                 sugestao: Optional[str] = None):
+        self.campo = campo
+        self.teste = teste
+        self.parametro = parametro
+        self.nivel = nivel
+        self.mensagem = mensagem
+        self.quando = quando if quando is not None else ((campo, DEFINIDO),)
+        self.grupo = grupo
+        self.sugestao = sugestao
+
+
+# Em ordem: é a ordem das mensagens em cada lista da validação
+REGRAS: Tuple[Regra, ...] = (
+    # Pessoa
+    Regra('pessoa_envolvida', 'padrao', 'nome', 'alerta',
+          "Nome '{valor}' contém caracteres suspeitos", quando=(('pessoa_envolvida', PRESENTE),)),
+    Regra('pessoa_envolvida', 'tamanho_minimo', 'nome_minimo', 'alerta',
+          "Nome muito curto", quando=(('pessoa_envolvida', PRESENTE),), grupo='nome'),
+    Regra('pessoa_envolvida', 'tamanho_maximo', 'nome_maximo', 'alerta',
+          "Nome muito longo", quando=(('pessoa_envolvida', PRESENTE),), grupo='nome'),
+    # Valor
+    Regra('valor_monetario', 'positivo', None, 'erro',
+          "Valor monetário deve ser positivo", grupo='valor'),
+    Regra('valor_monetario', 'maximo', 'valor_maximo', 'alerta',
+          "Valor R$ {valor:,.2f} é muito alto - confirme", grupo='valor'),
+    Regra('valor_monetario', 'minimo', 'valor_minimo', 'alerta',
+          "Valor R$ {valor:.2f} é muito baixo - confirme", grupo='valor'),
+    # Cultura
+    Regra('cultura', 'em_minusculas', 'culturas', 'alerta',
+          "Cultura '{valor}' não é comumente conhecida", quando=(('cultura', PRESENTE),),
+          sugestao=_SUGESTAO_CULTURAS),
+    # Talhão
+    Regra('talhao', 'positivo', None, 'erro',
+          "Número do talhão deve ser positivo", grupo='talhao'),
+    Regra('talhao', 'em', 'talhoes', 'alerta',
+          "Talhão {valor} não está cadastrado na propriedade", grupo='talhao'),
+    Regra('talhao', 'maximo', 'talhao_maximo', 'alerta',
+          "Talhão {valor} é um número muito alto", grupo='talhao'),
+    # Quantidade e unidade
+    Regra('quantidade', 'positivo', None, 'erro', "Quantidade deve ser positiva"),
+    Regra('unidade_medida', 'em', 'unidades', 'alerta',
+          "Unidade '{valor}' não é reconhecida", quando=(('quantidade', DEFINIDO),)),
+    Regra('quantidade', 'maximo', 'hectares_maximo', 'alerta', "Área muito grande - confirme",
+          quando=(('quantidade', DEFINIDO), ('unidade_medida', frozenset(('hectares',))))),
+    Regra('quantidade', 'maximo', 'kg_maximo', 'alerta', "Peso muito alto - confirme",
+          quando=(('quantidade', DEFINIDO), ('unidade_medida', frozenset(('kg',))))),
+    Regra('quantidade', 'maximo', 'sacas_maximo', 'alerta', "Muitas sacas - confirme",
+          quando=(('quantidade', DEFINIDO), ('unidade_medida', frozenset(('sacas',))))),
+    # Consistência entre campos
+    Regra('pessoa_envolvida', 'preenchido', None, 'sugestao',
+          "Para contratação, especifique o nome da pessoa",
+          quando=(('tipo_atividade', frozenset(('contratacao',))),)),
+    Regra('talhao', 'preenchido', None, 'sugestao',
+          "Considere especificar o talhão para a cultura", quando=(('cultura', PRESENTE),)),
+    Regra('valor_monetario', 'preenchido', None, 'sugestao',
+          "Para compra/venda, o valor é importante", quando=(('tipo_atividade', _TIPOS_COM_VALOR),)),
+)
+
+
+# Teste -> falha(valor, parâmetro): se o valor não cumpre a regra
+_FALHAS: Dict[str, Callable[[Any, Any], bool]] = {
+    'positivo': lambda valor, _: valor <= 0,
+    'minimo': operator.lt,
+    'maximo': operator.gt,
+    'tamanho_minimo': lambda valor, limite: len(valor) < limite,
+    'tamanho_maximo': lambda valor, limite: len(valor) > limite,
+    'padrao': lambda valor, padrao: not padrao.match(valor),
+    'em': lambda valor, conjunto: valor not in conjunto,
+    'em_minusculas': lambda valor, conjunto: valor.lower() not in conjunto,
+    'preenchido': lambda valor, _: not valor,
+}
+
+
+def parametros_do_usuario(vocabulario: Optional['VocabularioUsuario']) -> Dict[str, Any]:
+    """
+    Limites e conjuntos das regras para um usuário: os padrão, trocados
+    pelos limites_validacao dele; culturas cadastradas somam às
+    conhecidas e talhões cadastrados substituem o limite de talhões
+    """
+    parametros: Dict[str, Any] = dict(LIMITES_PADRAO)
+    parametros['nome'] = _NOME_VALIDO
+    parametros['culturas'] = frozenset(CULTURAS_CONHECIDAS)
+    parametros['unidades'] = UNIDADES_VALIDAS
+    parametros['talhoes'] = None
+    if vocabulario is None:
+        return parametros
+
+    parametros.update(vocabulario.limites)
+    if vocabulario.culturas:
+        parametros['culturas'] = parametros['culturas'] | frozenset(vocabulario.culturas)
+    if vocabulario.talhoes:
+        parametros['talhoes'] = frozenset(vocabulario.talhoes)
+        # Um talhão cadastrado nunca é "alto demais"; os outros já falham na regra anterior
+        parametros['talhao_maximo'] = max(vocabulario.talhoes)
+    return parametros
+
+
+def _blocos(regras: Sequence[Regra], parametros: Dict[str, Any]) -> List[Tuple[Tuple, List[List[Regra]]]]:
+    """
+    Regras seguidas com as mesmas condições, em cadeias (as de um grupo
+    juntas; as sem grupo, sozinhas). Regras cujo conjunto não está
+    configurado (ex.: usuário sem talhões cadastrados) ficam de fora.
+    """
+    blocos: List[Tuple[Tuple, List[List[Regra]]]] = []
+    vistos = set()
+    for regra in regras:
+        if regra.parametro is not None and parametros[regra.parametro] is None:
+            continue
+        if not blocos or blocos[-1][0] != regra.quando:
+            blocos.append((regra.quando, []))
+        cadeias = blocos[-1][1]
+        if regra.grupo is not None and cadeias and cadeias[-1][0].grupo == regra.grupo:
+            cadeias[-1].append(regra)
+            continue
+        if regra.grupo is not None:
+            if regra.grupo in vistos:
+                raise ValueError(f"Regras do grupo '{regra.grupo}' precisam estar seguidas")
+            vistos.add(regra.grupo)
+        cadeias.append([regra])
+    return blocos
+
+
+def _definido(valor: Any) -> bool:
+    return valor is not None
+
+
+def _condicao(condicao: Any) -> Callable[[Any], bool]:
+    """Teste de uma condição do `quando` sobre o valor do campo"""
+    if condicao == PRESENTE:
+        return bool
+    if condicao == DEFINIDO:
+        return _definido
+    return frozenset(condicao).__contains__
+
+
+def _validacao(erros: Sequence[str], alertas: Sequence[str], sugestoes: Sequence[str]) -> Dict[str, Any]:
+    """Validação com as mensagens; sem erros nem alertas a confiança é 1.0 direto"""
+    return {
+        'valido': not erros,
+        'erros': erros,
+        'alertas': alertas,
+        'sugestoes': sugestoes,
+        'confianca_validacao': max(1.0 - len(erros) * PESO_ERRO - len(alertas) * PESO_ALERTA, 0.0)
+        if erros or alertas else 1.0,
+    }
+
+
+class RegrasCompiladas:
+    """
+    Tabela de regras com os parâmetros de um usuário, pronta para avaliar:
+    cada regra vira (campo, função de falha, parâmetro, lista de destino,
+    mensagem, sugestão), com limites e conjuntos já resolvidos, e as
+    condições de cada bloco viram funções sobre o valor do campo.
+
+    - validar(dados): validação de um registro;
+    - validar_lote(registros): a de vários registros, com erros, alertas
+      e sugestões como tuplas (os registros sem mensagens compartilham a
+      tupla vazia).
+    """
+
+    __slots__ = ('parametros', '_blocos')
+
+    def __init__(self, parametros: Dict[str, Any], regras: Sequence[Regra] = REGRAS):
+        self.parametros = parametros
+        self._blocos = tuple(
+            (
+                tuple((campo, _condicao(condicao)) for campo, condicao in quando),
+                tuple(tuple(self._verificacao(regra) for regra in cadeia) for cadeia in cadeias),
+            )
+            for quando, cadeias in _blocos(regras, parametros)
+        )
+
+    def _verificacao(self, regra: Regra) -> Tuple:
+        return (
+            regra.campo,
+            _FALHAS[regra.teste],
+            self.parametros[regra.parametro] if regra.parametro is not None else None,
+            _NIVEIS[regra.nivel],
+            regra.mensagem,
+            '{' in regra.mensagem,
+            regra.sugestao,
+        )
+
+    def _mensagens(self, dados: Mapping[str, Any]) -> Optional[Tuple[List[str], List[str], List[str]]]:
+        """(erros, alertas, sugestoes) do registro, ou None se nenhuma regra falha"""
+        obter = dados.get
+        mensagens = None
+        for condicoes, cadeias in self._blocos:
+            for campo, condicao in condicoes:
+                if not condicao(obter(campo)):
+                    break
+            else:
+                for cadeia in cadeias:
+                    # Das regras de uma cadeia, só a primeira que falha gera mensagem
+                    for campo, falha, parametro, destino, mensagem, formatar, sugestao in cadeia:
+                        valor = obter(campo)
+                        if falha(valor, parametro):
+                            if mensagens is None:
+                                mensagens = ([], [], [])
+                            mensagens[destino].append(mensagem.format(valor=valor) if formatar else mensagem)
+                            if sugestao is not None:
+                                mensagens[2].append(sugestao)
+                            break
+        return mensagens
+
+    def validar(self, dados: Mapping[str, Any]) -> Dict[str, Any]:
+        mensagens = self._mensagens(dados)
+        if mensagens is None:
+            return _validacao([], [], [])
+        return _validacao(*mensagens)
+
+    def validar_lote(self, registros: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
+        validacoes = []
+        for dados in registros:
+            mensagens = self._mensagens(dados)
+            if mensagens is None:
+                validacoes.append(_validacao((), (), ()))
+            else:
+                erros, alertas, sugestoes = mensagens
+                validacoes.append(_validacao(tuple(erros), tuple(alertas), tuple(sugestoes)))
+        return validacoes
+
+
+def compilar(vocabulario: Optional['VocabularioUsuario'] = None) -> RegrasCompiladas:
+    """Regras com os parâmetros do usuário (ou os padrão, sem vocabulário)"""
+    return RegrasCompiladas(parametros_do_usuario(vocabulario))
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Campos extraídos da fala, na ordem de `dados_extraidos` e de Extracao.campos
+CAMPOS_EXTRAIDOS = (
+    'tipo_atividade', 'pessoa_envolvida', 'servico_realizado', 'cultura',
+    'talhao', 'valor_monetario', 'quantidade', 'unidade_medida'
+)
+
+# Abaixo desta confiança o registro é gravado com precisa_revisao
+CONFIANCA_MINIMA = 0.7
+
+# Parte do resultado que depende só do texto normalizado (e do vocabulário),
+# guardada no cache de resultados: (valores de CAMPOS_EXTRAIDOS, validação,
+# sugestões). Tupla de estruturas simples, para os backends em JSON; as
+# listas da validação viram tuplas, compartilhadas sem cópia entre acertos
+Extracao = Tuple[Sequence[Any], Dict[str, Any], Sequence[str]]
+
+
+class ResultadoNLP:
+    """
+    Resultado de processar_texto: campos extraídos, validação, confiança e
+    sugestões de uma fala.
+
+    Monta direto os parâmetros do INSERT (para_banco) e o corpo de
+    ProcessarFalaResponse (para_resposta). `validacao` e `sugestoes` podem
+    ser compartilhadas com o cache: não alterar.
+    """
+    __slots__ = (
+        'usuario_id', 'descricao_original', 'data_registro',
+        *CAMPOS_EXTRAIDOS,
+        'validacao', 'confianca', 'sugestoes'
+    )
+
+    def __init__(self, usuario_id: Optional[str], descricao_original: str,
+                 data_registro: datetime, extracao: Extracao, confianca: float):
+        campos, self.validacao, self.sugestoes = extracao
+        self.usuario_id = usuario_id
+        self.descricao_original = descricao_original
+        self.data_registro = data_registro
+        (self.tipo_atividade, self.pessoa_envolvida, self.servico_realizado, self.cultura,
+         self.talhao, self.valor_monetario, self.quantidade, self.unidade_medida) = campos
+        self.confianca = confianca
+
+    def dados(self) -> Dict[str, Any]:
+        """Dados extraídos no formato da API (`dados_extraidos`)"""
+        return {
+            'usuario_id': self.usuario_id,
+            'descricao_original': self.descricao_original,
+            'data_registro': self.data_registro,
+            'tipo_atividade': self.tipo_atividade,
+            'pessoa_envolvida': self.pessoa_envolvida,
+            'servico_realizado': self.servico_realizado,
+            'cultura': self.cultura,
+            'talhao': self.talhao,
+            'valor_monetario': self.valor_monetario,
+            'quantidade': self.quantidade,
+            'unidade_medida': self.unidade_medida,
+        }
+
+    def para_banco(self, id_externo: str) -> Dict[str, Any]:
+        """Colunas de RegistroRural para o INSERT"""
+        dados = self.dados()
+        dados['precisa_revisao'] = self.confianca < CONFIANCA_MINIMA
+        dados['id_externo'] = id_externo
+        return dados
+
+    def para_resposta(self, registro_id: Optional[int],
+                      id_externo: Optional[str] = None) -> Dict[str, Any]:
+        """Corpo de ProcessarFalaResponse"""
+        return {
+            'id': registro_id,
+            'id_externo': id_externo,
+            'dados_extraidos': self.dados(),
+            'validacao': self.validacao,
+            'confianca': self.confianca,
+            'sugestoes': self.sugestoes,
+        }
@@ -0,0 +1,81 @@
+"""
+Extração de uma fala enquanto ela é transcrita (/ws/processar-fala).
+
+O app manda a transcrição parcial a cada trecho reconhecido; a sessão
+guarda a varredura incremental do texto (ver VarreduraIncremental) e
+devolve só o que mudou desde a atualização anterior. O resultado final
+é o da última transcrição, igual ao de processar_texto, e é gravado uma
+vez pela rota.
+"""
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from src.nlp.resultado import CAMPOS_EXTRAIDOS, ResultadoNLP
+from src.nlp.vocabulario import VocabularioUsuario
+
+if TYPE_CHECKING:
+    from src.nlp.processador import ProcessadorNLPRural
+
+
+def diferencas(anterior: Optional[ResultadoNLP], atual: ResultadoNLP) -> Dict[str, Any]:
+    """
+    O que mudou de um resultado para o outro: campos de dados_extraidos,
+    chaves da validação, confiança e sugestões (sem as chaves que não
+    mudaram; vazio se nada mudou)
+    """
+    if anterior is None:
+        dados = {campo: getattr(atual, campo) for campo in CAMPOS_EXTRAIDOS}
+        validacao = dict(atual.validacao)
+    else:
+        dados = {
+            campo: getattr(atual, campo) for campo in CAMPOS_EXTRAIDOS
+            if getattr(atual, campo) != getattr(anterior, campo)
+        }
+        validacao = {
+            chave: valor for chave, valor in atual.validacao.items()
+            if anterior.validacao.get(chave) != valor
+        }
+
+    delta: Dict[str, Any] = {}
+    if dados:
+        delta['dados_extraidos'] = dados
+    if validacao:
+        delta['validacao'] = validacao
+    if anterior is None or atual.confianca != anterior.confianca:
+        delta['confianca'] = atual.confianca
+    if anterior is None or atual.sugestoes != anterior.sugestoes:
+        delta['sugestoes'] = atual.sugestoes
+    return delta
+
+
+class SessaoExtracao:
+    """Estado da extração de uma fala, atualizado a cada transcrição parcial"""
+
+    def __init__(self, processador: "ProcessadorNLPRural", usuario_id: str,
+                 vocabulario: Optional[VocabularioUsuario] = None):
+        self.processador = processador
+        self.usuario_id = usuario_id
+        self.vocabulario = vocabulario
+        self.varredura = processador.motor.varredura_incremental()
+        self.texto: Optional[str] = None
+        self.resultado: Optional[ResultadoNLP] = None
+        self.atualizacoes = 0
+
+    def atualizar(self, texto: str) -> Dict[str, Any]:
+        """Extrai a transcrição atual (o texto inteiro até aqui); devolve as diferenças"""
+        if texto == self.texto:
+            return {}
+        anterior = self.resultado
+        self.resultado = self.processador.processar_parcial(
+            self.varredura, texto, self.usuario_id, self.vocabulario
+        )
+        self.texto = texto
+        self.atualizacoes += 1
+        return diferencas(anterior, self.resultado)
+
+    def finalizar(self, texto: Optional[str] = None) -> ResultadoNLP:
+        """Resultado da transcrição final (`texto`, ou a última parcial)"""
+        if texto is not None:
+            self.atualizar(texto)
+        if self.resultado is None or not self.texto.strip():
+            raise ValueError("Nenhum texto recebido na sessão")
+        return self.resultado
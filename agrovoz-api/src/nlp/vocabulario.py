@@ -0,0 +1,188 @@
+import hashlib
+import json
+import re
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from src.config import VOCABULARIO_CACHE_ITENS, VOCABULARIO_CACHE_TTL_S
+from src.database.models import ConfiguracaoNLP
+from src.nlp.aproximado import IndiceAproximado
+from src.nlp.cache import CacheLRU
+from src.nlp.motor import trechos_de_espaco
+from src import metricas
+
+
+def _lista_json(valor: Optional[str]) -> list:
+    """Lê uma coluna JSON de ConfiguracaoNLP, tolerando valores vazios ou inválidos"""
+    if not valor:
+        return []
+    try:
+        dados = json.loads(valor)
+    except (TypeError, ValueError):
+        return []
+    return dados if isinstance(dados, list) else []
+
+
+def _limites_json(valor: Optional[str]) -> Dict[str, float]:
+    """Lê limites_validacao de ConfiguracaoNLP (objeto JSON nome -> número)"""
+    if not valor:
+        return {}
+    try:
+        dados = json.loads(valor)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(dados, dict):
+        return {}
+    return {
+        nome: limite for nome, limite in dados.items()
+        if isinstance(limite, (int, float)) and not isinstance(limite, bool)
+    }
+
+
+def _unicos(valores: Iterable[str]) -> Tuple[str, ...]:
+    """Remove vazios e repetidos preservando a ordem"""
+    vistos = {}
+    for valor in valores:
+        valor = str(valor).strip()
+        if valor and valor.lower() not in vistos:
+            vistos[valor.lower()] = valor
+    return tuple(vistos.values())
+
+
+class VocabularioUsuario:
+    """Vocabulário personalizado de um usuário, vindo de ConfiguracaoNLP"""
+
+    __slots__ = ('usuario_id', 'nomes_funcionarios', 'culturas', 'talhoes', 'limites', 'versao')
+
+    def __init__(self, usuario_id: str, nomes_funcionarios: Iterable[str] = (),
+                 culturas: Iterable[str] = (), talhoes: Iterable[int] = (),
+                 limites: Optional[Mapping[str, float]] = None):
+        self.usuario_id = usuario_id
+        self.nomes_funcionarios = _unicos(nomes_funcionarios)
+        self.culturas = tuple(c.lower() for c in _unicos(culturas))
+        self.talhoes = tuple(sorted({int(t) for t in talhoes}))
+        # Limites das regras de validação trocados pelo usuário (ver LIMITES_PADRAO)
+        self.limites: Dict[str, float] = dict(sorted((limites or {}).items()))
+
+        # Versão pelo conteúdo: estável entre processos e imune à
+        # resolução de segundos de data_atualizacao
+        conteudo = json.dumps(
+            [self.nomes_funcionarios, self.culturas, self.talhoes, self.limites], ensure_ascii=False
+        )
+        self.versao = hashlib.sha1(conteudo.encode('utf-8')).hexdigest()[:16]
+
+    @property
+    def vazio(self) -> bool:
+        return not (self.nomes_funcionarios or self.culturas or self.talhoes or self.limites)
+
+    @classmethod
+    def de_configuracao(cls, usuario_id: str,
+                        config: Optional[ConfiguracaoNLP]) -> 'VocabularioUsuario':
+        if config is None:
+            return cls(usuario_id)
+
+        talhoes = []
+        for talhao in _lista_json(config.talhoes_existentes):
+            try:
+                talhoes.append(int(talhao))
+            except (TypeError, ValueError):
+                continue
+
+        return cls(
+            usuario_id,
+            nomes_funcionarios=_lista_json(config.nomes_funcionarios),
+            culturas=_lista_json(config.culturas_utilizadas),
+            talhoes=talhoes,
+            limites=_limites_json(config.limites_validacao)
+        )
+
+
+class MatchersUsuario:
+    """
+    Vocabulário de um usuário compilado para a extração; com o índice de
+    correção base, `correcao` soma a ele os nomes e culturas do usuário
+    """
+
+    __slots__ = ('nomes', 'alcance_nomes', 'nomes_canonicos', 'culturas', 'talhoes', 'correcao')
+
+    def __init__(self, vocabulario: VocabularioUsuario, correcao: Optional[IndiceAproximado] = None):
+        nomes = sorted(vocabulario.nomes_funcionarios, key=len, reverse=True)
+        self.nomes_canonicos = {nome.lower(): nome for nome in nomes}
+        self.nomes = re.compile(
+            r'\b(' + '|'.join(re.escape(nome.lower()) for nome in nomes) + r')\b',
+            re.IGNORECASE
+        ) if nomes else None
+        # Os nomes são literais: o padrão percorre os espaços do nome mais longo
+        self.alcance_nomes = max((trechos_de_espaco(nome) for nome in nomes), default=0)
+        self.culturas = vocabulario.culturas
+        self.talhoes = frozenset(vocabulario.talhoes)
+        palavras = [palavra for nome in nomes for palavra in nome.split()] + list(self.culturas)
+        self.correcao = correcao.com(palavras) if correcao is not None and palavras else correcao
+
+    def extrair_pessoa(self, varredura) -> Optional[str]:
+        """Primeiro funcionário cadastrado citado no texto, com a grafia cadastrada"""
+        if self.nomes is None:
+            return None
+        match = varredura.buscar(self.nomes, self.alcance_nomes)
+        if match is None:
+            return None
+        return self.nomes_canonicos[match.group(1).lower()]
+
+    def extrair_cultura(self, varredura) -> Optional[str]:
+        for cultura in self.culturas:
+            if varredura.contem_palavra(cultura):
+                return cultura.title()
+        return None
+
+    def escolher_talhao(self, numeros: List[str]) -> Optional[int]:
+        """Primeiro número citado que é um talhão da propriedade"""
+        for numero in numeros:
+            talhao = int(numero)
+            if talhao in self.talhoes:
+                return talhao
+        return None
+
+
+# Vocabulário por usuário; o TTL limita quanto tempo outros workers
+# (que não recebem a invalidação local) podem usar uma versão antiga
+cache_vocabulario = CacheLRU(VOCABULARIO_CACHE_ITENS, ttl=VOCABULARIO_CACHE_TTL_S)
+metricas.observar_cache('vocabulario', cache_vocabulario.estatisticas)
+
+
+def carregar_vocabulario(db: Session, usuario_id: str) -> VocabularioUsuario:
+    """Lê a configuração mais recente do usuário no banco"""
+    from src.database.connection import DatabaseService
+
+    config = DatabaseService(db).buscar_configuracao_nlp(usuario_id)
+    return VocabularioUsuario.de_configuracao(usuario_id, config)
+
+
+def obter_vocabulario(db: Session, usuario_id: str) -> VocabularioUsuario:
+    """Vocabulário do usuário, do cache ou do banco"""
+    return cache_vocabulario.obter_ou_criar(
+        usuario_id, lambda: carregar_vocabulario(db, usuario_id)
+    )
+
+
+def invalidar_vocabulario(usuario_id: str):
+    cache_vocabulario.invalidar(usuario_id)
+
+
+@event.listens_for(ConfiguracaoNLP, 'after_insert')
+@event.listens_for(ConfiguracaoNLP, 'after_update')
+@event.listens_for(ConfiguracaoNLP, 'after_delete')
+def _invalidar_ao_alterar(mapper, connection, config: ConfiguracaoNLP):
+    invalidar_vocabulario(config.usuario_id)
+    # Invalida de novo no commit: uma leitura concorrente entre o flush e o
+    # commit ainda enxerga a linha antiga e poderia recolocá-la no cache
+    sessao = object_session(config)
+    if sessao is not None:
+        sessao.info.setdefault('vocabularios_alterados', set()).add(config.usuario_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_apos_commit(sessao: Session):
+    for usuario_id in sessao.info.pop('vocabularios_alterados', ()):
+        invalidar_vocabulario(usuario_id)
@@ -1,17 +1,29 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from typing import Optional, List, Dict, Any, Literal
+from datetime import date, datetime
+
+# Limite de itens por lote (sincronização do app após ficar sem sinal, revisão)
+MAX_ITENS_LOTE = 500
 
 class ProcessarFalaRequest(BaseModel):
     """Request para processar fala"""
     texto: str = Field(..., description="Texto transcrito da fala")
     usuario_id: str = Field(..., description="ID único do usuário")
+    id_externo: Optional[str] = Field(
+        None, min_length=1, max_length=64,
+        description="ID do registro gerado pelo app (ex. UUID); o servidor gera um se ausente"
+    )
+    chave_idempotencia: Optional[str] = Field(
+        None, min_length=1, max_length=100,
+        description="Alternativa ao header Idempotency-Key"
+    )
     
     class Config:
         json_schema_extra = {
             "example": {
                 "texto": "contratei o Eduardo para plantar soja no talhão 5 por 3000 reais",
-                "usuario_id": "user_12345"
+                "usuario_id": "user_12345",
+                "id_externo": "3f2b8c1e-5d4a-4b7e-9c2f-1a6d8e0b7c3d"
             }
         }
 
@@ -39,7 +51,10 @@ class ValidacaoResult(BaseModel):
 
 class ProcessarFalaResponse(BaseModel):
     """Response do processamento de fala"""
-    id: int = Field(..., description="ID do registro criado")
+    id: Optional[int] = Field(
+        ..., description="ID do registro criado (nulo enquanto aguarda gravação, INGESTAO_MODO=fila)"
+    )
+    id_externo: Optional[str] = Field(None, description="ID do app ou gerado pelo servidor")
     dados_extraidos: DadosExtraidos
     validacao: ValidacaoResult
     confianca: float = Field(..., description="Nível de confiança (0.0 a 1.0)")
@@ -63,3 +78,168 @@ class ProcessarFalaResponse(BaseModel):
                 "confianca": 0.85
             }
         }
+
+class InicioFalaStream(BaseModel):
+    """Primeira mensagem de /ws/processar-fala: de quem é a fala e como gravá-la"""
+    tipo: Literal['iniciar']
+    usuario_id: str = Field(..., description="ID único do usuário")
+    id_externo: Optional[str] = Field(
+        None, min_length=1, max_length=64,
+        description="ID do registro gerado pelo app (ex. UUID); o servidor gera um se ausente"
+    )
+    chave_idempotencia: Optional[str] = Field(
+        None, min_length=1, max_length=100,
+        description="Como em /processar-fala: a mesma chave recebe a resposta original"
+    )
+
+class MensagemFalaStream(BaseModel):
+    """Mensagens seguintes de /ws/processar-fala"""
+    tipo: Literal['parcial', 'finalizar', 'cancelar']
+    texto: Optional[str] = Field(
+        None, description="Transcrição inteira até aqui (em 'finalizar', opcional: vale a última parcial)"
+    )
+
+class ItemLoteResponse(BaseModel):
+    """Resultado de um item do lote"""
+    indice: int = Field(..., description="Posição do item no lote enviado")
+    sucesso: bool
+    resultado: Optional[ProcessarFalaResponse] = None
+    erro: Optional[str] = None
+    id_existente: Optional[int] = Field(
+        None, description="id_externo já gravado (antes ou no próprio lote): ID do registro existente"
+    )
+    repetido: bool = Field(
+        False, description="chave_idempotencia já usada: `resultado` é a resposta original"
+    )
+
+class ProcessarFalaLoteResponse(BaseModel):
+    """Response do processamento de um lote de falas"""
+    total: int
+    sucessos: int
+    falhas: int
+    resultados: List[ItemLoteResponse] = []
+
+class ConfiguracaoNLPRequest(BaseModel):
+    """Vocabulário personalizado do usuário"""
+    nomes_funcionarios: List[str] = Field(default_factory=list, description="Nomes dos funcionários")
+    culturas: List[str] = Field(default_factory=list, description="Culturas plantadas na propriedade")
+    talhoes: List[int] = Field(default_factory=list, description="Números dos talhões existentes")
+    limites_validacao: Dict[str, float] = Field(
+        default_factory=dict,
+        description="Limites da validação trocados para este usuário (ex. valor_maximo, kg_maximo)"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "nomes_funcionarios": ["Eduardo", "Zé Carlos"],
+                "culturas": ["soja", "girassol"],
+                "talhoes": [1, 2, 5, 12],
+                "limites_validacao": {"valor_maximo": 500000, "sacas_maximo": 5000}
+            }
+        }
+
+class ConfiguracaoNLPResponse(ConfiguracaoNLPRequest):
+    """Vocabulário personalizado salvo"""
+    usuario_id: str
+    versao: str = Field(..., description="Versão do vocabulário (muda a cada alteração)")
+
+class ResumoEstatistica(BaseModel):
+    """Totais de um recorte (tipo de atividade, cultura ou talhão)"""
+    registros: int
+    confirmados: int
+    valor_total: float
+
+class EstatisticaDia(BaseModel):
+    """Totais de um dia do período"""
+    dia: date
+    registros: int
+    valor_total: float
+
+class EstatisticasResponse(BaseModel):
+    """Estatísticas dos registros de um usuário no período"""
+    usuario_id: str
+    periodo: str
+    data_inicio: date
+    data_fim: date
+    total_registros: int
+    registros_confirmados: int
+    valor_total_gastos: float
+    valor_total_vendas: float
+    atividades_por_tipo: Dict[str, int] = Field(default_factory=dict, description="Quantidade de registros por tipo")
+    por_tipo: Dict[str, ResumoEstatistica] = Field(default_factory=dict)
+    por_cultura: Dict[str, ResumoEstatistica] = Field(default_factory=dict)
+    por_talhao: Dict[str, ResumoEstatistica] = Field(default_factory=dict)
+    por_dia: List[EstatisticaDia] = []
+
+class RegistroResponse(BaseModel):
+    """Registro rural na listagem e na exportação"""
+    id: int
+    id_externo: Optional[str] = None
+    data_registro: datetime
+    tipo_atividade: str
+    descricao_original: str
+    pessoa_envolvida: Optional[str] = None
+    servico_realizado: Optional[str] = None
+    cultura: Optional[str] = None
+    talhao: Optional[int] = None
+    valor_monetario: Optional[float] = None
+    quantidade: Optional[float] = None
+    unidade_medida: Optional[str] = None
+    confirmado: Optional[bool] = None
+    precisa_revisao: Optional[bool] = None
+
+class ListaRegistrosResponse(BaseModel):
+    """Página de registros de um usuário"""
+    registros: List[RegistroResponse]
+    total: int = Field(..., description="Quantidade de registros nesta página")
+    proximo_cursor: Optional[str] = Field(None, description="Cursor da próxima página (nulo na última)")
+
+class RegistroBuscaResponse(RegistroResponse):
+    """Registro encontrado pela busca textual"""
+    relevancia: float = Field(..., description="Maior para os registros mais relevantes")
+
+class BuscaRegistrosResponse(BaseModel):
+    """Página de resultados da busca textual"""
+    registros: List[RegistroBuscaResponse]
+    total: int = Field(..., description="Quantidade de registros nesta página")
+    proximo_cursor: Optional[str] = Field(None, description="Cursor da próxima página (nulo na última)")
+
+class CorrecaoRegistro(BaseModel):
+    """Campos corrigidos na revisão; só os enviados são alterados (null apaga o valor)"""
+    tipo_atividade: Optional[str] = Field(None, min_length=1, max_length=50)
+    pessoa_envolvida: Optional[str] = Field(None, max_length=100)
+    servico_realizado: Optional[str] = Field(None, max_length=100)
+    cultura: Optional[str] = Field(None, max_length=50)
+    talhao: Optional[int] = None
+    valor_monetario: Optional[float] = None
+    quantidade: Optional[float] = None
+    unidade_medida: Optional[str] = Field(None, max_length=20)
+
+class ItemRevisao(BaseModel):
+    """Revisão de um registro"""
+    id: int
+    campos: CorrecaoRegistro = Field(default_factory=CorrecaoRegistro)
+    confirmar: bool = Field(True, description="Confirmar o registro (sai da fila de revisão)")
+
+class RevisaoLoteRequest(BaseModel):
+    """Registros revisados de uma vez"""
+    # O limite é conferido na validação, antes de montar todos os itens
+    itens: List[ItemRevisao] = Field(..., min_length=1, max_length=MAX_ITENS_LOTE)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "itens": [
+                    {"id": 120},
+                    {"id": 121, "campos": {"cultura": "Soja", "talhao": 5}},
+                    {"id": 122, "campos": {"valor_monetario": 3000.0}, "confirmar": False}
+                ]
+            }
+        }
+
+class RevisaoLoteResponse(BaseModel):
+    """Resultado da revisão em lote"""
+    revisados: List[int] = Field(..., description="IDs encontrados e revisados")
+    nao_encontrados: List[int] = Field(default_factory=list, description="IDs inexistentes ou de outro usuário")
+    alterados: int = Field(..., description="Registros que de fato mudaram")
@@ -0,0 +1,51 @@
+"""
+Testes da API e do NLP.
+
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+
+Cada execução usa um SQLite novo em um diretório temporário, migrado ao
+subir a API (nunca o agrovoz.db da pasta). Os testes dividem o banco:
+cada um grava com seus próprios usuario_id.
+"""
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+RAIZ_API = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ_API)
+
+# Antes de qualquer import de src: a configuração é lida na importação
+_DIRETORIO = tempfile.mkdtemp(prefix='agrovoz-testes-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_DIRETORIO, 'testes.db')}"
+os.environ['MIGRACOES_INICIALIZACAO'] = 'atualizar'
+os.environ['INGESTAO_MODO'] = 'sincrona'
+os.environ['NLP_EXECUTOR'] = 'local'
+os.environ['NLP_CACHE_RESULTADOS'] = 'memoria'
+
+
+@pytest.fixture(scope='session')
+def cliente():
+    """TestClient com a API iniciada (migrações, executor e serviços)"""
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+
+@pytest.fixture
+def db(cliente):
+    from src.database.connection import SessionLocal
+
+    sessao = SessionLocal()
+    yield sessao
+    sessao.close()
+
+
+@pytest.fixture
+def usuario_id() -> str:
+    return f"teste-{uuid.uuid4().hex[:12]}"
@@ -0,0 +1,133 @@
+"""ExecutorProcessos: micro-lotes, encerramento e tempo máximo de espera"""
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.nlp.cache import BackendMemoria
+from src.nlp.executor import _PARAR, ErroProcessamentoNLP, ExecutorIndisponivel, ExecutorProcessos
+from src.nlp.processador import ProcessadorNLPRural
+
+
+def _iniciado(workers: int = 1, **opcoes) -> ExecutorProcessos:
+    executor = ExecutorProcessos(workers, 2.0, 64, cache_privado=True, **opcoes)
+    executor.iniciar()
+    return executor
+
+
+@pytest.fixture(scope='module')
+def executor():
+    executor = _iniciado(workers=2)
+    yield executor
+    executor.encerrar()
+
+
+def _campos(resultado):
+    return resultado.tipo_atividade, resultado.cultura, resultado.talhao, resultado.quantidade
+
+
+def test_microlotes_devolvem_cada_resultado_a_sua_fala(executor):
+    textos = [f"colhi {i} sacas de milho no talhão {i % 9 + 1}" for i in range(1, 401)]
+    processador = ProcessadorNLPRural(BackendMemoria(16))
+
+    with ThreadPoolExecutor(32) as clientes:
+        resultados = list(clientes.map(lambda texto: executor.processar(texto, 'u'), textos))
+
+    assert [_campos(r) for r in resultados] == [_campos(processador.processar_texto(t, 'u')) for t in textos]
+
+
+def test_erro_de_um_texto_fica_no_item(executor):
+    saidas = executor.processar_lote([('colhi 3 sacas de soja', 'u', None), (None, 'u', None)])
+
+    assert saidas[0][0] is True and saidas[0][1].quantidade == 3
+    assert saidas[1][0] is False
+    with pytest.raises(ErroProcessamentoNLP) as erro:
+        executor.processar(None, 'u')
+    assert not isinstance(erro.value, ExecutorIndisponivel)
+
+
+def test_encerrar_recusa_falas_novas_sem_travar_ninguem():
+    executor = _iniciado()
+    resultados = Counter()
+    parar = threading.Event()
+
+    def cliente(numero: int):
+        while not parar.is_set():
+            try:
+                executor.processar(f"colhi {numero} sacas de milho", 'u')
+                resultados['ok'] += 1
+            except ExecutorIndisponivel:
+                resultados['recusada'] += 1
+                time.sleep(0.01)
+            except RuntimeError:
+                resultados['encerrado'] += 1
+                time.sleep(0.01)
+
+    clientes = [threading.Thread(target=cliente, args=(i,)) for i in range(8)]
+    for thread in clientes:
+        thread.start()
+    time.sleep(0.5)
+    executor.encerrar()
+    time.sleep(0.1)
+    parar.set()
+    for thread in clientes:
+        thread.join(timeout=10)
+
+    assert not any(thread.is_alive() for thread in clientes)
+    assert resultados['ok'] > 0
+    with pytest.raises(RuntimeError):
+        executor.processar("colhi 1 saca", 'u')
+
+
+def test_encerrar_falha_o_que_ficou_na_fila():
+    executor = _iniciado()
+    # Despachante parado antes do encerramento: a fala fica na fila
+    executor._fila.put(_PARAR)
+    executor._despachante.join()
+    erros = []
+
+    def cliente():
+        try:
+            executor.processar("colhi 3 sacas", 'u')
+        except ExecutorIndisponivel as erro:
+            erros.append(erro)
+
+    thread = threading.Thread(target=cliente)
+    thread.start()
+    time.sleep(0.1)
+    executor.encerrar()
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert len(erros) == 1
+
+
+def test_espera_pelos_workers_tem_limite():
+    executor = _iniciado(timeout_s=0.0001)
+    try:
+        with pytest.raises(ExecutorIndisponivel):
+            executor.processar_lote([(f"colhi {i} sacas", 'u', None) for i in range(2000)])
+        with pytest.raises(ExecutorIndisponivel):
+            executor.processar("colhi 3 sacas", 'u')
+    finally:
+        executor.encerrar()
+
+
+def test_nlp_indisponivel_responde_503(cliente, monkeypatch, usuario_id):
+    from src.api import routes
+
+    executor = _iniciado(timeout_s=0.0001)
+    monkeypatch.setattr(routes, 'executor_nlp', executor)
+    try:
+        fala = {'texto': 'colhi 10 sacas de milho', 'usuario_id': usuario_id}
+        resposta = cliente.post('/api/v1/processar-fala', json=fala)
+        assert resposta.status_code == 503
+        assert resposta.headers['retry-after'] == '1'
+
+        resposta = cliente.post('/api/v1/processar-fala/lote', json=[fala] * 200)
+        assert resposta.status_code == 503
+        assert resposta.headers['retry-after'] == '1'
+    finally:
+        executor.encerrar()
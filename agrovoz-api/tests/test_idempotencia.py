@@ -0,0 +1,96 @@
+"""Idempotency-Key em /processar-fala e chave_idempotencia por item no lote"""
+from src.api import routes
+from src.api.idempotencia import BloomRotativo
+
+FALA = '/api/v1/processar-fala'
+LOTE = '/api/v1/processar-fala/lote'
+
+
+def _total(cliente, usuario_id: str) -> int:
+    return cliente.get(f'/api/v1/registros/{usuario_id}').json()['total']
+
+
+def test_reenvio_com_a_mesma_chave_repete_a_resposta(cliente, usuario_id):
+    corpo = {'texto': 'colhi 30 sacas de milho', 'usuario_id': usuario_id}
+    cabecalho = {'Idempotency-Key': 'captura-1'}
+
+    primeira = cliente.post(FALA, json=corpo, headers=cabecalho)
+    repetida = cliente.post(FALA, json=corpo, headers=cabecalho)
+
+    assert primeira.status_code == repetida.status_code == 200
+    assert 'idempotent-replayed' not in primeira.headers
+    assert repetida.headers['idempotent-replayed'] == 'true'
+    assert repetida.json() == primeira.json()
+    assert _total(cliente, usuario_id) == 1
+
+
+def test_campo_chave_idempotencia_vale_como_o_header(cliente, usuario_id):
+    corpo = {'texto': 'plantei soja no talhão 2', 'usuario_id': usuario_id,
+             'chave_idempotencia': 'captura-2'}
+
+    primeira = cliente.post(FALA, json=corpo)
+    repetida = cliente.post(FALA, json={**corpo, 'chave_idempotencia': None},
+                            headers={'Idempotency-Key': 'captura-2'})
+
+    assert repetida.headers['idempotent-replayed'] == 'true'
+    assert repetida.json()['id'] == primeira.json()['id']
+
+
+def test_mesma_chave_com_outro_texto_responde_422(cliente, usuario_id):
+    cabecalho = {'Idempotency-Key': 'captura-3'}
+    cliente.post(FALA, json={'texto': 'colhi 5 sacas', 'usuario_id': usuario_id}, headers=cabecalho)
+
+    resposta = cliente.post(FALA, json={'texto': 'colhi 6 sacas', 'usuario_id': usuario_id},
+                            headers=cabecalho)
+
+    assert resposta.status_code == 422
+    assert _total(cliente, usuario_id) == 1
+
+
+def test_chave_gravada_por_outro_worker_repete_do_banco(cliente, usuario_id, monkeypatch):
+    corpo = {'texto': 'arei a gleba 4', 'usuario_id': usuario_id}
+    cabecalho = {'Idempotency-Key': 'captura-4'}
+    primeira = cliente.post(FALA, json=corpo, headers=cabecalho).json()
+
+    # Outro worker: a chave não está na memória nem no filtro deste
+    routes.idempotencia._respostas.limpar()
+    monkeypatch.setattr(routes.idempotencia, '_vistas', BloomRotativo(1000, 3600))
+    repetida = cliente.post(FALA, json=corpo, headers=cabecalho)
+
+    assert repetida.status_code == 200
+    assert repetida.headers['idempotent-replayed'] == 'true'
+    assert repetida.json()['id'] == primeira['id']
+    assert _total(cliente, usuario_id) == 1
+
+
+def test_lote_repete_os_itens_com_chave_ja_usada(cliente, usuario_id):
+    itens = [
+        {'texto': 'colhi soja', 'usuario_id': usuario_id, 'chave_idempotencia': 'lote-1'},
+        {'texto': 'plantei milho', 'usuario_id': usuario_id, 'chave_idempotencia': 'lote-2'},
+    ]
+    primeiro = cliente.post(LOTE, json=itens).json()
+    assert primeiro['sucessos'] == 2
+
+    reenvio = cliente.post(LOTE, json=itens + [
+        # Chave já usada com outro texto: falha só o item
+        {'texto': 'outro texto', 'usuario_id': usuario_id, 'chave_idempotencia': 'lote-1'},
+    ]).json()
+
+    resultados = sorted(reenvio['resultados'], key=lambda item: item['indice'])
+    assert [item['repetido'] for item in resultados[:2]] == [True, True]
+    assert [item['resultado']['id'] for item in resultados[:2]] == \
+        [item['resultado']['id'] for item in sorted(primeiro['resultados'], key=lambda i: i['indice'])]
+    assert resultados[2]['sucesso'] is False
+    assert _total(cliente, usuario_id) == 2
+
+
+def test_chave_do_lote_repete_no_endpoint_individual(cliente, usuario_id):
+    item = {'texto': 'vendi 20 sacas de soja', 'usuario_id': usuario_id, 'chave_idempotencia': 'lote-3'}
+    gravado = cliente.post(LOTE, json=[item]).json()['resultados'][0]['resultado']
+
+    resposta = cliente.post(FALA, json={'texto': item['texto'], 'usuario_id': usuario_id},
+                            headers={'Idempotency-Key': 'lote-3'})
+
+    assert resposta.headers['idempotent-replayed'] == 'true'
+    assert resposta.json()['id'] == gravado['id']
+    assert _total(cliente, usuario_id) == 1
@@ -0,0 +1,53 @@
+"""Reextração: só os registros que o usuário não confirmou nem corrigiu mudam"""
+from sqlalchemy import update
+
+from src.database.connection import SessionLocal
+from src.database.models import RegistroRural
+from src.nlp.cache import BackendMemoria
+from src.nlp.executor import ExecutorLocal
+from src.nlp.processador import ProcessadorNLPRural
+from src.nlp.reextracao import reextrair
+
+
+def _reextrair(usuario_id: str):
+    executor = ExecutorLocal(ProcessadorNLPRural(BackendMemoria(64)))
+    return reextrair(SessionLocal, executor, lote=4, usuario_id=usuario_id, intervalo_relatorio=3600)
+
+
+def test_reextracao_respeita_revisao_do_usuario(cliente, db, usuario_id):
+    ids = [
+        cliente.post('/api/v1/processar-fala', json={
+            'texto': f'colhi {i} sacas de soja no talhão {i}', 'usuario_id': usuario_id
+        }).json()['id']
+        for i in range(1, 10)
+    ]
+    # Extração "antiga", errada em todos
+    db.execute(update(RegistroRural).where(RegistroRural.id.in_(ids)).values(cultura='Errada'))
+    db.commit()
+    corrigidos, confirmados, abertos = ids[:3], ids[3:6], ids[6:]
+    resposta = cliente.post(f'/api/v1/registros/{usuario_id}/revisao', json={'itens': [
+        *({'id': i, 'campos': {'cultura': 'Milho'}, 'confirmar': False} for i in corrigidos),
+        *({'id': i} for i in confirmados),
+    ]})
+    assert resposta.status_code == 200
+
+    assert _reextrair(usuario_id)['alterados'] == len(abertos)
+    assert _reextrair(usuario_id)['alterados'] == 0
+
+    db.expire_all()
+    culturas = dict(db.query(RegistroRural.id, RegistroRural.cultura).filter(RegistroRural.id.in_(ids)))
+    assert [culturas[i] for i in corrigidos] == ['Milho'] * 3
+    assert [culturas[i] for i in confirmados] == ['Errada'] * 3
+    assert [culturas[i] for i in abertos] == ['Soja'] * 3
+
+
+def test_so_confirmar_nao_marca_como_editado(cliente, db, usuario_id):
+    registro_id = cliente.post('/api/v1/processar-fala', json={
+        'texto': 'plantei milho no talhão 3', 'usuario_id': usuario_id
+    }).json()['id']
+
+    cliente.post(f'/api/v1/registros/{usuario_id}/revisao', json={'itens': [{'id': registro_id}]})
+
+    registro = db.get(RegistroRural, registro_id)
+    assert registro.confirmado is True
+    assert not registro.editado_manualmente
@@ -0,0 +1,11 @@
+"""POST /registros/{usuario_id}/revisao"""
+from src.schemas.request_response import MAX_ITENS_LOTE
+
+
+def test_lote_acima_do_limite_falha_na_validacao(cliente, usuario_id):
+    itens = [{'id': i, 'campos': {'cultura': 'Soja'}} for i in range(MAX_ITENS_LOTE + 1)]
+
+    resposta = cliente.post(f'/api/v1/registros/{usuario_id}/revisao', json={'itens': itens})
+
+    assert resposta.status_code == 422
+    assert resposta.json()['detail'][0]['type'] == 'too_long'
@@ -0,0 +1,18 @@
+"""GET /health"""
+import main
+
+
+def test_erro_do_banco_nao_vaza_no_health(cliente, monkeypatch, capsys):
+    def falhar():
+        raise RuntimeError("could not connect to server at db.interno:5432 (senha=segredo)")
+    monkeypatch.setattr(main, 'verificar_conexao', falhar)
+
+    resposta = cliente.get('/health')
+
+    assert resposta.status_code == 503
+    assert resposta.json() == {'status': 'unhealthy', 'database': 'error'}
+    assert 'db.interno' in capsys.readouterr().out
+
+
+def test_health_com_banco(cliente):
+    assert cliente.get('/health').json() == {'status': 'healthy', 'database': 'connected'}
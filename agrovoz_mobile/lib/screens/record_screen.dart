@@ -14,9 +14,30 @@ class RecordScreen extends StatefulWidget {
 class _RecordScreenState extends State<RecordScreen> {
   final speech = SpeechService();
   final api = ApiService('http://10.0.2.2:8000'); // ajuste conforme ambiente
+  FalaStream? _fala;
+  // Chave de idempotência da fala capturada: a mesma em todo reenvio
+  String? _chave;
 
   Future<void> _start() async {
     // garantir permissão e iniciar escuta
+    final session = context.read<SessionProvider>();
+    session.clearSession();
+    final chave = _chave = ApiService.novaChaveIdempotencia();
+    // Campos preenchidos enquanto o usuário fala; sem conexão, vai por POST em _send
+    try {
+      _fala = await api.abrirFalaStream(
+        usuarioId: 'dev',
+        onParcial: session.applyNlpDelta,
+        idempotencyKey: chave,
+      );
+    } catch (_) {
+      _fala = null;
+    }
+    await speech.listen(onText: (texto) {
+      session.setRecognizedText(texto);
+      _fala?.parcial(texto);
+    });
+    session.setListening(true);
   }
 
   Future<void> _stop() async {
@@ -24,9 +45,29 @@ class _RecordScreenState extends State<RecordScreen> {
     context.read<SessionProvider>().setListening(false);
   }
 
+  @override
+  void dispose() {
+    _fala?.cancelar();
+    super.dispose();
+  }
+
   Future<void> _send() async {
     final text = context.read<SessionProvider>().recognizedText;
-    final res = await api.processarFala(texto: text, usuarioId: 'dev');
+    final chave = _chave ??= ApiService.novaChaveIdempotencia();
+    final fala = _fala;
+    _fala = null;
+    Map<String, dynamic>? pelaConexao;
+    if (fala != null) {
+      try {
+        pelaConexao = await fala.finalizar(text);
+      } catch (_) {
+        // Conexão caiu: o POST com a mesma chave não grava a fala duas vezes
+      }
+    }
+    // Se falhar, a chave fica para o próximo toque em Enviar
+    final res = pelaConexao ??
+        await api.processarFala(texto: text, usuarioId: 'dev', idempotencyKey: chave);
+    _chave = null;
     context.read<SessionProvider>().setNlpResult(
       res['dados_extraidos'] ?? {},
       List<String>.from(res['alertas'] ?? const []),
@@ -1,23 +1,130 @@
+import 'dart:async';
 import 'dart:convert';
+import 'dart:io';
+import 'dart:math';
 import 'package:http/http.dart' as http;
 
 class ApiService {
   final String baseUrl; // ex.: 'http://10.0.2.2:8000'
   ApiService(this.baseUrl);
 
+  static final Random _aleatorio = Random.secure();
+
+  /// Chave nova para o cabeçalho Idempotency-Key: gere uma por fala
+  /// capturada (ao começar a transcrição) e reutilize em todo reenvio.
+  static String novaChaveIdempotencia() => List.generate(
+          16, (_) => _aleatorio.nextInt(256).toRadixString(16).padLeft(2, '0'))
+      .join();
+
+  /// [idempotencyKey] é a chave da fala capturada: reenviada com a mesma
+  /// chave, o servidor devolve a resposta original em vez de gravar outro
+  /// registro.
   Future<Map<String, dynamic>> processarFala({
     required String texto,
     required String usuarioId,
+    required String idempotencyKey,
   }) async {
     final uri = Uri.parse('$baseUrl/api/v1/processar-fala');
     final res = await http.post(
       uri,
-      headers: {'Content-Type': 'application/json'},
+      headers: {
+        'Content-Type': 'application/json',
+        'Idempotency-Key': idempotencyKey,
+      },
       body: jsonEncode({'texto': texto, 'usuario_id': usuarioId}),
     );
+    // 202: aceito pela fila de ingestão do servidor
+    if (res.statusCode != 200 && res.statusCode != 202) {
+      throw Exception('Erro HTTP ${res.statusCode}');
+    }
+    return jsonDecode(res.body) as Map<String, dynamic>;
+  }
+
+  /// Abre /ws/processar-fala: a fala é extraída enquanto é transcrita.
+  /// [onParcial] recebe só o que mudou a cada transcrição parcial.
+  /// [idempotencyKey] é a mesma chave usada se a fala for reenviada por
+  /// [processarFala].
+  Future<FalaStream> abrirFalaStream({
+    required String usuarioId,
+    required void Function(Map<String, dynamic>) onParcial,
+    required String idempotencyKey,
+  }) async {
+    final base = Uri.parse(baseUrl);
+    final uri = base.replace(
+      scheme: base.scheme == 'https' ? 'wss' : 'ws',
+      path: '/api/v1/ws/processar-fala',
+    );
+    final socket = await WebSocket.connect(uri.toString());
+    socket.add(jsonEncode({
+      'tipo': 'iniciar',
+      'usuario_id': usuarioId,
+      'chave_idempotencia': idempotencyKey,
+    }));
+    return FalaStream._(socket, onParcial);
+  }
+
+  /// Envia várias falas pendentes em uma única requisição. Cada fala leva
+  /// a chave da sua captura em 'chave_idempotencia' (o lote não usa o
+  /// cabeçalho Idempotency-Key): reenviando o lote, as já gravadas voltam
+  /// com 'repetido' em vez de virar outro registro.
+  Future<Map<String, dynamic>> processarLote(
+    List<Map<String, String>> falas,
+  ) async {
+    final uri = Uri.parse('$baseUrl/api/v1/processar-fala/lote');
+    final res = await http.post(
+      uri,
+      headers: {'Content-Type': 'application/json'},
+      body: jsonEncode(falas),
+    );
     if (res.statusCode != 200) {
       throw Exception('Erro HTTP ${res.statusCode}');
     }
     return jsonDecode(res.body) as Map<String, dynamic>;
   }
 }
+
+/// Sessão aberta em /ws/processar-fala.
+class FalaStream {
+  final WebSocket _socket;
+  final _resposta = Completer<Map<String, dynamic>>();
+
+  FalaStream._(this._socket, void Function(Map<String, dynamic>) onParcial) {
+    _socket.listen(
+      (dados) {
+        final mensagem = jsonDecode(dados as String) as Map<String, dynamic>;
+        switch (mensagem['tipo']) {
+          case 'parcial':
+            onParcial(mensagem);
+          case 'final':
+            _resposta.complete(mensagem['resposta'] as Map<String, dynamic>);
+          case 'erro':
+            _falhar(Exception('Erro ${mensagem['codigo']}: ${mensagem['detalhe']}'));
+        }
+      },
+      onError: _falhar,
+      onDone: () => _falhar(Exception('Conexão encerrada')),
+    );
+  }
+
+  void _falhar(Object erro) {
+    if (!_resposta.isCompleted) _resposta.completeError(erro);
+  }
+
+  /// Transcrição inteira até aqui (não só o trecho novo).
+  void parcial(String texto) =>
+      _socket.add(jsonEncode({'tipo': 'parcial', 'texto': texto}));
+
+  /// Grava a fala (com [texto] ou a última parcial) e devolve a mesma
+  /// resposta de [ApiService.processarFala].
+  Future<Map<String, dynamic>> finalizar([String? texto]) {
+    _socket.add(jsonEncode({'tipo': 'finalizar', if (texto != null) 'texto': texto}));
+    return _resposta.future;
+  }
+
+  /// Encerra sem gravar.
+  Future<void> cancelar() async {
+    _resposta.future.ignore();
+    _socket.add(jsonEncode({'tipo': 'cancelar'}));
+    await _socket.close();
+  }
+}
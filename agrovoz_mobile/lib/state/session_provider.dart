@@ -27,6 +27,19 @@ class SessionProvider extends ChangeNotifier {
     notifyListeners();
   }
 
+  /// Aplica as diferenças de uma mensagem parcial de /ws/processar-fala.
+  void applyNlpDelta(Map<String, dynamic> delta) {
+    final dados = delta['dados_extraidos'] as Map<String, dynamic>?;
+    if (dados != null) {
+      _extractedData = {...?_extractedData, ...dados};
+    }
+    final validacao = delta['validacao'] as Map<String, dynamic>?;
+    if (validacao != null && validacao.containsKey('alertas')) {
+      _alerts = List<String>.from(validacao['alertas']);
+    }
+    notifyListeners();
+  }
+
   void clearSession() {
     _isListening = false;
     _recognizedText = '';